@@ -205,6 +205,12 @@ REST_FRAMEWORK = {
 
 ML_MODELS_DIR = BASE_DIR / "ml_models"
 
+# ====== AI Reports ======
+# Telemetría de latencias por etapa (se escribe por lotes en ai_report_telemetria)
+AI_REPORTS_TELEMETRIA = env.bool("AI_REPORTS_TELEMETRIA", default=True)
+AI_REPORTS_TELEMETRIA_LOTE = env.int("AI_REPORTS_TELEMETRIA_LOTE", default=50)
+AI_REPORTS_TELEMETRIA_INTERVALO = env.float("AI_REPORTS_TELEMETRIA_INTERVALO", default=5.0)
+
 # ====== Notificaciones ======
 # Firebase Cloud Messaging (para push notifications)
 FIREBASE_CREDENTIALS_PATH = env("FIREBASE_CREDENTIALS_PATH", default=None)  # Ruta al archivo JSON de Firebase
@@ -212,3 +218,101 @@ FIREBASE_CREDENTIALS_PATH = env("FIREBASE_CREDENTIALS_PATH", default=None)  # Ru
 # SendGrid (para notificaciones por email)
 SENDGRID_API_KEY = env("SENDGRID_API_KEY", default=None)
 SENDGRID_FROM_EMAIL = env("SENDGRID_FROM_EMAIL", default="notificaciones@smartsales.com")
+
+# ====== Hilos de fondo ======
+# Funciones que gunicorn.conf.py (post_worker_init) ejecuta al iniciar cada worker
+HILOS_AL_INICIAR = env.list("HILOS_AL_INICIAR", default=[
+    "smartsales.pagos.inbox.despertar",
+    "smartsales.catalogo.trabajos.despertar",
+    "smartsales.pagos.confirmaciones.iniciar",
+])
+
+# ====== Pagos (Stripe) ======
+# Recibos: se resuelven después del commit del webhook, por lotes y fuera de la transacción
+PAGOS_RECIBOS_LOTE = env.int("PAGOS_RECIBOS_LOTE", default=20)
+PAGOS_RECIBOS_INTERVALO = env.float("PAGOS_RECIBOS_INTERVALO", default=2.0)
+# Confirmación de pago: espera (long-poll) del aviso del webhook en ConfirmarPagoView
+PAGOS_CONFIRMACION_ESPERA = env.float("PAGOS_CONFIRMACION_ESPERA", default=5.0)
+PAGOS_CONFIRMACION_ESPERA_MAX = env.float("PAGOS_CONFIRMACION_ESPERA_MAX", default=25.0)
+PAGOS_CONFIRMACION_SONDEO = env.float("PAGOS_CONFIRMACION_SONDEO", default=1.0)
+# Sin LISTEN la espera sondea la tabla ocupando un hilo: se acota a pocos segundos
+PAGOS_CONFIRMACION_ESPERA_SIN_LISTENER = env.float("PAGOS_CONFIRMACION_ESPERA_SIN_LISTENER", default=3.0)
+# Sesiones de checkout (carrito validado): se borran después de este TTL, con una purga
+# oportunista al crear sesiones. Debe cubrir los reintentos de webhooks de Stripe (3 días).
+PAGOS_CHECKOUT_SESION_TTL = env.int("PAGOS_CHECKOUT_SESION_TTL", default=7 * 24 * 3600)
+PAGOS_CHECKOUT_PURGA_INTERVALO = env.int("PAGOS_CHECKOUT_PURGA_INTERVALO", default=600)
+# Conexión directa (no el transaction pooler) para LISTEN entre procesos. Necesaria con varios
+# workers; vacía = aviso solo en proceso y sondeo de la tabla (se advierte al arrancar)
+PAGOS_LISTEN_DATABASE_URL = env("PAGOS_LISTEN_DATABASE_URL", default=None)
+# Inbox de webhooks: la vista solo registra el evento; lo procesan workers con reintentos.
+# STRIPE_INBOX_WORKERS=0 deja el procesamiento solo al comando procesar_webhooks_stripe.
+STRIPE_INBOX_WORKERS = env.int("STRIPE_INBOX_WORKERS", default=2)
+STRIPE_INBOX_LOTE = env.int("STRIPE_INBOX_LOTE", default=10)
+STRIPE_INBOX_INTERVALO = env.float("STRIPE_INBOX_INTERVALO", default=5.0)
+STRIPE_INBOX_MAX_REINTENTOS = env.int("STRIPE_INBOX_MAX_REINTENTOS", default=8)
+STRIPE_INBOX_BACKOFF_BASE = env.int("STRIPE_INBOX_BACKOFF_BASE", default=5)
+STRIPE_INBOX_BACKOFF_MAX = env.int("STRIPE_INBOX_BACKOFF_MAX", default=3600)
+STRIPE_INBOX_TIMEOUT_PROCESANDO = env.int("STRIPE_INBOX_TIMEOUT_PROCESANDO", default=600)
+# Pago cobrado sin stock: reembolsar automáticamente (si no, queda log crítico para hacerlo a mano)
+PAGOS_REEMBOLSO_AUTOMATICO = env.bool("PAGOS_REEMBOLSO_AUTOMATICO", default=True)
+# Cliente HTTP de Stripe (configurado una vez al arrancar, ver pagos/stripe_client.py)
+STRIPE_TIMEOUT = env.int("STRIPE_TIMEOUT", default=20)
+STRIPE_MAX_RETRIES = env.int("STRIPE_MAX_RETRIES", default=2)
+STRIPE_POOL_MAXSIZE = env.int("STRIPE_POOL_MAXSIZE", default=10)
+STRIPE_LATENCIA_LENTA_MS = env.int("STRIPE_LATENCIA_LENTA_MS", default=2000)
+
+# ====== Cache ======
+# Con varios workers (gunicorn) usar un cache compartido en memoria: CACHE_URL=redis://host:6379/1
+# (render.yaml lo toma del servicio Key Value). Con el locmem por defecto cada proceso
+# tiene su propio cache y la invalidación es local.
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://smartsales")}
+if env("CACHE_URL", default="").startswith(("redis://", "rediss://")):
+    # Backend de Redis de Django (no requiere django-redis)
+    CACHES["default"]["BACKEND"] = "django.core.cache.backends.redis.RedisCache"
+# Los caches que se invalidan al escribir (historial de pagos, dimensiones del catálogo,
+# id por correo) solo se activan por defecto con un cache compartido fuera de Postgres:
+# con locmem la invalidación no llega a los otros workers, y con dbcache un acierto
+# cuesta al menos dos consultas (token de versión + entrada), más que la consulta cacheada.
+CACHE_COMPARTIDO = any(b in CACHES["default"]["BACKEND"].lower() for b in ("redis", "memcache"))
+# Historial de pagos por usuario (se invalida con cada venta nueva)
+HISTORIAL_PAGOS_CACHE_TTL = env.int("HISTORIAL_PAGOS_CACHE_TTL", default=300 if CACHE_COMPARTIDO else 0)
+
+# ====== Búsqueda de productos ======
+# 'postgres' (pg_trgm + tsvector, migración 0004) o 'memoria' (índice en el proceso, p. ej. pruebas)
+BUSQUEDA_MOTOR = env("BUSQUEDA_MOTOR", default="postgres")
+BUSQUEDA_MEMORIA_TTL = env.int("BUSQUEDA_MEMORIA_TTL", default=60)
+# Cada cuántos segundos, como mucho, el typeahead del punto de venta revisa la versión del catálogo
+BUSQUEDA_TYPEAHEAD_REFRESCO = env.float("BUSQUEDA_TYPEAHEAD_REFRESCO", default=5.0)
+
+# ====== Paginación ======
+# TTL del total cacheado (count=cache) en los listados. Una lectura de cache reemplaza un
+# COUNT(*): conviene con cualquier backend, incluso dbcache o locmem (el total es aproximado)
+PAGINACION_COUNT_CACHE_TTL = env.int("PAGINACION_COUNT_CACHE_TTL", default=60)
+
+# ====== Dimensiones del catálogo ======
+# Marcas y tipos de producto cacheados (se invalidan al editarlos); sin cache compartido, desactivado
+DIMENSIONES_CACHE_TTL = env.int("DIMENSIONES_CACHE_TTL", default=3600 if CACHE_COMPARTIDO else 0)
+
+# ====== Importación / exportación de catálogo ======
+CATALOGO_IMPORT_MAX_FILAS = env.int("CATALOGO_IMPORT_MAX_FILAS", default=50000)
+CATALOGO_IMPORT_LOTE = env.int("CATALOGO_IMPORT_LOTE", default=1000)
+CATALOGO_IMPORT_MAX_MB = env.int("CATALOGO_IMPORT_MAX_MB", default=25)
+CATALOGO_EXPORT_LOTE = env.int("CATALOGO_EXPORT_LOTE", default=2000)
+# Carpeta de la plantilla de importación pre-renderizada (por defecto, el tmp del sistema)
+CATALOGO_PLANTILLA_DIR = env("CATALOGO_PLANTILLA_DIR", default=None)
+# Trabajos de importación en segundo plano (0 workers = solo el comando procesar_importaciones_catalogo)
+CATALOGO_IMPORT_WORKERS = env.int("CATALOGO_IMPORT_WORKERS", default=1)
+CATALOGO_IMPORT_INTERVALO = env.float("CATALOGO_IMPORT_INTERVALO", default=30.0)
+CATALOGO_IMPORT_TIMEOUT_PROCESANDO = env.int("CATALOGO_IMPORT_TIMEOUT_PROCESANDO", default=300)
+CATALOGO_IMPORT_MAX_INTENTOS = env.int("CATALOGO_IMPORT_MAX_INTENTOS", default=3)
+
+# ====== Venta manual ======
+# Carrito del vendedor: "db" (compartido entre procesos) o "memoria" (solo un proceso)
+VENTA_MANUAL_CARRITO_BACKEND = env("VENTA_MANUAL_CARRITO_BACKEND", default="db")
+VENTA_MANUAL_CARRITO_TTL = env.int("VENTA_MANUAL_CARRITO_TTL", default=8 * 3600)
+VENTA_MANUAL_CARRITO_PURGA_INTERVALO = env.int("VENTA_MANUAL_CARRITO_PURGA_INTERVALO", default=600)
+VENTA_MANUAL_CARRITO_MAX_MEMORIA = env.int("VENTA_MANUAL_CARRITO_MAX_MEMORIA", default=1000)
+
+# ====== Usuarios ======
+# Cache correo -> id de usuario (login y venta manual); sin cache compartido, desactivado
+USUARIO_CORREO_CACHE_TTL = env.int("USUARIO_CORREO_CACHE_TTL", default=3600 if CACHE_COMPARTIDO else 0)
@@ -53,6 +53,11 @@ def post_fork(server, worker):
     from django.db import connections
     connections.close_all()
 
+def post_worker_init(worker):
+    """Con la app ya cargada: arrancar los hilos de fondo (también en workers reciclados)"""
+    from smartsales.hilos import iniciar
+    iniciar()
+
 def worker_int(worker):
     """Cuando un worker recibe SIGINT"""
     from django.db import connections
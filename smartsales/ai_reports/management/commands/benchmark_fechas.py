@@ -0,0 +1,100 @@
+# smartsales/ai_reports/management/commands/benchmark_fechas.py
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from smartsales.ai_reports.services.timeparse import match_span, _parse_span_dateparser
+
+# Corpus de prompts: amplía con prompts reales (ai_report_telemetria)
+CORPUS = [
+    "ventas por marca en 2025",
+    "ventas del 01/02/2025 al 15/02/2025",
+    "ventas entre 2025-01-01 y 2025-03-31 de samsung",
+    "detalle de ventas 05/03/2025",
+    "ventas de enero a marzo de 2025",
+    "ventas de marzo",
+    "ventas de noviembre 2024",
+    "top productos q1 2025",
+    "ventas del segundo semestre de 2024",
+    "ticket promedio trimestre 3 del 2024",
+    "ventas de los últimos 3 meses",
+    "ventas de los ultimos 15 dias",
+    "ventas de ayer",
+    "ventas de hoy",
+    "ventas de este año por categoría",
+    "ventas del año pasado",
+    "ventas del mes pasado por cliente",
+    "ventas de esta semana",
+    "ventas del 1 al 15 de marzo",
+    "ventas del 15 de marzo de 2024",
+    "ventas por marca",
+    "top 10 productos",
+    "garantías por estado",
+]
+
+
+class Command(BaseCommand):
+    help = "Compara la gramática de fechas contra dateparser sobre un corpus de prompts (equivalencia y tiempos)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20,
+                            help='Veces que se repite el corpus para medir tiempos (default: 20)')
+        parser.add_argument('--con-telemetria', action='store_true',
+                            help='Agrega los prompts registrados en ai_report_telemetria al corpus')
+
+    def _corpus(self, options):
+        corpus = list(CORPUS)
+        if options['con_telemetria']:
+            from django.db import connection
+            with connection.cursor() as cur:
+                cur.execute("SELECT DISTINCT prompt FROM ai_report_telemetria LIMIT 2000")
+                corpus.extend(r[0] for r in cur.fetchall())
+        return corpus
+
+    def handle(self, *args, **options):
+        corpus = self._corpus(options)
+        reps = max(options['repeticiones'], 1)
+        today = date.today()
+
+        iguales, distintos, solo_gramatica, solo_dateparser = 0, [], 0, []
+        for prompt in corpus:
+            span = match_span(prompt, today)
+            g = (span.start, span.end) if span else None
+            d = _parse_span_dateparser(prompt, today)
+            if g and d:
+                if g == tuple(d):
+                    iguales += 1
+                else:
+                    distintos.append((prompt, g, d))
+            elif g:
+                solo_gramatica += 1
+            elif d:
+                solo_dateparser.append((prompt, d))
+
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            for prompt in corpus:
+                match_span(prompt, today)
+        t_gram = (time.perf_counter() - t0) / (reps * len(corpus))
+
+        t0 = time.perf_counter()
+        for prompt in corpus:
+            _parse_span_dateparser(prompt, today)
+        t_dp = (time.perf_counter() - t0) / len(corpus)
+
+        self.stdout.write(self.style.SUCCESS(f"== Corpus: {len(corpus)} prompts =="))
+        self.stdout.write(f"  Coinciden:              {iguales}")
+        self.stdout.write(f"  Difieren:               {len(distintos)}")
+        self.stdout.write(f"  Solo gramática:         {solo_gramatica}")
+        self.stdout.write(f"  Solo dateparser:        {len(solo_dateparser)}")
+        for prompt, g, d in distintos:
+            self.stdout.write(self.style.WARNING(f"    ≠ {prompt!r}: gramática={g} dateparser={d}"))
+        for prompt, d in solo_dateparser:
+            self.stdout.write(self.style.WARNING(f"    ? {prompt!r}: dateparser={d}"))
+
+        self.stdout.write(self.style.SUCCESS("== Tiempo medio por prompt =="))
+        self.stdout.write(f"  Gramática:   {t_gram * 1e6:10.1f} µs")
+        self.stdout.write(f"  dateparser:  {t_dp * 1e6:10.1f} µs")
+        if t_gram > 0:
+            self.stdout.write(self.style.SUCCESS(f"  Speedup:     {t_dp / t_gram:10.1f}x"))
@@ -31,9 +31,33 @@ TRAIN = [
 class Command(BaseCommand):
     help = "Entrena el clasificador de intenciones para ai_reports y guarda models/intent_clf.joblib"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--con-telemetria',
+            action='store_true',
+            help='Agrega los prompts reales registrados en ai_report_telemetria (con resultados y sin error)'
+        )
+
+    def _prompts_telemetria(self):
+        from django.db import connection
+        with connection.cursor() as cur:
+            cur.execute("""
+                SELECT DISTINCT ON (lower(prompt)) lower(prompt), intent
+                FROM ai_report_telemetria
+                WHERE error IS NULL AND intent IS NOT NULL AND n_filas > 0
+                ORDER BY lower(prompt), creado_en DESC
+            """)
+            return [(r[0], r[1]) for r in cur.fetchall()]
+
     def handle(self, *args, **options):
-        X = [t for t, _ in TRAIN]
-        y = [l for _, l in TRAIN]
+        data = list(TRAIN)
+        if options['con_telemetria']:
+            extra = self._prompts_telemetria()
+            self.stdout.write(f"Prompts desde telemetría: {len(extra)}")
+            data.extend(extra)
+
+        X = [t for t, _ in data]
+        y = [l for _, l in data]
 
         pipe = Pipeline([
             ("tfidf", TfidfVectorizer(ngram_range=(1, 2), analyzer="char_wb", lowercase=True)),
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS ai_report_telemetria (
+                    id               BIGSERIAL PRIMARY KEY,
+                    creado_en        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    prompt           TEXT NOT NULL,
+                    formato          VARCHAR(12),
+                    intent           VARCHAR(60),
+                    filtros          JSONB,
+                    n_filas          INTEGER,
+                    error            TEXT,
+                    t_classify_ms    REAL,
+                    t_date_parse_ms  REAL,
+                    t_ner_ms         REAL,
+                    t_fuzzy_ms       REAL,
+                    t_sql_build_ms   REAL,
+                    t_sql_execute_ms REAL,
+                    t_serialize_ms   REAL,
+                    t_total_ms       REAL
+                );
+                CREATE INDEX IF NOT EXISTS ai_report_telemetria_creado_en_idx
+                    ON ai_report_telemetria (creado_en);
+            """,
+            reverse_sql="DROP TABLE IF EXISTS ai_report_telemetria;",
+        ),
+    ]
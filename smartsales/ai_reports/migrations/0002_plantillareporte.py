@@ -0,0 +1,35 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Estado del modelo PlantillaReporte (managed=False: la tabla plantilla_reporte
+    ya existe y Django no la crea). Sin esta migración makemigrations --check
+    reporta un cambio pendiente en la app.
+    """
+
+    dependencies = [
+        ('ai_reports', '0001_telemetria'),
+        ('smartsales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlantillaReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=120)),
+                ('prompt', models.TextField()),
+                ('formato', models.CharField(blank=True, max_length=12, null=True)),
+                ('filtros', models.JSONField(blank=True, null=True)),
+                ('creado_en', models.DateTimeField()),
+                ('actualizado_en', models.DateTimeField()),
+                ('usuario', models.ForeignKey(db_column='usuario_id', on_delete=django.db.models.deletion.CASCADE, to='smartsales.usuario')),
+            ],
+            options={
+                'db_table': 'plantilla_reporte',
+                'managed': False,
+            },
+        ),
+    ]
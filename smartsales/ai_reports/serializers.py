@@ -9,6 +9,9 @@ class RunAudioSerializer(serializers.Serializer):
     audio   = serializers.FileField()
     formato = serializers.ChoiceField(choices=['json','csv','xlsx'], default='json')
 
+class TelemetriaResumenQuerySerializer(serializers.Serializer):
+    dias = serializers.IntegerField(min_value=1, max_value=90, default=7)
+
 class PlantillaReporteSerializer(serializers.ModelSerializer):
     class Meta:
         model = PlantillaReporte
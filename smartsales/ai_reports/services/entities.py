@@ -1,27 +1,96 @@
+import re
+import unicodedata
+from collections import Counter
+
 from rapidfuzz import process, fuzz
 from django.db import connection
+from . import telemetry
+
+# Catálogos con más nombres que esto usan bloqueo por trigramas antes de puntuar
+MIN_BLOQUEO = 2000
+# Máximo de candidatos (por consulta) que pasan del bloqueo al scorer
+MAX_CANDIDATOS = 500
 
 def _fetch_list(sql):
     with connection.cursor() as cur:
         cur.execute(sql)
         return [r[0] for r in cur.fetchall()]
 
+def normalizar(s: str) -> str:
+    """minúsculas, sin acentos y con espacios colapsados."""
+    s = unicodedata.normalize('NFD', s or '')
+    s = ''.join(c for c in s if unicodedata.category(c) != 'Mn')
+    return re.sub(r'\s+', ' ', s.lower()).strip()
+
+def _trigramas(s: str):
+    s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class ChoiceIndex:
+    """
+    Nombres de un catálogo ya normalizados, con índice invertido de trigramas.
+    Se construye una sola vez por proceso; las consultas solo puntúan candidatos.
+    """
+
+    def __init__(self, nombres):
+        self.originales = [n for n in nombres if n]
+        self.normalizados = [normalizar(n) for n in self.originales]
+        self.trigramas = {}
+        if len(self.originales) >= MIN_BLOQUEO:
+            for i, n in enumerate(self.normalizados):
+                for t in _trigramas(n):
+                    self.trigramas.setdefault(t, []).append(i)
+
+    def __len__(self):
+        return len(self.originales)
+
+    def candidatos(self, consulta: str):
+        """Índices a puntuar para la consulta (normalizada): todos o los que más trigramas comparten."""
+        if not self.trigramas:
+            return range(len(self.originales))
+        votos = Counter()
+        for t in _trigramas(consulta):
+            votos.update(self.trigramas.get(t, ()))
+        return [i for i, _ in votos.most_common(MAX_CANDIDATOS)]
+
+
 CAT = None
 def ensure_catalogs():
     global CAT
     if CAT is None:
         CAT = {
-            "marca":     _fetch_list("SELECT nombre FROM marca"),
-            "categoria": _fetch_list("SELECT nombre FROM tipoproducto"),
-            "producto":  _fetch_list("SELECT nombre FROM producto"),
-            "cliente":   _fetch_list("SELECT nombre FROM usuario"),
+            "marca":     ChoiceIndex(_fetch_list("SELECT nombre FROM marca")),
+            "categoria": ChoiceIndex(_fetch_list("SELECT nombre FROM tipoproducto")),
+            "producto":  ChoiceIndex(_fetch_list("SELECT nombre FROM producto")),
+            "cliente":   ChoiceIndex(_fetch_list("SELECT nombre FROM usuario")),
         }
     return CAT
 
+def fuzzy_match_batch(consultas: dict, score_cutoff=83):
+    """
+    Resuelve en un solo paso todas las entidades de un prompt.
+    consultas: {kind: texto}. Devuelve {kind: nombre_del_catálogo} solo para las que coinciden.
+    """
+    cats = ensure_catalogs()
+    resultado = {}
+    with telemetry.stage('fuzzy'):
+        # Un cdist por tipo, solo contra los candidatos de ese tipo
+        for kind, texto in consultas.items():
+            idx = cats.get(kind)
+            q = normalizar(texto)
+            if not q or not idx:
+                continue
+            cand = idx.candidatos(q)
+            if not cand:
+                continue
+            choices = [idx.normalizados[i] for i in cand]
+            scores = process.cdist([q], choices, scorer=fuzz.WRatio, score_cutoff=score_cutoff)[0]
+            mejor = int(scores.argmax())
+            if scores[mejor] >= score_cutoff:
+                resultado[kind] = idx.originales[cand[mejor]]
+    return resultado
+
 def fuzzy_find(kind: str, text: str, score_cutoff=83):
     if not text: return None
-    cats = ensure_catalogs()
-    choices = cats.get(kind, [])
-    if not choices: return None
-    match = process.extractOne(text, choices, scorer=fuzz.WRatio, score_cutoff=score_cutoff)
-    return match[0] if match else None
+    return fuzzy_match_batch({kind: text}, score_cutoff).get(kind)
@@ -0,0 +1,206 @@
+"""
+Telemetría de ai_reports: tiempos por etapa de cada reporte.
+
+Cada ejecución de RunReportView abre una traza (ReportTrace) que acumula
+milisegundos por etapa (clasificación, fechas, NER, fuzzy, SQL, serialización).
+Las trazas terminadas se guardan en un buffer en memoria y un hilo de fondo
+las escribe por lotes en la tabla ai_report_telemetria, así el request no
+espera al INSERT.
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.db import connection
+
+from smartsales.hilos import PoolHilos, pool
+
+logger = logging.getLogger(__name__)
+
+STAGES = (
+    "classify",
+    "date_parse",
+    "ner",
+    "fuzzy",
+    "sql_build",
+    "sql_execute",
+    "serialize",
+)
+
+_local = threading.local()
+
+
+def _enabled() -> bool:
+    return getattr(settings, "AI_REPORTS_TELEMETRIA", True)
+
+
+class ReportTrace:
+    """Acumula tiempos (ms) por etapa y el resultado final de un reporte."""
+
+    def __init__(self, prompt: str, formato: str | None = None):
+        self.prompt = prompt or ""
+        self.formato = formato
+        self.intent = None
+        self.filtros = None
+        self.n_filas = None
+        self.error = None
+        self.tiempos = dict.fromkeys(STAGES, 0.0)
+        self._t0 = time.perf_counter()
+        self.total_ms = None
+
+    @contextmanager
+    def stage(self, nombre: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tiempos[nombre] = self.tiempos.get(nombre, 0.0) + (time.perf_counter() - t) * 1000
+
+    def cerrar(self):
+        if self.total_ms is None:
+            self.total_ms = (time.perf_counter() - self._t0) * 1000
+
+    def as_row(self):
+        filtros = None
+        if self.filtros:
+            filtros = json.dumps(self.filtros, default=str, ensure_ascii=False)
+        return [
+            self.prompt, self.formato, self.intent, filtros, self.n_filas, self.error,
+            *[round(self.tiempos[s], 3) for s in STAGES],
+            round(self.total_ms or 0.0, 3),
+        ]
+
+
+# ---------- traza activa del hilo ----------
+def start(prompt: str, formato: str | None = None) -> ReportTrace | None:
+    if not _enabled():
+        return None
+    trace = ReportTrace(prompt, formato)
+    _local.trace = trace
+    return trace
+
+
+def current() -> ReportTrace | None:
+    return getattr(_local, "trace", None)
+
+
+def stage(nombre: str):
+    """Context manager para medir una etapa; no hace nada si no hay traza activa."""
+    trace = current()
+    return trace.stage(nombre) if trace else nullcontext()
+
+
+def finish(trace: ReportTrace | None):
+    if trace is None:
+        return
+    if current() is trace:
+        _local.trace = None
+    trace.cerrar()
+    _writer().add(trace.as_row())
+
+
+# ---------- escritura asíncrona por lotes ----------
+_COLUMNS = (
+    ["prompt", "formato", "intent", "filtros", "n_filas", "error"]
+    + [f"t_{s}_ms" for s in STAGES]
+    + ["t_total_ms"]
+)
+
+_INSERT_SQL = (
+    f"INSERT INTO ai_report_telemetria ({', '.join(_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(_COLUMNS))})"
+)
+
+
+class _TelemetryWriter:
+    def __init__(self, batch_size: int, intervalo: float):
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._hilo = PoolHilos("ai-telemetria", self.flush, workers=1, intervalo=intervalo)
+
+    def add(self, row):
+        with self._lock:
+            self._buffer.append(row)
+            lleno = len(self._buffer) >= self.batch_size
+        self._hilo.despertar(avisar=lleno)
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        try:
+            with connection.cursor() as cur:
+                cur.executemany(_INSERT_SQL, rows)
+            return len(rows)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar telemetría de ai_reports ({len(rows)} filas): {e}")
+            return 0
+
+
+def _writer() -> _TelemetryWriter:
+    return pool("ai-telemetria", lambda: _TelemetryWriter(
+        batch_size=getattr(settings, "AI_REPORTS_TELEMETRIA_LOTE", 50),
+        intervalo=getattr(settings, "AI_REPORTS_TELEMETRIA_INTERVALO", 5.0),
+    ))
+
+
+def flush() -> int:
+    """Escribe inmediatamente lo pendiente en el buffer (usado por el resumen)."""
+    return _writer().flush()
+
+
+atexit.register(flush)
+
+
+# ---------- resumen p50/p95 ----------
+def summary(desde):
+    """
+    Devuelve p50/p95 por etapa, global y por intent, desde la fecha indicada.
+    """
+    cols = [f"t_{s}_ms" for s in STAGES] + ["t_total_ms"]
+    pct = ",\n".join(
+        f"percentile_cont(0.5) WITHIN GROUP (ORDER BY {c}), "
+        f"percentile_cont(0.95) WITHIN GROUP (ORDER BY {c})"
+        for c in cols
+    )
+    sql = f"""
+        SELECT GROUPING(intent) AS es_total, intent, COUNT(*) AS n,
+               AVG(n_filas) AS filas_prom,
+               {pct}
+        FROM ai_report_telemetria
+        WHERE creado_en >= %s
+        GROUP BY GROUPING SETS ((intent), ())
+        ORDER BY es_total DESC, n DESC
+    """
+    with connection.cursor() as cur:
+        cur.execute(sql, [desde])
+        rows = cur.fetchall()
+
+    etapas = list(STAGES) + ["total"]
+    resultado = {"desde": desde, "global": None, "por_intent": []}
+    for row in rows:
+        es_total, intent, n, filas_prom = row[:4]
+        valores = row[4:]
+        item = {
+            "n": n,
+            "filas_promedio": float(filas_prom) if filas_prom is not None else None,
+            "etapas": {
+                e: {
+                    "p50": round(valores[2 * i], 2) if valores[2 * i] is not None else None,
+                    "p95": round(valores[2 * i + 1], 2) if valores[2 * i + 1] is not None else None,
+                }
+                for i, e in enumerate(etapas)
+            },
+        }
+        if es_total:
+            resultado["global"] = item
+        else:
+            item["intent"] = intent
+            resultado["por_intent"].append(item)
+    return resultado
@@ -1,26 +1,312 @@
-from datetime import date, timedelta
+"""
+Gramática determinista de rangos de fechas en español.
+
+Una sola expresión regular compilada reconoce las formas que usan los prompts:
+  - fechas LATAM (DD/MM/AAAA, DD-MM-AA) e ISO (AAAA-MM-DD), sueltas o en rango
+  - "15 de marzo de 2025", "del 1 al 15 de marzo"
+  - meses ("enero", "de enero a marzo 2025")
+  - trimestres / cuatrimestres / semestres ("Q1 2025", "segundo semestre")
+  - relativas ("hoy", "ayer", "este mes", "año pasado", "últimos 3 meses")
+  - años sueltos ("en 2024")
+
+dateparser solo se usa como último recurso, cuando la gramática no reconoce nada
+y el texto tiene alguna pista de fecha que ella no cubre ("hace 2 semanas", ...).
+"""
+import re
+import unicodedata
 from calendar import monthrange
-from dateparser.search import search_dates
-import dateparser
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+SPANISH_MONTHS = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+    'julio': 7, 'agosto': 8, 'septiembre': 9, 'setiembre': 9,
+    'octubre': 10, 'noviembre': 11, 'diciembre': 12
+}
 
-MONTH_WORDS = {
-    'enero','febrero','marzo','abril','mayo','junio','julio',
-    'agosto','septiembre','setiembre','octubre','noviembre','diciembre','mes'
+ORDINALES = {
+    'primer': 1, 'primero': 1, '1er': 1,
+    'segundo': 2, '2do': 2,
+    'tercer': 3, 'tercero': 3, '3er': 3,
+    'cuarto': 4, '4to': 4,
 }
 
+# (meses por periodo, cantidad de periodos en el año)
+PERIODOS = {'trimestre': (3, 4), 'cuatrimestre': (4, 3), 'semestre': (6, 2)}
+
+MONTH_WORDS = set(SPANISH_MONTHS) | {'mes'}
+
+# start/end: end es exclusivo. resto: texto sin las fechas numéricas explícitas.
+DateSpan = namedtuple('DateSpan', 'start end regla resto')
+
+# ---------- gramática ----------
+_MES = '|'.join(sorted(SPANISH_MONTHS, key=len, reverse=True))
+_ORD = '|'.join(sorted(ORDINALES, key=len, reverse=True))
+_CONECTOR = r'\s*(?:al|a|hasta|y|-|–|—)\s*(?:el\s+)?'
+_LATAM = r'(?<!\d)\d{1,2}[/-]\d{1,2}[/-](?:\d{4}|\d{2})(?!\d)'
+_ISO = r'(?<!\d)\d{4}-\d{1,2}-\d{1,2}(?!\d)'
+_ANIO = r'(?:19|20)\d{2}'
+_DE = r'\s+(?:de\s+|del\s+)?'
+
+_GRAMMAR = re.compile(rf"""
+    (?P<iso_rango>(?P<ir1>{_ISO}){_CONECTOR}(?P<ir2>{_ISO}))
+  | (?P<latam_rango>(?P<lr1>{_LATAM}){_CONECTOR}(?P<lr2>{_LATAM}))
+  | (?P<iso>{_ISO})
+  | (?P<latam>{_LATAM})
+  | (?P<dias_mes>\b(?P<dd1>\d{{1,2}})\s*(?:al|a|-)\s*(?P<dd2>\d{{1,2}})\s+de\s+(?P<ddm>{_MES})\b
+        (?:\s+(?:de|del)\s+(?P<dd_anio>{_ANIO})\b)?)
+  | (?P<dia_mes>\b(?P<dm_dia>\d{{1,2}})\s+de\s+(?P<dm_mes>{_MES})\b(?:\s+(?:de|del)\s+(?P<dm_anio>{_ANIO})\b)?)
+  | (?P<ultimos>\bultim[oa]s?\s+(?:(?P<ult_n>\d{{1,3}})\s+)?
+        (?P<ult_u>dias?|semanas?|mes(?:es)?|anios?|anos?|trimestres?)\b)
+  | (?P<este>\b(?:este|esta)\s+(?P<este_u>semana|mes|anio|ano|trimestre|cuatrimestre|semestre)\b)
+  | (?P<pasado>\b(?P<pas_u>semana|mes|anio|ano|trimestre|cuatrimestre|semestre)\s+(?:pasad[oa]|anterior)\b)
+  | (?P<hoy>\bhoy\b)
+  | (?P<ayer>\b(?:anteayer|antier|ayer)\b)
+  | (?P<periodo>\b(?:
+          (?P<p_letra>[qt])(?P<p_num>[1-4])
+        | (?P<p_ord>{_ORD})\s+(?P<p_tipo1>trimestre|cuatrimestre|semestre)
+        | (?P<p_tipo2>trimestre|cuatrimestre|semestre)\s+(?P<p_num2>[1-4])
+      )\b(?:{_DE}(?P<p_anio>{_ANIO})\b)?)
+  | (?P<mes>\b(?P<mes_nombre>{_MES})\b(?:{_DE}(?P<mes_anio>{_ANIO})\b)?)
+  | (?P<anio>\b{_ANIO}\b)
+""", re.VERBOSE)
+
+_TIPOS = (
+    'iso_rango', 'latam_rango', 'iso', 'latam', 'dias_mes', 'dia_mes', 'ultimos', 'este',
+    'pasado', 'hoy', 'ayer', 'periodo', 'mes', 'anio',
+)
+
+# Pistas de fecha que la gramática no cubre y justifican llamar a dateparser
+_PISTA_DATEPARSER = re.compile(
+    r'\b(?:hace|desde|hasta|entre|manana|lunes|martes|miercoles|jueves|viernes|sabado|domingo'
+    r'|ene|feb|mar|abr|jun|jul|ago|sept?|oct|nov|dic)\b'
+)
+
+
+def _fold(text: str) -> str:
+    """Minúsculas sin acentos, conservando la longitud (los offsets siguen valiendo)."""
+    out = []
+    for c in text:
+        base = unicodedata.normalize('NFD', c.lower())[:1]
+        out.append(base or c)
+    return ''.join(out)
+
+
+def _tipo(m) -> str:
+    for t in _TIPOS:
+        if m.group(t) is not None:
+            return t
+    return ''
+
+
+# ---------- helpers de calendario ----------
 def _month_span(d: date):
     last = monthrange(d.year, d.month)[1]
     return date(d.year, d.month, 1), date(d.year, d.month, last) + timedelta(days=1)
 
-def parse_span(text: str):
+
+def _add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    y += d.year
+    m += 1
+    return date(y, m, min(d.day, monthrange(y, m)[1]))
+
+
+def _period_span(tipo: str, num: int, yy: int):
+    meses, cantidad = PERIODOS[tipo]
+    num = min(max(num, 1), cantidad)
+    start = date(yy, meses * (num - 1) + 1, 1)
+    return start, _add_months(start, meses)
+
+
+def _current_period(tipo: str, today: date):
+    meses, _ = PERIODOS[tipo]
+    return (today.month - 1) // meses + 1
+
+
+def _parse_year(y: str) -> int:
+    yy = int(y)
+    if yy < 100:
+        # Heurística simple: 00-49 => 2000+, 50-99 => 1900+
+        yy = 2000 + yy if yy <= 49 else 1900 + yy
+    return yy
+
+
+def _parse_day(s: str) -> date | None:
+    parts = re.split(r'[/-]', s)
+    try:
+        if len(parts[0]) == 4:   # ISO
+            return date(int(parts[0]), int(parts[1]), int(parts[2]))
+        return date(_parse_year(parts[2]), int(parts[1]), int(parts[0]))
+    except (ValueError, IndexError):
+        return None
+
+
+def _unit(u: str) -> str:
+    u = u.rstrip('s') if not u.startswith('mes') else 'mes'
+    return {'ano': 'anio', 'dia': 'dia'}.get(u, u)
+
+
+# ---------- reglas ----------
+def _relative_span(m, today: date):
+    t = _tipo(m)
+    if t == 'hoy':
+        return today, today + timedelta(days=1)
+    if t == 'ayer':
+        dias = 2 if m.group('ayer') in ('anteayer', 'antier') else 1
+        d = today - timedelta(days=dias)
+        return d, d + timedelta(days=1)
+    if t == 'ultimos':
+        n = int(m.group('ult_n') or 1)
+        u = _unit(m.group('ult_u'))
+        end = today + timedelta(days=1)
+        if u == 'dia':
+            return today - timedelta(days=n), end
+        if u == 'semana':
+            return today - timedelta(weeks=n), end
+        meses = {'mes': 1, 'trimestre': 3, 'anio': 12}[u] * n
+        return _add_months(today, -meses), end
+
+    u = _unit(m.group('este_u') if t == 'este' else m.group('pas_u'))
+    atras = 0 if t == 'este' else 1
+    if u == 'semana':
+        lunes = today - timedelta(days=today.weekday()) - timedelta(weeks=atras)
+        return lunes, lunes + timedelta(days=7)
+    if u == 'mes':
+        return _month_span(_add_months(today.replace(day=1), -atras))
+    if u == 'anio':
+        return date(today.year - atras, 1, 1), date(today.year - atras + 1, 1, 1)
+    num = _current_period(u, today)
+    start, end = _period_span(u, num, today.year)
+    if atras:
+        meses, _ = PERIODOS[u]
+        start, end = _add_months(start, -meses), start
+    return start, end
+
+
+def match_span(text: str, today: date | None = None) -> DateSpan | None:
     """
-    Devuelve (start_date, end_exclusive) si puede inferir un rango.
-    Usa español por defecto.
+    Aplica la gramática y devuelve el rango más específico encontrado,
+    o None si el texto no contiene fechas reconocibles.
     """
+    today = today or date.today()
+    src = unicodedata.normalize('NFC', text or '')
+    folded = _fold(src)
+
+    matches = {}
+    for m in _GRAMMAR.finditer(folded):
+        matches.setdefault(_tipo(m), []).append(m)
+    if not matches:
+        return None
+
+    def resto(*ms):
+        out = src
+        for m in sorted(ms, key=lambda x: x.start(), reverse=True):
+            out = out[:m.start()] + ' ' + out[m.end():]
+        return out
+
+    # Año "de contexto" para meses/periodos sin año pegado
+    def year_hint():
+        if 'anio' in matches:
+            return int(matches['anio'][0].group(0))
+        for m in matches.get('pasado', []):
+            if _unit(m.group('pas_u')) == 'anio':
+                return today.year - 1
+        return today.year
+
+    # 1) rango explícito DD/MM/AAAA al DD/MM/AAAA (o ISO)
+    for tipo, g1, g2 in (('latam_rango', 'lr1', 'lr2'), ('iso_rango', 'ir1', 'ir2')):
+        for m in matches.get(tipo, []):
+            s, e = _parse_day(m.group(g1)), _parse_day(m.group(g2))
+            if s and e:
+                if e < s:
+                    s, e = e, s
+                return DateSpan(s, e + timedelta(days=1), tipo, resto(m))
+    for m in matches.get('dias_mes', []):
+        yy = int(m.group('dd_anio')) if m.group('dd_anio') else year_hint()
+        mm = SPANISH_MONTHS[m.group('ddm')]
+        try:
+            s, e = sorted((date(yy, mm, int(m.group('dd1'))), date(yy, mm, int(m.group('dd2')))))
+        except ValueError:
+            continue
+        return DateSpan(s, e + timedelta(days=1), 'dias_mes', src)
+
+    # 2) días sueltos: dos o más => rango min..max; uno => ese día
+    dias, numericos = [], []
+    for tipo in ('latam', 'iso'):
+        for m in matches.get(tipo, []):
+            d = _parse_day(m.group(0))
+            if d:
+                dias.append(d)
+                numericos.append(m)
+    for m in matches.get('dia_mes', []):
+        yy = int(m.group('dm_anio')) if m.group('dm_anio') else year_hint()
+        try:
+            dias.append(date(yy, SPANISH_MONTHS[m.group('dm_mes')], int(m.group('dm_dia'))))
+        except ValueError:
+            pass
+    if dias:
+        regla = 'dias' if len(dias) > 1 else 'dia'
+        return DateSpan(min(dias), max(dias) + timedelta(days=1), regla, resto(*numericos))
+
+    # 3) meses (uno o varios): del primero al último mencionado
+    if 'mes' in matches:
+        ms = matches['mes']
+        m1 = SPANISH_MONTHS[ms[0].group('mes_nombre')]
+        m2 = SPANISH_MONTHS[ms[-1].group('mes_nombre')]
+        # Cada extremo usa su propio año ("marzo 2024 a mayo 2025"); si falta, se deduce del otro
+        a1 = int(ms[0].group('mes_anio')) if ms[0].group('mes_anio') else None
+        a2 = int(ms[-1].group('mes_anio')) if ms[-1].group('mes_anio') else None
+        if a1 is not None and a2 is not None:
+            y1, y2 = a1, a2
+        elif a1 is not None:
+            y1 = a1
+            y2 = y1 + 1 if m2 < m1 else y1     # "de noviembre 2024 a febrero"
+        else:
+            y2 = a2 if a2 is not None else year_hint()
+            y1 = y2 - 1 if m2 < m1 else y2     # "de noviembre a febrero 2025"
+        if (y2, m2) < (y1, m1):
+            (y1, m1), (y2, m2) = (y2, m2), (y1, m1)
+        return DateSpan(date(y1, m1, 1), _month_span(date(y2, m2, 1))[1], 'meses', src)
+
+    # 4) trimestre / cuatrimestre / semestre
+    if 'periodo' in matches:
+        m = matches['periodo'][0]
+        if m.group('p_letra'):
+            tipo, num = 'trimestre', int(m.group('p_num'))
+        elif m.group('p_ord'):
+            tipo, num = m.group('p_tipo1'), ORDINALES[m.group('p_ord')]
+        else:
+            tipo, num = m.group('p_tipo2'), int(m.group('p_num2'))
+        yy = int(m.group('p_anio')) if m.group('p_anio') else year_hint()
+        s, e = _period_span(tipo, num, yy)
+        return DateSpan(s, e, tipo, src)
+
+    # 5) relativas
+    for tipo in ('ultimos', 'este', 'pasado', 'hoy', 'ayer'):
+        if tipo in matches:
+            s, e = _relative_span(matches[tipo][0], today)
+            return DateSpan(s, e, tipo, src)
+
+    # 6) años sueltos (lo reconocido puede ser solo una fecha inválida, p. ej. "31/02/2025")
+    if 'anio' not in matches:
+        return None
+    anios = sorted(int(m.group(0)) for m in matches['anio'])
+    return DateSpan(date(anios[0], 1, 1), date(anios[-1] + 1, 1, 1), 'anio', src)
+
+
+# ---------- último recurso: dateparser ----------
+def _parse_span_dateparser(text: str, today: date | None = None):
+    from dateparser.search import search_dates
+    import dateparser
+
     txt = (text or "").lower()
+    opts = {}
+    if today:
+        opts['RELATIVE_BASE'] = datetime(today.year, today.month, today.day)
 
     # 1) dos o más fechas explícitas en el texto
-    found = search_dates(txt, languages=['es'])
+    found = search_dates(txt, languages=['es'], settings=opts or None)
     if found and len(found) >= 2:
         d1 = found[0][1].date()
         d2 = found[-1][1].date()
@@ -28,7 +314,7 @@ def parse_span(text: str):
         return d1, d2 + timedelta(days=1)
 
     # 2) una sola fecha/frase -> heurística mes/año
-    d = dateparser.parse(txt, languages=['es'])
+    d = dateparser.parse(txt, languages=['es'], settings=opts or None)
     if d:
         d = d.date()
         if any(w in txt for w in MONTH_WORDS):
@@ -37,3 +323,16 @@ def parse_span(text: str):
             return date(d.year,1,1), date(d.year+1,1,1)
 
     return None
+
+
+def parse_span(text: str, today: date | None = None):
+    """
+    Devuelve (start_date, end_exclusive) si puede inferir un rango.
+    Usa español por defecto.
+    """
+    span = match_span(text, today)
+    if span:
+        return span.start, span.end
+    if _PISTA_DATEPARSER.search(_fold(text or "")):
+        return _parse_span_dateparser(text, today)
+    return None
@@ -1,7 +1,11 @@
-from django.test import TestCase
+from datetime import date
+
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
 from rest_framework.test import APIClient
 
+from .services.timeparse import match_span
+
 class AiReportsSmokeTest(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -11,3 +15,40 @@ class AiReportsSmokeTest(TestCase):
         r = self.client.post(url, {'prompt': 'ventas por marca en 2025', 'formato': 'json'}, format='json')
         self.assertEqual(r.status_code, 200)
         self.assertIn('rows', r.data)
+
+
+class TimeparseGrammarTest(SimpleTestCase):
+    """La gramática de fechas devuelve rangos [start, end) sin depender de dateparser."""
+    hoy = date(2025, 6, 18)
+
+    def assertSpan(self, prompt, start, end):
+        span = match_span(prompt, self.hoy)
+        self.assertIsNotNone(span, prompt)
+        self.assertEqual((span.start, span.end), (start, end), prompt)
+
+    def test_rangos_explicitos(self):
+        self.assertSpan('ventas del 01/02/2025 al 15/02/2025', date(2025, 2, 1), date(2025, 2, 16))
+        self.assertSpan('ventas del 1 al 15 de marzo', date(2025, 3, 1), date(2025, 3, 16))
+
+    def test_meses_y_periodos(self):
+        self.assertSpan('ventas de enero a marzo de 2025', date(2025, 1, 1), date(2025, 4, 1))
+        self.assertSpan('ventas de noviembre 2024', date(2024, 11, 1), date(2024, 12, 1))
+        self.assertSpan('top productos q1 2025', date(2025, 1, 1), date(2025, 4, 1))
+
+    def test_meses_entre_anios(self):
+        self.assertSpan('ventas de marzo 2024 a mayo 2025', date(2024, 3, 1), date(2025, 6, 1))
+        self.assertSpan('ventas de noviembre a febrero 2025', date(2024, 11, 1), date(2025, 3, 1))
+        self.assertSpan('ventas de noviembre 2024 a febrero', date(2024, 11, 1), date(2025, 3, 1))
+
+    def test_relativos(self):
+        self.assertSpan('ventas de ayer', date(2025, 6, 17), date(2025, 6, 18))
+        self.assertSpan('ventas de los últimos 3 meses', date(2025, 3, 18), date(2025, 6, 19))
+
+    def test_sin_fecha(self):
+        self.assertIsNone(match_span('ventas por marca', self.hoy))
+        self.assertIsNone(match_span('top 10 productos', self.hoy))
+
+    def test_fechas_invalidas(self):
+        for prompt in ('ventas 31/02/2025', 'ventas del 30 de febrero', 'ventas 2025-13-45',
+                       'ventas del 40 al 45 de marzo'):
+            self.assertIsNone(match_span(prompt, self.hoy), prompt)
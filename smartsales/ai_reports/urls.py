@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import RunReportView, RunAudioReportView, PlantillaReporteViewSet
+from .views import RunReportView, RunAudioReportView, PlantillaReporteViewSet, TelemetriaResumenView
 
 router = DefaultRouter()
 router.register(r'plantillas', PlantillaReporteViewSet, basename='plantillas')
@@ -9,5 +9,6 @@ router.register(r'plantillas', PlantillaReporteViewSet, basename='plantillas')
 urlpatterns = [
     path('run', RunReportView.as_view(), name='ai_reports_run'),
     path('run-audio', RunAudioReportView.as_view(), name='ai_reports_run_audio'),
+    path('telemetria/resumen', TelemetriaResumenView.as_view(), name='ai_reports_telemetria_resumen'),
     path('', include(router.urls)),   # <-- aquí agregas el router
 ]
\ No newline at end of file
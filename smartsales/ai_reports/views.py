@@ -2,10 +2,15 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions, viewsets, exceptions
 from django.utils import timezone
+from datetime import timedelta
 
-from .serializers import RunReportSerializer, RunAudioSerializer, PlantillaReporteSerializer
+from smartsales.rolesusuario.permissions import role_required, ROLE_ADMIN_NAME, ROLE_ANALISTA_NAME
+from .serializers import (
+    RunReportSerializer, RunAudioSerializer, PlantillaReporteSerializer, TelemetriaResumenQuerySerializer
+)
 from .services.nlu import detect_intent
 from .services.runner import run_sql
+from .services import telemetry
 from .models import PlantillaReporte
 
 import io
@@ -21,27 +26,75 @@ class RunReportView(APIView):
         prompt = ser.validated_data['prompt']
         formato = ser.validated_data['formato']
 
-        parsed = detect_intent(prompt)
-        result = run_sql(parsed['intent'], parsed['start'], parsed['end'], filters=parsed.get('filters'))
+        # La traza se cierra en finalize_response, después de renderizar
+        self._trace = telemetry.start(prompt, formato)
+
+        try:
+            parsed = detect_intent(prompt)
+            result = run_sql(parsed['intent'], parsed['start'], parsed['end'], filters=parsed.get('filters'))
+        except Exception as e:
+            # Las excepciones no controladas no pasan por finalize_response
+            if self._trace:
+                self._trace.error = str(e)[:500]
+                telemetry.finish(self._trace)
+                self._trace = None
+            raise
+
+        if self._trace:
+            self._trace.intent = result['intent']
+            self._trace.filtros = result['filters']
+            self._trace.n_filas = len(result['rows'])
 
         if formato == 'json':
             return Response(result, status=status.HTTP_200_OK)
 
-        df = pd.DataFrame(result['rows'])
-        if formato == 'csv':
-            buf = io.StringIO()
-            df.to_csv(buf, index=False)
-            data = buf.getvalue().encode('utf-8')
-            return Response(data, content_type='text/csv')
+        with telemetry.stage('serialize'):
+            df = pd.DataFrame(result['rows'])
+            if formato == 'csv':
+                buf = io.StringIO()
+                df.to_csv(buf, index=False)
+                data = buf.getvalue().encode('utf-8')
+                return Response(data, content_type='text/csv')
 
-        if formato == 'xlsx':
-            out = io.BytesIO()
-            with pd.ExcelWriter(out, engine='openpyxl') as xw:
-                df.to_excel(xw, index=False, sheet_name='Reporte')
-            return Response(out.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            if formato == 'xlsx':
+                out = io.BytesIO()
+                with pd.ExcelWriter(out, engine='openpyxl') as xw:
+                    df.to_excel(xw, index=False, sheet_name='Reporte')
+                return Response(out.getvalue(), content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
 
         return Response({'detail': 'Formato no soportado'}, status=400)
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        trace = getattr(self, '_trace', None)
+        if trace is not None:
+            if response.status_code >= 400 and trace.error is None:
+                trace.error = str(getattr(response, 'data', '') or response.status_code)[:500]
+            # render() es idempotente: Django no vuelve a renderizar después
+            with trace.stage('serialize'):
+                response.render()
+            telemetry.finish(trace)
+            self._trace = None
+        return response
+
+
+class TelemetriaResumenView(APIView):
+    """
+    Resumen de latencias de ai_reports: p50/p95 por etapa, global y por intent.
+
+    GET /api/ai-reports/telemetria/resumen?dias=7
+    """
+    permission_classes = [permissions.IsAuthenticated, role_required(ROLE_ADMIN_NAME, ROLE_ANALISTA_NAME)]
+
+    def get(self, request):
+        ser = TelemetriaResumenQuerySerializer(data=request.query_params)
+        ser.is_valid(raise_exception=True)
+        desde = timezone.now() - timedelta(days=ser.validated_data['dias'])
+
+        # Incluir lo que aún está en el buffer de este proceso
+        telemetry.flush()
+        return Response(telemetry.summary(desde), status=status.HTTP_200_OK)
+
 
 class RunAudioReportView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 class SmartsalesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "smartsales"
+
+    def ready(self):
+        # Cliente de Stripe: API key, pool keep-alive y reintentos una sola vez por proceso
+        from smartsales.pagos import stripe_client
+        stripe_client.configurar()
@@ -0,0 +1,5 @@
+from .motores import BuscadorMemoria, BuscadorPostgres, get_motor
+from .texto import resaltar
+from .typeahead import IndiceTypeahead, get_typeahead
+
+__all__ = ["BuscadorMemoria", "BuscadorPostgres", "IndiceTypeahead", "get_motor", "get_typeahead", "resaltar"]
@@ -0,0 +1,121 @@
+"""
+Motores de búsqueda de productos por nombre.
+
+Cada motor devuelve fragmentos SQL para la consulta del listado, así el filtro
+de texto se combina con los demás filtros, el orden y la paginación en una sola
+consulta:
+- condicion(q) -> (sql, params): predicado sobre `p` (alias de producto)
+- rango(q)     -> (sql, params): expresión numérica de relevancia (mayor es mejor)
+
+BuscadorPostgres usa los índices GIN de la migración 0004 (tsvector en español
+y pg_trgm, ambos sobre f_unaccent). BuscadorMemoria mantiene un índice en el
+proceso y sirve para pruebas o bases sin esas extensiones.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .texto import fold, tokens, trigramas
+
+# Expresiones idénticas a las de los índices (si no, Postgres no los usa)
+_NOMBRE_TSV = "to_tsvector('spanish', f_unaccent(p.nombre))"
+_NOMBRE_NORM = "f_unaccent(lower(p.nombre))"
+
+
+class BuscadorPostgres:
+    nombre = "postgres"
+
+    def condicion(self, q: str):
+        sql = (
+            f"({_NOMBRE_TSV} @@ websearch_to_tsquery('spanish', f_unaccent(%s))"
+            f" OR {_NOMBRE_NORM} LIKE '%%' || f_unaccent(lower(%s)) || '%%'"
+            f" OR {_NOMBRE_NORM} %% f_unaccent(lower(%s)))"
+        )
+        return sql, [q, q, q]
+
+    def rango(self, q: str):
+        sql = (
+            f"(ts_rank_cd({_NOMBRE_TSV}, websearch_to_tsquery('spanish', f_unaccent(%s)))"
+            f" + similarity({_NOMBRE_NORM}, f_unaccent(lower(%s))))"
+        )
+        return sql, [q, q]
+
+
+class BuscadorMemoria:
+    """
+    Índice en memoria (id, nombre) de todos los productos, refrescado cada
+    BUSQUEDA_MEMORIA_TTL segundos. Coincide si todas las palabras aparecen en el
+    nombre o si la similitud de trigramas supera el umbral (como pg_trgm).
+    """
+    nombre = "memoria"
+    UMBRAL = 0.3
+
+    def __init__(self, cargar=None):
+        self._cargar = cargar or _cargar_productos
+        self._indice = None
+        self._cargado_en = 0.0
+        self._lock = threading.Lock()
+
+    def construir(self, filas):
+        self._indice = [(pid, fold(nombre), trigramas(nombre)) for pid, nombre in filas]
+        self._cargado_en = time.monotonic()
+
+    def _asegurar(self):
+        ttl = getattr(settings, "BUSQUEDA_MEMORIA_TTL", 60)
+        with self._lock:
+            if self._indice is None or time.monotonic() - self._cargado_en > ttl:
+                self.construir(self._cargar())
+
+    def buscar(self, q: str):
+        """[(producto_id, puntaje)] ordenado por relevancia."""
+        if self._indice is None:
+            self._asegurar()
+        palabras = tokens(q)
+        tri_q = trigramas(q)
+        if not palabras:
+            return []
+        res = []
+        for pid, nombre, tri in self._indice:
+            sim = len(tri & tri_q) / len(tri | tri_q) if tri_q else 0.0
+            if all(w in nombre for w in palabras):
+                res.append((pid, 1.0 + sim))
+            elif sim >= self.UMBRAL:
+                res.append((pid, sim))
+        res.sort(key=lambda r: (-r[1], -r[0]))
+        return res
+
+    def condicion(self, q: str):
+        self._asegurar()
+        ids = [pid for pid, _ in self.buscar(q)]
+        if not ids:
+            return "1=0", []
+        return f"p.id IN ({', '.join(['%s'] * len(ids))})", ids
+
+    def rango(self, q: str):
+        hits = self.buscar(q)
+        if not hits:
+            return "0", []
+        casos = " ".join(["WHEN %s THEN %s"] * len(hits))
+        params = [v for pid, score in hits for v in (pid, score)]
+        return f"(CASE p.id {casos} ELSE 0 END)", params
+
+
+def _cargar_productos():
+    from smartsales.db_utils import execute_query_with_retry
+    return execute_query_with_retry("SELECT id, nombre FROM producto", fetch_all=True) or []
+
+
+_MOTOR = None
+_MOTOR_LOCK = threading.Lock()
+
+
+def get_motor():
+    """Motor configurado en BUSQUEDA_MOTOR ('postgres' por defecto, o 'memoria')."""
+    global _MOTOR
+    if _MOTOR is None:
+        with _MOTOR_LOCK:
+            if _MOTOR is None:
+                tipo = getattr(settings, "BUSQUEDA_MOTOR", "postgres")
+                _MOTOR = BuscadorMemoria() if tipo == "memoria" else BuscadorPostgres()
+    return _MOTOR
@@ -0,0 +1,54 @@
+"""
+Normalización de texto para la búsqueda de productos (minúsculas y sin acentos)
+y cálculo de offsets para resaltar coincidencias.
+"""
+import re
+import unicodedata
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def fold(texto: str) -> str:
+    """minúsculas y sin acentos, conservando el largo (los offsets valen para el texto original)."""
+    out = []
+    for c in texto or '':
+        base = unicodedata.normalize('NFD', c.lower())[:1] or c
+        out.append(base if len(base) == 1 else c)
+    return ''.join(out)
+
+
+def tokens(texto: str):
+    return _TOKEN.findall(fold(texto))
+
+
+def trigramas(texto: str):
+    """Trigramas al estilo pg_trgm: cada palabra con dos espacios delante y uno detrás."""
+    tri = set()
+    for t in tokens(texto):
+        s = f"  {t} "
+        tri.update(s[i:i + 3] for i in range(len(s) - 2))
+    return tri
+
+
+def resaltar(nombre: str, q: str):
+    """
+    Offsets [inicio, fin) en `nombre` de cada palabra de la búsqueda (como prefijo o
+    subcadena, sin distinguir acentos ni mayúsculas). Rangos ordenados y sin solaparse.
+    """
+    if not nombre or not q:
+        return []
+    base = fold(nombre)
+    rangos = []
+    for t in set(tokens(q)):
+        ini = base.find(t)
+        while ini != -1:
+            rangos.append((ini, ini + len(t)))
+            ini = base.find(t, ini + 1)
+    rangos.sort()
+    unidos = []
+    for ini, fin in rangos:
+        if unidos and ini <= unidos[-1][1]:
+            unidos[-1][1] = max(unidos[-1][1], fin)
+        else:
+            unidos.append([ini, fin])
+    return unidos
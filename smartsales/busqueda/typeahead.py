@@ -0,0 +1,178 @@
+"""
+Índice de autocompletado (typeahead) para la búsqueda de productos del punto de venta.
+
+Guarda en el proceso los nombres normalizados (fold) de todos los productos,
+ordenados, en estructuras compactas:
+- `nombres`: lista ordenada; los nombres que empiezan con la búsqueda son un
+  rango contiguo (bisect).
+- `texto`: todos los nombres unidos por '\\x00'; la búsqueda como subcadena
+  (lo que hacía LIKE '%q%') es un str.find en C sobre un único string, y como
+  está ordenado las coincidencias salen ya en orden alfabético.
+- `palabras`: (palabra, posición) ordenado, para búsquedas de varias palabras
+  donde cada una es prefijo de alguna palabra del nombre ("refri sams").
+
+El índice devuelve ids; la vista los completa con una consulta por PK. Se
+reconstruye en un hilo de fondo cuando cambia el contador de nombres del
+catálogo (catalogo_version.nombres: altas, bajas y cambios de nombre de
+producto; las ventas no lo mueven), revisándolo como mucho cada
+BUSQUEDA_TYPEAHEAD_REFRESCO segundos; mientras tanto responde con el índice anterior.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+
+from smartsales.hilos import PoolHilos
+from .texto import fold, tokens
+
+_SEP = '\x00'
+_FIN = '\uffff'
+
+
+class _Datos:
+    """Foto inmutable del índice (se reemplaza completa al reconstruir)."""
+
+    def __init__(self, filas):
+        orden = sorted((fold(nombre or ''), pid) for pid, nombre in filas)
+        self.nombres = [n for n, _ in orden]
+        self.ids = array('q', (pid for _, pid in orden))
+        self.offsets = array('q')
+        pos = 0
+        for n in self.nombres:
+            self.offsets.append(pos)
+            pos += len(n) + 1
+        self.texto = _SEP.join(self.nombres)
+        palabras = sorted(
+            (t, rank) for rank, n in enumerate(self.nombres) for t in set(tokens(n))
+        )
+        self.palabras = [t for t, _ in palabras]
+        self.palabras_rank = array('l', (r for _, r in palabras))
+
+    def _rango_prefijo(self, lista, prefijo):
+        return bisect_left(lista, prefijo), bisect_left(lista, prefijo + _FIN)
+
+    def _ranks_palabra(self, palabra):
+        lo, hi = self._rango_prefijo(self.palabras, palabra)
+        return set(self.palabras_rank[lo:hi])
+
+    def candidatos(self, q: str):
+        """Genera ids en orden: nombre empieza con q, q aparece en el nombre, todas las palabras como prefijo."""
+        fq = fold(q).strip().replace(_SEP, '')
+        if not fq:
+            yield from self.ids
+            return
+
+        vistos = set()
+        # 1. El nombre empieza con la búsqueda (rango contiguo)
+        lo, hi = self._rango_prefijo(self.nombres, fq)
+        for rank in range(lo, hi):
+            vistos.add(rank)
+            yield self.ids[rank]
+
+        # 2. Subcadena en cualquier parte del nombre, ya en orden alfabético
+        n = len(self.nombres)
+        pos = self.texto.find(fq)
+        while pos != -1:
+            rank = bisect_right(self.offsets, pos) - 1
+            if rank not in vistos:
+                vistos.add(rank)
+                yield self.ids[rank]
+            if rank + 1 >= n:
+                break
+            pos = self.texto.find(fq, self.offsets[rank + 1])
+
+        # 3. Varias palabras: cada una es prefijo de alguna palabra del nombre
+        palabras = tokens(fq)
+        if len(palabras) > 1:
+            ranks = None
+            for p in sorted(palabras, key=len, reverse=True):
+                encontrados = self._ranks_palabra(p)
+                ranks = encontrados if ranks is None else ranks & encontrados
+                if not ranks:
+                    return
+            for rank in sorted(ranks - vistos):
+                yield self.ids[rank]
+
+
+class IndiceTypeahead:
+
+    def __init__(self, cargar=None, version=None):
+        self._cargar = cargar or _cargar_productos
+        self._version = version or _version_catalogo
+        self._datos = None
+        self._version_cargada = None
+        self._revisado_en = 0.0
+        self._cargado_en = 0.0
+        self._lock = threading.Lock()
+        self._refrescando = False
+        self._pendiente = None
+        self._hilo = PoolHilos("typeahead", self._reconstruir, workers=1)
+
+    def construir(self, filas, version=None):
+        self._datos = _Datos(filas)
+        self._version_cargada = version
+        self._cargado_en = time.monotonic()
+
+    def _asegurar(self):
+        if self._datos is None:
+            with self._lock:
+                if self._datos is None:
+                    version = self._version()
+                    self.construir(self._cargar(), version)
+                    self._revisado_en = time.monotonic()
+            return
+
+        ahora = time.monotonic()
+        if ahora - self._revisado_en < getattr(settings, "BUSQUEDA_TYPEAHEAD_REFRESCO", 5):
+            return
+        with self._lock:
+            if self._refrescando or ahora - self._revisado_en < getattr(settings, "BUSQUEDA_TYPEAHEAD_REFRESCO", 5):
+                return
+            self._revisado_en = ahora
+            version = self._version()
+            if version is not None and version == self._version_cargada:
+                return
+            # Sin tabla de versión: se reconstruye cada BUSQUEDA_MEMORIA_TTL
+            if version is None and ahora - self._cargado_en < getattr(settings, "BUSQUEDA_MEMORIA_TTL", 60):
+                return
+            self._refrescando = True
+            self._pendiente = version
+        self._hilo.despertar()
+
+    def _reconstruir(self):
+        try:
+            self.construir(self._cargar(), self._pendiente)
+        except Exception as e:
+            print(f"[TYPEAHEAD] No se pudo reconstruir el índice: {e}")
+        finally:
+            self._refrescando = False
+
+    def candidatos(self, q: str):
+        self._asegurar()
+        return self._datos.candidatos(q)
+
+
+def _cargar_productos():
+    from smartsales.db_utils import execute_query_with_retry
+    return execute_query_with_retry("SELECT id, nombre FROM producto", fetch_all=True) or []
+
+
+def _version_catalogo():
+    from smartsales.condicional import version_catalogo
+    v = version_catalogo()
+    return v.nombres if v else None
+
+
+_INDICE = None
+_INDICE_LOCK = threading.Lock()
+
+
+def get_typeahead() -> IndiceTypeahead:
+    global _INDICE
+    if _INDICE is None:
+        with _INDICE_LOCK:
+            if _INDICE is None:
+                _INDICE = IndiceTypeahead()
+    return _INDICE
@@ -0,0 +1,198 @@
+"""
+Exportación del catálogo del vendedor en Excel, CSV (streaming) y Parquet.
+
+Los productos se leen por keyset (nombre, id) en lotes de CATALOGO_EXPORT_LOTE,
+así ni la consulta ni la respuesta cargan el catálogo completo en memoria. Cada
+lote es un recorrido de rango del índice producto_vendedor_nombre_idx
+(id_vendedor, nombre, id), migración 0009.
+
+Los archivos exportados se pueden volver a importar: la importación ubica las
+columnas por el nombre del encabezado (ignora `id`) y en Excel se detiene en la
+fila de totales (ETIQUETA_TOTALES).
+"""
+import csv
+import tempfile
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+
+COLUMNAS = ["id", "nombre", "precio", "stock", "tiempo_garantia", "marca", "tipo"]
+ETIQUETA_TOTALES = "TOTAL PRODUCTOS:"
+
+
+def tam_lote() -> int:
+    return getattr(settings, "CATALOGO_EXPORT_LOTE", 2000)
+
+
+def tiene_productos(vendedor_id) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM producto WHERE id_vendedor = %s)", [vendedor_id])
+        return cursor.fetchone()[0]
+
+
+def iter_productos(vendedor_id, lote: int | None = None):
+    """Genera lotes [(id, nombre, precio, stock, tiempogarantia, marca, tipo), ...] ordenados por nombre."""
+    lote = lote or tam_lote()
+    ultimo = None
+    while True:
+        cond, params = "", [vendedor_id]
+        if ultimo:
+            cond = "AND (p.nombre, p.id) > (%s, %s)"
+            params += list(ultimo)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT p.id, p.nombre, p.precio, p.stock, p.tiempogarantia,
+                       m.nombre AS marca, tp.nombre AS tipo
+                FROM producto p
+                JOIN marca m ON p.marca_id = m.id
+                JOIN tipoproducto tp ON p.tipoproducto_id = tp.id
+                WHERE p.id_vendedor = %s {cond}
+                ORDER BY p.nombre, p.id
+                LIMIT %s
+                """,
+                params + [lote]
+            )
+            filas = cursor.fetchall()
+        if not filas:
+            return
+        yield filas
+        if len(filas) < lote:
+            return
+        ultimo = (filas[-1][1], filas[-1][0])
+
+
+class _Eco:
+    """Buffer de una sola escritura para csv.writer (el valor se devuelve tal cual)."""
+
+    def write(self, valor):
+        return valor
+
+
+def csv_stream(vendedor_id):
+    """Genera el CSV por bloques (un bloque por lote de productos)."""
+    writer = csv.writer(_Eco())
+    yield '\ufeff' + writer.writerow(COLUMNAS)
+    for filas in iter_productos(vendedor_id):
+        yield "".join(writer.writerow(f) for f in filas)
+
+
+def parquet_archivo(vendedor_id):
+    """
+    Parquet con un row group por lote, en un archivo temporal (posicionado al
+    inicio) para enviarlo con FileResponse, como el Excel. Requiere pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("nombre", pa.string()),
+        ("precio", pa.decimal128(12, 2)),
+        ("stock", pa.int64()),
+        ("tiempo_garantia", pa.int64()),
+        ("marca", pa.string()),
+        ("tipo", pa.string()),
+    ])
+    salida = tempfile.TemporaryFile()
+    with pq.ParquetWriter(salida, schema, compression="snappy") as writer:
+        for filas in iter_productos(vendedor_id):
+            columnas = list(zip(*filas))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(c, type=schema.field(i).type) for i, c in enumerate(columnas)],
+                schema=schema
+            ))
+    salida.seek(0)
+    return salida
+
+
+# ---------- Excel (openpyxl write_only) ----------
+def _estilos_xlsx(wb):
+    """Estilos con nombre del libro: se registran una vez y las celdas solo los referencian."""
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+    lado = Side(style='thin')
+    borde = Border(left=lado, right=lado, top=lado, bottom=lado)
+    estilos = [
+        NamedStyle(name='cat_titulo', font=Font(bold=True, size=14, color="4472C4"),
+                   alignment=Alignment(horizontal="center", vertical="center")),
+        NamedStyle(name='cat_fecha', font=Font(italic=True, size=10)),
+        NamedStyle(name='cat_encabezado', font=Font(bold=True, color="FFFFFF", size=12),
+                   fill=PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid"),
+                   alignment=Alignment(horizontal="center", vertical="center"), border=borde),
+        NamedStyle(name='cat_texto', border=borde),
+        NamedStyle(name='cat_centro', alignment=Alignment(horizontal="center"), border=borde),
+        NamedStyle(name='cat_precio', number_format='$#,##0.00',
+                   alignment=Alignment(horizontal="right"), border=borde),
+        NamedStyle(name='cat_total', font=Font(bold=True), alignment=Alignment(horizontal="right")),
+        NamedStyle(name='cat_total_precio', font=Font(bold=True), number_format='$#,##0.00',
+                   alignment=Alignment(horizontal="right")),
+        NamedStyle(name='cat_total_centro', font=Font(bold=True), alignment=Alignment(horizontal="center")),
+    ]
+    for estilo in estilos:
+        wb.add_named_style(estilo)
+
+
+def xlsx_archivo(vendedor_id, vendedor_nombre: str):
+    """
+    Arma el Excel del catálogo en modo write_only y lo devuelve como archivo
+    temporal (posicionado al inicio) para enviarlo con FileResponse.
+
+    En write_only las filas se escriben a disco a medida que se agregan, así la
+    memoria depende del lote y no del tamaño del catálogo. Ese modo no admite
+    celdas combinadas: el título y la fecha quedan en la columna A.
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+
+    wb = openpyxl.Workbook(write_only=True)
+    _estilos_xlsx(wb)
+    ws = wb.create_sheet("Mi Catálogo")
+
+    for col, ancho in zip("ABCDEFG", (8, 45, 15, 10, 18, 20, 25)):
+        ws.column_dimensions[col].width = ancho
+
+    def celda(valor, estilo=None):
+        c = WriteOnlyCell(ws, value=valor)
+        if estilo:
+            c.style = estilo
+        return c
+
+    ws.append([celda(f"CATÁLOGO DE PRODUCTOS - {vendedor_nombre.upper()}", 'cat_titulo')])
+    ws.append([celda(f"Exportado el: {datetime.now().strftime('%d/%m/%Y %H:%M')}", 'cat_fecha')])
+    ws.append([])
+    ws.append([celda(h, 'cat_encabezado') for h in
+               ("ID", "NOMBRE", "PRECIO (USD)", "STOCK", "GARANTÍA (DÍAS)", "MARCA", "TIPO")])
+
+    total_productos = 0
+    valor_total = 0.0
+    total_stock = 0
+    for filas in iter_productos(vendedor_id):
+        for pid, nombre, precio, stock, garantia, marca, tipo in filas:
+            precio = float(precio)
+            ws.append([
+                celda(pid, 'cat_centro'),
+                celda(nombre, 'cat_texto'),
+                celda(precio, 'cat_precio'),
+                celda(stock, 'cat_centro'),
+                celda(garantia, 'cat_centro'),
+                celda(marca, 'cat_texto'),
+                celda(tipo, 'cat_texto'),
+            ])
+            total_productos += 1
+            valor_total += precio * stock
+            total_stock += stock
+
+    # Totales (última fila)
+    ws.append([
+        celda(f"{ETIQUETA_TOTALES} {total_productos}", 'cat_total'),
+        None,
+        celda(valor_total, 'cat_total_precio'),
+        celda(total_stock, 'cat_total_centro'),
+    ])
+
+    salida = tempfile.TemporaryFile()
+    wb.save(salida)
+    salida.seek(0)
+    return salida
@@ -0,0 +1,414 @@
+"""
+Motor de importación masiva del catálogo (Excel, CSV o Parquet).
+
+- El archivo se lee en streaming: openpyxl en modo read_only, csv línea a
+  línea y Parquet por lotes con pyarrow. Los tres formatos comparten la
+  validación y la inserción.
+- Todas las filas se validan en Python contra los mapas de marcas y tipos
+  (cargados una vez por archivo desde dimensiones), sin consultas por fila.
+- Las filas válidas se insertan por lotes con un único INSERT ... SELECT FROM
+  unnest(...) por lote (ver insertar_lote). Si un lote falla en la base (p. ej. una
+  restricción), ese lote se reintenta fila por fila para reportar el error de
+  cada una sin perder las demás.
+- Las columnas se ubican por el nombre del encabezado (plantilla o archivo
+  exportado, ver exportacion.py); si el encabezado no se reconoce se usan las
+  6 primeras en el orden de la plantilla.
+"""
+import csv
+import io
+import re
+import unicodedata
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from smartsales.gestion_catalogos import dimensiones
+
+
+def max_filas() -> int:
+    return getattr(settings, "CATALOGO_IMPORT_MAX_FILAS", 50000)
+
+
+def tam_lote() -> int:
+    return getattr(settings, "CATALOGO_IMPORT_LOTE", 1000)
+
+
+# ---------- lectura ----------
+FORMATOS = ('xlsx', 'csv', 'parquet')
+
+
+def formato_de(nombre_archivo: str) -> str:
+    """Formato de importación según la extensión (.xls se intenta leer como xlsx)."""
+    ext = nombre_archivo.rsplit('.', 1)[-1].lower() if '.' in nombre_archivo else ''
+    return 'xlsx' if ext == 'xls' else ext
+
+
+CAMPOS = ('nombre', 'precio', 'stock', 'tiempo_garantia', 'marca', 'tipo')
+
+# Encabezados aceptados, ya normalizados: los de la plantilla y los de la exportación
+_ALIAS = {
+    'nombre': 'nombre', 'nombre del producto': 'nombre',
+    'precio': 'precio',
+    'stock': 'stock',
+    'tiempo garantia': 'tiempo_garantia', 'garantia': 'tiempo_garantia',
+    'marca': 'marca',
+    'tipo': 'tipo', 'tipo de producto': 'tipo',
+}
+
+# Filas donde se busca el encabezado en Excel (el exportado tiene título y fecha arriba)
+_FILAS_ENCABEZADO = 10
+
+
+def _normalizar_encabezado(valor) -> str:
+    """'TIEMPO GARANTÍA (DÍAS)*' -> 'tiempo garantia'."""
+    texto = unicodedata.normalize('NFD', str(valor or '')).encode('ascii', 'ignore').decode().lower()
+    texto = re.sub(r'\(.*?\)|\*', ' ', texto).replace('_', ' ')
+    return ' '.join(texto.split())
+
+
+def mapa_columnas(encabezado):
+    """Posición de cada campo de CAMPOS según el encabezado, o None si falta alguno."""
+    posiciones = {}
+    for i, valor in enumerate(encabezado or ()):
+        campo = _ALIAS.get(_normalizar_encabezado(valor))
+        if campo and campo not in posiciones:
+            posiciones[campo] = i
+    if len(posiciones) < len(CAMPOS):
+        return None
+    return tuple(posiciones[c] for c in CAMPOS)
+
+
+def _completar(row):
+    return tuple(row) + (None,) * (6 - len(row))
+
+
+def _ordenar(row, posiciones):
+    """Valores en el orden de CAMPOS (por posición si no hubo encabezado reconocido)."""
+    if posiciones is None:
+        return _completar(row)
+    return tuple(row[i] if i < len(row) else None for i in posiciones)
+
+
+def _vacia(row):
+    return not row or not any(v is not None and v != "" for v in row)
+
+
+def leer_xlsx(archivo):
+    """
+    Genera (numero_fila, valores) de la hoja activa después del encabezado, sin
+    filas vacías. El encabezado se busca en las primeras filas (la plantilla lo
+    tiene en la 1 y el Excel exportado más abajo); sin encabezado reconocido los
+    datos empiezan en la fila 2. La fila de totales del exportado termina la lectura.
+    El libro se abre en modo read_only y se cierra al terminar de iterar.
+    """
+    import openpyxl
+
+    from .exportacion import ETIQUETA_TOTALES
+
+    wb = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        filas = enumerate(ws.iter_rows(values_only=True), start=1)
+        primeras = list(islice(filas, _FILAS_ENCABEZADO))
+        inicio, posiciones = 1, None
+        for row_num, row in primeras:
+            posiciones = mapa_columnas(row)
+            if posiciones:
+                inicio = row_num
+                break
+        for row_num, row in chain(primeras, filas):
+            if row_num <= inicio or _vacia(row):
+                continue
+            if isinstance(row[0], str) and row[0].startswith(ETIQUETA_TOTALES):
+                break
+            yield row_num, _ordenar(row, posiciones)
+    finally:
+        wb.close()
+
+
+def leer_csv(archivo):
+    """
+    CSV con encabezado en la primera línea (columnas por nombre, o en el orden de
+    la plantilla). Se lee línea a línea; el separador (coma, punto y coma o
+    tabulador) se detecta con el primer bloque del archivo.
+    """
+    archivo.seek(0)
+    # UploadedFile no es un io.BufferedIOBase: se envuelve el archivo subyacente
+    texto = io.TextIOWrapper(getattr(archivo, 'file', archivo), encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(texto, dialecto)
+        posiciones = mapa_columnas(next(lector, None))
+        for row in lector:
+            if _vacia(row):
+                continue
+            yield lector.line_num, _ordenar([v.strip() or None for v in row], posiciones)
+    finally:
+        texto.detach()
+
+
+def leer_parquet(archivo):
+    """
+    Parquet con columnas por nombre (o las 6 primeras en el orden de la
+    plantilla). Se lee por row groups/lotes con pyarrow; la "fila" reportada es
+    el número de registro empezando en 1.
+    """
+    import pyarrow.parquet as pq
+
+    archivo.seek(0)
+    pf = pq.ParquetFile(getattr(archivo, 'file', archivo))
+    nombres = pf.schema_arrow.names
+    posiciones = mapa_columnas(nombres)
+    columnas = [nombres[i] for i in posiciones] if posiciones else nombres[:6]
+    row_num = 0
+    for batch in pf.iter_batches(batch_size=tam_lote(), columns=columnas):
+        for row in zip(*(col.to_pylist() for col in batch.columns)):
+            row_num += 1
+            if _vacia(row):
+                continue
+            yield row_num, _completar(row)
+
+
+_LECTORES = {'xlsx': leer_xlsx, 'csv': leer_csv, 'parquet': leer_parquet}
+
+
+def leer_filas(archivo, formato: str = 'xlsx'):
+    """Genera (numero_fila, valores) del archivo en el formato indicado."""
+    return _LECTORES[formato](archivo)
+
+
+# ---------- validación ----------
+def validar_fila(row, marcas_map, tipos_map):
+    """
+    Devuelve (nombre, precio, stock, tiempo_garantia, marca_id, tipo_id) o lanza
+    ValueError con el mensaje para el usuario.
+    """
+    nombre = str(row[0]).strip() if row[0] else None
+    precio = row[1]
+    stock = row[2]
+    tiempo_garantia = row[3]
+    marca_nombre = str(row[4]).strip() if row[4] else None
+    tipo_nombre = str(row[5]).strip() if row[5] else None
+
+    if not nombre:
+        raise ValueError("El nombre del producto es obligatorio")
+    if len(nombre) > 160:
+        raise ValueError("El nombre no debe superar 160 caracteres")
+
+    if precio is None:
+        raise ValueError("El precio es obligatorio")
+    if isinstance(precio, str) and ',' in precio and '.' not in precio:
+        # CSV con coma decimal (separador ';')
+        precio = precio.replace(',', '.')
+    try:
+        precio = Decimal(str(precio))
+        if precio <= 0:
+            raise ValueError("El precio debe ser mayor a 0")
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Precio inválido: {precio}")
+
+    if stock is None:
+        raise ValueError("El stock es obligatorio")
+    try:
+        stock = int(stock)
+        if stock < 0:
+            raise ValueError("El stock no puede ser negativo")
+    except (ValueError, TypeError):
+        raise ValueError(f"Stock inválido: {stock}")
+
+    if tiempo_garantia is None:
+        raise ValueError("El tiempo de garantía es obligatorio")
+    try:
+        tiempo_garantia = int(tiempo_garantia)
+        if tiempo_garantia < 0:
+            raise ValueError("El tiempo de garantía no puede ser negativo")
+    except (ValueError, TypeError):
+        raise ValueError(f"Tiempo de garantía inválido: {tiempo_garantia}")
+
+    if not marca_nombre:
+        raise ValueError("La marca es obligatoria")
+    marca_id = marcas_map.get(marca_nombre.lower())
+    if not marca_id:
+        raise ValueError(f"Marca '{marca_nombre}' no encontrada. Revise la hoja 'Marcas Disponibles'")
+
+    if not tipo_nombre:
+        raise ValueError("El tipo de producto es obligatorio")
+    tipo_id = tipos_map.get(tipo_nombre.lower())
+    if not tipo_id:
+        raise ValueError(f"Tipo '{tipo_nombre}' no encontrado. Revise la hoja 'Tipos Disponibles'")
+
+    return nombre, precio, stock, tiempo_garantia, marca_id, tipo_id
+
+
+def _error(row_num, row, mensaje):
+    return {
+        'fila': row_num,
+        'error': mensaje,
+        'datos': {
+            'nombre': str(row[0]).strip() if row[0] else None,
+            'precio': str(row[1]) if row[1] is not None else None,
+        }
+    }
+
+
+# ---------- inserción ----------
+_CENTAVO = Decimal('0.01')  # producto.precio es numeric(12, 2)
+
+
+def insertar_lote(cursor, vendedor_id, productos):
+    """
+    Inserta el lote en una sola sentencia y devuelve los ids en el mismo orden.
+    productos: [(nombre, precio, stock, tiempo_garantia, marca_id, tipo_id), ...]
+
+    El id lo pone el DEFAULT de producto.id (no se escriben ids explícitos) y
+    RETURNING no garantiza el orden de las filas: cada fila devuelta se asigna a
+    una fila del lote con los mismos valores. Dos filas idénticas son
+    intercambiables. El precio se redondea antes a los 2 decimales de la columna
+    para que lo devuelto coincida con lo enviado.
+    """
+    if not productos:
+        return []
+    productos = [
+        (nombre, Decimal(precio).quantize(_CENTAVO, ROUND_HALF_UP), stock, garantia, marca, tipo)
+        for nombre, precio, stock, garantia, marca, tipo in productos
+    ]
+    nombres, precios, stocks, garantias, marcas, tipos = (list(c) for c in zip(*productos))
+    cursor.execute(
+        """
+        INSERT INTO producto
+            (nombre, precio, stock, tiempogarantia, marca_id, tipoproducto_id, id_vendedor)
+        SELECT nombre, precio, stock, tiempogarantia, marca_id, tipoproducto_id, %s
+        FROM unnest(%s::text[], %s::numeric[], %s::int[], %s::int[], %s::int[], %s::int[])
+             AS d(nombre, precio, stock, tiempogarantia, marca_id, tipoproducto_id)
+        RETURNING id, nombre, precio, stock, tiempogarantia, marca_id, tipoproducto_id
+        """,
+        [vendedor_id, nombres, precios, stocks, garantias, marcas, tipos]
+    )
+    posiciones = {}
+    for i, fila in enumerate(productos):
+        posiciones.setdefault(fila, []).append(i)
+    ids = [None] * len(productos)
+    for pid, *valores in cursor.fetchall():
+        ids[posiciones[tuple(valores)].pop()] = pid
+    return ids
+
+
+def _insertar_con_respaldo(vendedor_id, lote):
+    """
+    lote: [(row_num, row, valores), ...]
+    Devuelve (creados, errores). Un lote que falla se reintenta fila por fila.
+    """
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            ids = insertar_lote(cursor, vendedor_id, [v for _, _, v in lote])
+        return list(zip(ids, lote)), []
+    except Exception:
+        pass
+
+    creados, errores = [], []
+    for item in lote:
+        row_num, row, valores = item
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                ids = insertar_lote(cursor, vendedor_id, [valores])
+            creados.append((ids[0], item))
+        except Exception as e:
+            errores.append(_error(row_num, row, str(e)))
+    return creados, errores
+
+
+def importar(archivo, vendedor_id, formato: str = 'xlsx', progreso=None, desde_fila: int = 0):
+    """
+    Lee, valida e inserta el archivo. Devuelve el dict para ResultadoImportacionSerializer.
+
+    progreso: opcional, se llama dentro de la transacción de cada lote con lo
+    nuevo desde la llamada anterior:
+    {'procesados', 'exitosos', 'errores', 'ultima_fila'}. Como comparte la
+    transacción con el INSERT, lo registrado coincide con lo confirmado.
+    desde_fila: las filas hasta ese número ya se confirmaron en una ejecución
+    anterior (reanudar un trabajo); se leen pero no se vuelven a insertar.
+    """
+    limite = max_filas()
+    lote_max = tam_lote()
+    marcas_map = dimensiones.ids_por_nombre(dimensiones.marcas())
+    tipos_map = dimensiones.ids_por_nombre(dimensiones.tipos())
+
+    errores = []
+    productos_creados = []
+    total_procesados = 0
+    saltadas = 0
+    lote = []
+    # Lo acumulado desde el último reporte de progreso
+    avance = {'procesados': 0, 'errores': [], 'ultima_fila': desde_fila}
+
+    def error(e):
+        errores.append(e)
+        avance['errores'].append(e)
+
+    def vaciar():
+        with transaction.atomic():
+            creados, errores_lote = _insertar_con_respaldo(vendedor_id, lote)
+            for e in errores_lote:
+                error(e)
+            for producto_id, (row_num, _, valores) in creados:
+                productos_creados.append({
+                    'id': producto_id,
+                    'nombre': valores[0],
+                    'precio': float(valores[1]),
+                    'stock': valores[2],
+                    'fila': row_num
+                })
+            if progreso:
+                progreso({
+                    'procesados': avance['procesados'],
+                    'exitosos': len(creados),
+                    'errores': list(avance['errores']),
+                    'ultima_fila': avance['ultima_fila'],
+                })
+        lote.clear()
+        avance['procesados'] = 0
+        avance['errores'].clear()
+
+    for row_num, row in leer_filas(archivo, formato):
+        if total_procesados + saltadas >= limite:
+            error({
+                'fila': row_num,
+                'error': f'Se alcanzó el límite de {limite} productos por importación'
+            })
+            break
+        if row_num <= desde_fila:
+            saltadas += 1
+            continue
+
+        total_procesados += 1
+        avance['procesados'] += 1
+        avance['ultima_fila'] = row_num
+
+        try:
+            valores = validar_fila(row, marcas_map, tipos_map)
+        except ValueError as e:
+            error(_error(row_num, row, str(e)))
+            continue
+
+        lote.append((row_num, row, valores))
+        if len(lote) >= lote_max:
+            vaciar()
+
+    if lote or avance['procesados'] or avance['errores']:
+        vaciar()
+
+    errores.sort(key=lambda e: e['fila'])
+    return {
+        'total_procesados': total_procesados,
+        'exitosos': len(productos_creados),
+        'fallidos': total_procesados - len(productos_creados),
+        'errores': errores,
+        'productos_creados': productos_creados
+    }
@@ -0,0 +1,47 @@
+"""
+Comando para procesar los trabajos de importación de catálogo pendientes
+(útil con CATALOGO_IMPORT_WORKERS=0 o para retomar trabajos abandonados).
+Uso: python manage.py procesar_importaciones_catalogo --continuo
+"""
+import time
+from django.core.management.base import BaseCommand
+from smartsales.catalogo import trabajos
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos pendientes de importación de catálogo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=10,
+            help='Número máximo de trabajos a procesar por ejecución (default: 10)'
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Ejecuta el procesamiento en modo continuo cada cierto tiempo'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=5,
+            help='Intervalo en segundos entre ejecuciones sin trabajos en modo continuo (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                stats = trabajos.procesar_cola(limite=options['limite'])
+                if stats['procesados']:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Trabajos procesados={stats['procesados']} "
+                        f"completados={stats['completados']} fallidos={stats['fallidos']}"
+                    ))
+                    continue
+                if not options['continuo']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nProcesamiento detenido'))
@@ -0,0 +1,237 @@
+"""
+Plantilla Excel de importación del catálogo, pre-renderizada.
+
+El libro solo depende de las marcas, los tipos y el límite de filas, así que se
+arma una vez y se guarda como bytes en memoria y en disco (CATALOGO_PLANTILLA_DIR),
+identificado por una huella de ese contenido. Mientras marcas y tipos no cambien
+(cache de dimensiones), la descarga es una copia de memoria; al cambiar, la
+huella es otra y se vuelve a generar. Varios procesos comparten el archivo en disco.
+"""
+import glob
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+from smartsales.gestion_catalogos import dimensiones
+from . import importacion
+
+_memoria = None  # (huella, bytes)
+_lock = threading.Lock()
+
+
+def _directorio() -> str:
+    return getattr(settings, "CATALOGO_PLANTILLA_DIR", None) or os.path.join(
+        tempfile.gettempdir(), "smartsales_plantillas"
+    )
+
+
+def _huella(marcas, tipos, max_filas) -> str:
+    return hashlib.sha1(repr((marcas, tipos, max_filas)).encode()).hexdigest()[:16]
+
+
+def obtener():
+    """(bytes del .xlsx, huella). Usa memoria, luego disco y solo si no hay, genera."""
+    global _memoria
+    marcas = dimensiones.marcas()
+    tipos = dimensiones.tipos()
+    max_filas = importacion.max_filas()
+    huella = _huella(marcas, tipos, max_filas)
+
+    actual = _memoria
+    if actual and actual[0] == huella:
+        return actual[1], huella
+
+    with _lock:
+        if _memoria and _memoria[0] == huella:
+            return _memoria[1], huella
+
+        ruta = os.path.join(_directorio(), f"plantilla_{huella}.xlsx")
+        contenido = _leer(ruta)
+        if contenido is None:
+            contenido = construir(marcas, tipos, max_filas)
+            _guardar(ruta, contenido)
+        _memoria = (huella, contenido)
+        return contenido, huella
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _guardar(ruta, contenido):
+    """Escritura atómica (archivo temporal + rename) y limpieza de versiones viejas."""
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        os.replace(tmp, ruta)
+        for viejo in glob.glob(os.path.join(os.path.dirname(ruta), "plantilla_*.xlsx")):
+            if viejo != ruta:
+                os.remove(viejo)
+    except OSError as e:
+        # Sin disco escribible la plantilla igual queda en memoria
+        print(f"[PLANTILLA] No se pudo guardar {ruta}: {e}")
+
+
+def construir(marcas, tipos, max_filas) -> bytes:
+    """Arma el libro (catálogo de ejemplo, instrucciones, marcas y tipos) y devuelve sus bytes."""
+    import openpyxl
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
+    # Crear libro de Excel
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Catálogo de Productos"
+    
+    # Estilos
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    
+    # Encabezados
+    headers = [
+        "NOMBRE DEL PRODUCTO*",
+        "PRECIO (USD)*",
+        "STOCK*",
+        "TIEMPO GARANTÍA (DÍAS)*",
+        "MARCA*",
+        "TIPO DE PRODUCTO*"
+    ]
+    
+    for col_num, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col_num, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        cell.border = border
+    
+    # Ajustar ancho de columnas
+    ws.column_dimensions['A'].width = 40  # Nombre
+    ws.column_dimensions['B'].width = 15  # Precio
+    ws.column_dimensions['C'].width = 12  # Stock
+    ws.column_dimensions['D'].width = 20  # Garantía
+    ws.column_dimensions['E'].width = 25  # Marca
+    ws.column_dimensions['F'].width = 30  # Tipo
+    
+    # Ejemplos (primeras 3 filas)
+    ejemplos = [
+        ["Refrigerador Premium 500L", "899.99", "15", "365", "Samsung", "Refrigerador"],
+        ["Lavadora Automática 12kg", "549.50", "8", "180", "LG", "Lavadora"],
+        ["Microondas Digital 1.2 cu ft", "129.99", "25", "90", "Panasonic", "Microondas"]
+    ]
+    
+    example_fill = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid")
+    for row_num, ejemplo in enumerate(ejemplos, 2):
+        for col_num, value in enumerate(ejemplo, 1):
+            cell = ws.cell(row=row_num, column=col_num, value=value)
+            cell.fill = example_fill
+            cell.border = border
+            if col_num in [2, 3, 4]:  # Precio, Stock, Garantía
+                cell.alignment = Alignment(horizontal="right")
+    
+    # Crear hoja de instrucciones
+    ws_inst = wb.create_sheet("Instrucciones")
+    ws_inst.column_dimensions['A'].width = 80
+    
+    instrucciones = [
+        "INSTRUCCIONES PARA IMPORTAR CATÁLOGO DE PRODUCTOS",
+        "",
+        "1. Complete la información en la hoja 'Catálogo de Productos'",
+        "2. Los campos marcados con * son OBLIGATORIOS",
+        "3. No modifique los encabezados de las columnas",
+        "4. Elimine las filas de ejemplo antes de importar o reemplácelas con sus datos",
+        "",
+        "DESCRIPCIÓN DE CAMPOS:",
+        "",
+        "• NOMBRE DEL PRODUCTO: Nombre descriptivo del producto (máx. 160 caracteres)",
+        "• PRECIO: Precio en dólares (USD), use punto como separador decimal (ej: 99.99)",
+        "• STOCK: Cantidad disponible en inventario (número entero positivo)",
+        "• TIEMPO GARANTÍA: Días de garantía del producto (número entero, ej: 365 para 1 año)",
+        "• MARCA: Nombre exacto de la marca. Marcas disponibles:",
+    ]
+    
+    # Agregar marcas disponibles
+    for marca in marcas:
+        instrucciones.append(f"  - {marca[1]}")
+    
+    instrucciones.extend([
+        "",
+        "• TIPO DE PRODUCTO: Nombre exacto del tipo. Tipos disponibles:",
+    ])
+    
+    # Agregar tipos disponibles
+    for tipo in tipos:
+        instrucciones.append(f"  - {tipo[1]}")
+    
+    instrucciones.extend([
+        "",
+        "NOTAS IMPORTANTES:",
+        "",
+        "• Si la marca o tipo no existe en el sistema, la fila será rechazada",
+        "• El precio debe ser mayor a 0",
+        "• El stock debe ser mayor o igual a 0",
+        "• El tiempo de garantía debe ser mayor o igual a 0",
+        "• Los productos serán asignados automáticamente a su usuario vendedor",
+        f"• Puede importar hasta {max_filas} productos a la vez",
+        "",
+        "EJEMPLO DE FILA VÁLIDA:",
+        "Refrigerador Premium 500L | 899.99 | 15 | 365 | Samsung | Refrigerador"
+    ])
+    
+    for row_num, linea in enumerate(instrucciones, 1):
+        cell = ws_inst.cell(row=row_num, column=1, value=linea)
+        if row_num == 1:
+            cell.font = Font(bold=True, size=14, color="4472C4")
+        elif "DESCRIPCIÓN DE CAMPOS:" in linea or "NOTAS IMPORTANTES:" in linea or "EJEMPLO DE FILA VÁLIDA:" in linea:
+            cell.font = Font(bold=True, size=11)
+    
+    # Crear hoja de marcas
+    ws_marcas = wb.create_sheet("Marcas Disponibles")
+    ws_marcas['A1'] = "ID"
+    ws_marcas['B1'] = "MARCA"
+    ws_marcas['A1'].font = header_font
+    ws_marcas['B1'].font = header_font
+    ws_marcas['A1'].fill = header_fill
+    ws_marcas['B1'].fill = header_fill
+    
+    for idx, marca in enumerate(marcas, 2):
+        ws_marcas[f'A{idx}'] = marca[0]
+        ws_marcas[f'B{idx}'] = marca[1]
+    
+    ws_marcas.column_dimensions['A'].width = 8
+    ws_marcas.column_dimensions['B'].width = 30
+    
+    # Crear hoja de tipos
+    ws_tipos = wb.create_sheet("Tipos Disponibles")
+    ws_tipos['A1'] = "ID"
+    ws_tipos['B1'] = "TIPO DE PRODUCTO"
+    ws_tipos['A1'].font = header_font
+    ws_tipos['B1'].font = header_font
+    ws_tipos['A1'].fill = header_fill
+    ws_tipos['B1'].fill = header_fill
+    
+    for idx, tipo in enumerate(tipos, 2):
+        ws_tipos[f'A{idx}'] = tipo[0]
+        ws_tipos[f'B{idx}'] = tipo[1]
+    
+    ws_tipos.column_dimensions['A'].width = 8
+    ws_tipos.column_dimensions['B'].width = 35
+
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
@@ -1,27 +1,34 @@
+from django.conf import settings
 from rest_framework import serializers
 
 
 class ImportarCatalogoSerializer(serializers.Serializer):
     """
-    Serializer para la importación de catálogo desde archivo Excel.
-    El archivo debe seguir la plantilla descargada.
+    Serializer para la importación de catálogo desde archivo Excel, CSV o Parquet.
+    El archivo debe seguir las columnas de la plantilla descargada.
     """
     archivo = serializers.FileField(
         required=True,
-        help_text="Archivo Excel (.xlsx) con el catálogo de productos"
+        help_text="Archivo Excel (.xlsx), CSV (.csv) o Parquet (.parquet) con el catálogo de productos"
+    )
+    asincrono = serializers.BooleanField(
+        required=False,
+        default=True,
+        help_text="Encolar la importación y consultar el avance por job_id (default: true)"
     )
     
     def validate_archivo(self, value):
-        """Validar que el archivo sea Excel"""
-        if not value.name.endswith(('.xlsx', '.xls')):
+        """Validar que el archivo sea Excel, CSV o Parquet"""
+        if not value.name.lower().endswith(('.xlsx', '.xls', '.csv', '.parquet')):
             raise serializers.ValidationError(
-                "El archivo debe ser de formato Excel (.xlsx o .xls)"
+                "El archivo debe ser de formato Excel (.xlsx o .xls), CSV (.csv) o Parquet (.parquet)"
             )
         
-        # Validar tamaño (máximo 10MB)
-        if value.size > 10 * 1024 * 1024:
+        # Validar tamaño (máximo CATALOGO_IMPORT_MAX_MB, 25MB por defecto)
+        max_mb = getattr(settings, "CATALOGO_IMPORT_MAX_MB", 25)
+        if value.size > max_mb * 1024 * 1024:
             raise serializers.ValidationError(
-                "El archivo no debe superar los 10MB"
+                f"El archivo no debe superar los {max_mb}MB"
             )
         
         return value
@@ -42,6 +49,11 @@ class ResultadoImportacionSerializer(serializers.Serializer):
     )
 
 
+class ExportarCatalogoQuerySerializer(serializers.Serializer):
+    """Parámetros de la exportación del catálogo"""
+    formato = serializers.ChoiceField(choices=['xlsx', 'csv', 'parquet'], default='xlsx', required=False)
+
+
 class ProductoExportadoSerializer(serializers.Serializer):
     """Serializer para un producto exportado"""
     id = serializers.IntegerField()
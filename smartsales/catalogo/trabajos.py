@@ -0,0 +1,197 @@
+"""
+Importaciones de catálogo en segundo plano.
+
+La vista guarda el archivo en catalogo_importacion y responde 202 con el id del
+trabajo; el cliente consulta el avance en /api/catalogo/importar/<job_id>/.
+Los trabajos los toman workers con FOR UPDATE SKIP LOCKED (hilos de este
+proceso o el comando `procesar_importaciones_catalogo` en otra máquina).
+
+Cada lote se inserta en la misma transacción que actualiza el avance del
+trabajo (contadores, errores y última fila confirmada). Si un worker muere a
+mitad de camino, el trabajo vuelve a tomarse después de
+CATALOGO_IMPORT_TIMEOUT_PROCESANDO segundos sin avance y continúa desde la
+última fila confirmada, sin duplicar productos.
+"""
+import io
+import json
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from smartsales.hilos import PoolHilos, pool
+from . import importacion
+
+logger = logging.getLogger(__name__)
+
+
+def _cfg(nombre, default):
+    return getattr(settings, nombre, default)
+
+
+# ---------- registro (vista) ----------
+def crear(vendedor_id, archivo, formato: str) -> str:
+    """Guarda el archivo como trabajo pendiente y devuelve su id."""
+    archivo.seek(0)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO catalogo_importacion (vendedor_id, formato, nombre_archivo, archivo)
+            VALUES (%s, %s, %s, %s)
+            RETURNING id
+            """,
+            [vendedor_id, formato, archivo.name[:255], archivo.read()]
+        )
+        job_id = str(cursor.fetchone()[0])
+    transaction.on_commit(despertar)
+    return job_id
+
+
+def obtener(job_id, vendedor_id):
+    """Estado del trabajo del vendedor, o None si no existe o es de otro vendedor."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT id, estado, formato, nombre_archivo, lotes_procesados, ultima_fila,
+                   total_procesados, exitosos, fallidos, errores, detalle,
+                   creado_en, terminado_en
+            FROM catalogo_importacion
+            WHERE id = %s AND vendedor_id = %s
+            """,
+            [job_id, vendedor_id]
+        )
+        row = cursor.fetchone()
+    if not row:
+        return None
+    return {
+        'id': str(row[0]),
+        'estado': row[1],
+        'formato': row[2],
+        'nombre_archivo': row[3],
+        'lotes_procesados': row[4],
+        'ultima_fila': row[5],
+        'total_procesados': row[6],
+        'exitosos': row[7],
+        'fallidos': row[8],
+        'errores': sorted(row[9] or [], key=lambda e: e['fila']),
+        'detalle': row[10],
+        'creado_en': row[11],
+        'terminado_en': row[12],
+    }
+
+
+# ---------- procesamiento ----------
+def _tomar():
+    """Marca como 'procesando' un trabajo listo y lo devuelve (o None)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            WITH listo AS (
+                SELECT id
+                FROM catalogo_importacion
+                WHERE estado = 'pendiente'
+                   OR (estado = 'procesando' AND tomado_en < NOW() - make_interval(secs => %s))
+                ORDER BY creado_en
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE catalogo_importacion c
+            SET estado = 'procesando', tomado_en = NOW(), intentos = c.intentos + 1
+            FROM listo
+            WHERE c.id = listo.id
+            RETURNING c.id, c.vendedor_id, c.formato, c.archivo, c.ultima_fila, c.intentos
+            """,
+            [_cfg('CATALOGO_IMPORT_TIMEOUT_PROCESANDO', 300)]
+        )
+        return cursor.fetchone()
+
+
+def _registrar_avance(job_id, avance):
+    """Se ejecuta dentro de la transacción del lote (ver importacion.importar)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE catalogo_importacion
+            SET lotes_procesados = lotes_procesados + 1,
+                total_procesados = total_procesados + %s,
+                exitosos = exitosos + %s,
+                fallidos = fallidos + %s,
+                errores = errores || %s::jsonb,
+                ultima_fila = %s,
+                tomado_en = NOW()
+            WHERE id = %s
+            """,
+            [
+                avance['procesados'],
+                avance['exitosos'],
+                avance['procesados'] - avance['exitosos'],
+                json.dumps(avance['errores']),
+                avance['ultima_fila'],
+                job_id,
+            ]
+        )
+
+
+def _terminar(job_id, estado: str, detalle: str | None = None):
+    # El archivo ya no hace falta: se libera el espacio
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE catalogo_importacion
+            SET estado = %s, detalle = %s, archivo = NULL, terminado_en = NOW()
+            WHERE id = %s
+            """,
+            [estado, detalle, job_id]
+        )
+
+
+def procesar(trabajo) -> str:
+    """Procesa un trabajo tomado con _tomar(). Devuelve el estado final."""
+    job_id, vendedor_id, formato, archivo, ultima_fila, intentos = trabajo
+    if intentos > _cfg('CATALOGO_IMPORT_MAX_INTENTOS', 3):
+        _terminar(job_id, 'fallido', 'Se superó el número de intentos de procesamiento')
+        return 'fallido'
+    try:
+        importacion.importar(
+            io.BytesIO(bytes(archivo)), vendedor_id, formato,
+            progreso=lambda avance: _registrar_avance(job_id, avance),
+            desde_fila=ultima_fila,
+        )
+    except Exception as e:
+        logger.error(f"[IMPORTACION] Trabajo {job_id} falló: {e}")
+        _terminar(job_id, 'fallido', f"Error al procesar el archivo: {e}"[:2000])
+        return 'fallido'
+    _terminar(job_id, 'completado')
+    return 'completado'
+
+
+def procesar_cola(limite: int = 1) -> dict:
+    """Procesa hasta `limite` trabajos. Devuelve estadísticas."""
+    stats = {'procesados': 0, 'completados': 0, 'fallidos': 0}
+    for _ in range(limite):
+        trabajo = _tomar()
+        if not trabajo:
+            break
+        stats['procesados'] += 1
+        estado = procesar(trabajo)
+        stats['completados' if estado == 'completado' else 'fallidos'] += 1
+    return stats
+
+
+# ---------- workers en proceso ----------
+def _vaciar_cola():
+    while procesar_cola()['procesados']:
+        pass
+
+
+def despertar():
+    """
+    Avisa a los workers en proceso (no hace nada con CATALOGO_IMPORT_WORKERS=0).
+    También figura en HILOS_AL_INICIAR: los trabajos abandonados se retoman
+    aunque no se cree otro en este worker.
+    """
+    pool("catalogo-import", lambda: PoolHilos(
+        "catalogo-import", _vaciar_cola,
+        workers=_cfg('CATALOGO_IMPORT_WORKERS', 1),
+        intervalo=_cfg('CATALOGO_IMPORT_INTERVALO', 30.0),
+    )).despertar()
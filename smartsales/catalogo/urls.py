@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     DescargarPlantillaView,
     ImportarCatalogoView,
+    EstadoImportacionView,
     ExportarCatalogoView,
 )
 
@@ -22,6 +23,13 @@ urlpatterns = [
         name='importar_catalogo'
     ),
     
+    # Avance de una importación encolada
+    path(
+        'importar/<uuid:job_id>/',
+        EstadoImportacionView.as_view(),
+        name='estado_importacion'
+    ),
+    
     # Exportar catálogo a Excel
     path(
         'exportar/',
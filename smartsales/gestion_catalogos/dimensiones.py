@@ -0,0 +1,109 @@
+"""
+Cache compartido de las dimensiones del catálogo (marcas y tipos de producto).
+
+Lo usan el listado de productos (filtros), gestionproducto, la plantilla de
+importación del catálogo y la importación misma. Las vistas de gestion_catalogos
+llaman a invalidar() al crear, editar o eliminar una marca o un tipo.
+
+Las claves incluyen un token de versión (version()), que también sirve a otros
+caches derivados de las dimensiones (p. ej. la plantilla Excel) para saber si
+quedaron viejos.
+
+Solo se activa por defecto con un cache compartido en memoria (Redis/memcached).
+Con locmem la invalidación no llega a los otros workers (uno rechazaría en la
+importación una marca recién creada en otro) y con dbcache leer el token y la
+entrada cuesta más que la consulta: DIMENSIONES_CACHE_TTL vale 0 y cada llamada
+consulta la base.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from smartsales.db_utils import execute_query_with_retry
+
+_CLAVE_VERSION = "dimensiones:v"
+
+_CONSULTAS = {
+    "marca": "SELECT id, nombre FROM marca ORDER BY nombre ASC",
+    "tipoproducto": "SELECT id, nombre FROM tipoproducto ORDER BY nombre ASC",
+}
+
+
+def version() -> str:
+    return cache.get_or_set(_CLAVE_VERSION, lambda: uuid.uuid4().hex, None)
+
+
+def invalidar():
+    """Cambia la versión después del commit actual (o de inmediato si no hay transacción)."""
+    transaction.on_commit(lambda: cache.set(_CLAVE_VERSION, uuid.uuid4().hex, None))
+
+
+def _consultar(tabla: str):
+    return [tuple(r) for r in (execute_query_with_retry(_CONSULTAS[tabla], fetch_all=True) or [])]
+
+
+def _filas(tabla: str):
+    ttl = getattr(settings, "DIMENSIONES_CACHE_TTL", 0)
+    if ttl <= 0:
+        return _consultar(tabla)
+    clave = f"dimensiones:{version()}:{tabla}"
+    filas = cache.get(clave)
+    if filas is None:
+        filas = _consultar(tabla)
+        cache.set(clave, filas, ttl)
+    return filas
+
+
+def marcas():
+    """[(id, nombre), ...] ordenado por nombre."""
+    return _filas("marca")
+
+
+def tipos():
+    """[(id, nombre), ...] ordenado por nombre."""
+    return _filas("tipoproducto")
+
+
+def como_dicts(filas):
+    return [{"id": r[0], "nombre": r[1]} for r in filas]
+
+
+def ids_por_nombre(filas):
+    """{nombre en minúsculas: id}, para resolver nombres escritos por el usuario."""
+    return {r[1].lower(): r[0] for r in filas}
+
+
+# ---------- facetas ----------
+def facetas(base_sql: str, base_params, marca_sql: str | None = None, marca_params=(),
+            tipo_sql: str | None = None, tipo_params=()):
+    """
+    Cantidad de productos por marca y por tipo en una sola consulta agrupada.
+
+    base_sql: condiciones comunes (búsqueda, precio, stock...) sobre `p`.
+    marca_sql / tipo_sql: filtro de marca / tipo seleccionado. Cada faceta ignora
+    su propio filtro, así el usuario ve cuántos productos hay en las demás opciones.
+    Devuelve ({marca_id: n}, {tipoproducto_id: n}).
+    """
+    cond_marca = marca_sql or "TRUE"
+    cond_tipo = tipo_sql or "TRUE"
+    rows = execute_query_with_retry(
+        f"""
+        SELECT GROUPING(p.marca_id) AS es_tipo, p.marca_id, p.tipoproducto_id,
+               COUNT(*) FILTER (WHERE {cond_tipo}) AS n_por_marca,
+               COUNT(*) FILTER (WHERE {cond_marca}) AS n_por_tipo
+        FROM producto p
+        WHERE {base_sql}
+        GROUP BY GROUPING SETS ((p.marca_id), (p.tipoproducto_id))
+        """,
+        list(tipo_params) + list(marca_params) + list(base_params),
+        fetch_all=True
+    ) or []
+    por_marca, por_tipo = {}, {}
+    for es_tipo, marca_id, tipo_id, n_marca, n_tipo in rows:
+        if es_tipo:
+            por_tipo[tipo_id] = n_tipo
+        else:
+            por_marca[marca_id] = n_marca
+    return por_marca, por_tipo
@@ -5,6 +5,8 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from smartsales.rolesusuario.permissions import IsAdminRole
+from . import dimensiones
+from smartsales.condicional import condicional_catalogo
 from .serializers import (
     TipoProductoSerializer,
     CrearTipoProductoSerializer,
@@ -26,21 +28,9 @@ class ListarTiposProductoView(APIView):
     """
     permission_classes = [IsAuthenticated, IsAdminRole]
     
+    @condicional_catalogo()
     def get(self, request):
-        with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT id, nombre
-                FROM tipoproducto
-                ORDER BY nombre ASC
-                """
-            )
-            rows = cursor.fetchall()
-        
-        tipos = [
-            {'id': row[0], 'nombre': row[1]}
-            for row in rows
-        ]
+        tipos = dimensiones.como_dicts(dimensiones.tipos())
         
         return Response(
             TipoProductoSerializer(tipos, many=True).data,
@@ -91,6 +81,9 @@ class CrearTipoProductoView(APIView):
                 )
                 row = cursor.fetchone()
             
+            # Marcas/tipos cacheados (filtros, plantilla, importación) quedan viejos
+            dimensiones.invalidar()
+            
             tipo_creado = {
                 'id': row[0],
                 'nombre': row[1]
@@ -169,6 +162,9 @@ class ActualizarTipoProductoView(APIView):
                 )
                 row = cursor.fetchone()
             
+            # Marcas/tipos cacheados (filtros, plantilla, importación) quedan viejos
+            dimensiones.invalidar()
+            
             tipo_actualizado = {
                 'id': row[0],
                 'nombre': row[1]
@@ -235,6 +231,8 @@ class EliminarTipoProductoView(APIView):
                     [tipo_id]
                 )
             
+            dimensiones.invalidar()
+            
             return Response(
                 {"detail": f"Tipo de producto '{tipo[1]}' eliminado exitosamente."},
                 status=status.HTTP_200_OK
@@ -258,21 +256,9 @@ class ListarMarcasView(APIView):
     """
     permission_classes = [IsAuthenticated, IsAdminRole]
     
+    @condicional_catalogo()
     def get(self, request):
-        with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT id, nombre
-                FROM marca
-                ORDER BY nombre ASC
-                """
-            )
-            rows = cursor.fetchall()
-        
-        marcas = [
-            {'id': row[0], 'nombre': row[1]}
-            for row in rows
-        ]
+        marcas = dimensiones.como_dicts(dimensiones.marcas())
         
         return Response(
             MarcaSerializer(marcas, many=True).data,
@@ -323,6 +309,9 @@ class CrearMarcaView(APIView):
                 )
                 row = cursor.fetchone()
             
+            # Marcas/tipos cacheados (filtros, plantilla, importación) quedan viejos
+            dimensiones.invalidar()
+            
             marca_creada = {
                 'id': row[0],
                 'nombre': row[1]
@@ -401,6 +390,9 @@ class ActualizarMarcaView(APIView):
                 )
                 row = cursor.fetchone()
             
+            # Marcas/tipos cacheados (filtros, plantilla, importación) quedan viejos
+            dimensiones.invalidar()
+            
             marca_actualizada = {
                 'id': row[0],
                 'nombre': row[1]
@@ -467,6 +459,8 @@ class EliminarMarcaView(APIView):
                     [marca_id]
                 )
             
+            dimensiones.invalidar()
+            
             return Response(
                 {"detail": f"Marca '{marca[1]}' eliminada exitosamente."},
                 status=status.HTTP_200_OK
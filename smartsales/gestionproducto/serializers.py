@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from smartsales.paginacion import MODOS_CONTEO
 
 class ProductoCreateSerializer(serializers.Serializer):
     nombre = serializers.CharField(max_length=160)
@@ -26,3 +27,5 @@ class ProductoQuerySerializer(serializers.Serializer):
     max_precio = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
     page = serializers.IntegerField(required=False, min_value=1)
     page_size = serializers.IntegerField(required=False, min_value=1, max_value=100)
+    cursor = serializers.CharField(required=False, max_length=200)
+    count = serializers.ChoiceField(choices=MODOS_CONTEO, required=False)
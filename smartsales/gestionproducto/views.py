@@ -12,6 +12,9 @@ from .serializers import (
     ProductoCreateSerializer, ProductoUpdateSerializer, ProductoQuerySerializer
 )
 from .storage import upload_image, delete_image_if_exists, public_url
+from smartsales.gestion_catalogos import dimensiones
+from smartsales.paginacion import contar, encode_cursor, decode_cursor, CursorInvalido
+from smartsales.condicional import condicional_catalogo
 
 # ---------- Helpers ----------
 
@@ -59,21 +62,15 @@ def _row_to_payload(row):
 
 class MarcaListView(APIView):
     permission_classes = [IsAuthenticated, role_required(ROLE_ADMIN_NAME, ROLE_VENDEDOR_NAME)]
+    @condicional_catalogo()
     def get(self, request):
-        rows = execute_query_with_retry(
-            "SELECT id, nombre FROM marca ORDER BY nombre ASC",
-            fetch_all=True
-        )
-        return Response([{"id": r[0], "nombre": r[1]} for r in rows])
+        return Response(dimensiones.como_dicts(dimensiones.marcas()))
 
 class TipoProductoListView(APIView):
     permission_classes = [IsAuthenticated, role_required(ROLE_ADMIN_NAME, ROLE_VENDEDOR_NAME)]
+    @condicional_catalogo()
     def get(self, request):
-        rows = execute_query_with_retry(
-            "SELECT id, nombre FROM tipoproducto ORDER BY nombre ASC",
-            fetch_all=True
-        )
-        return Response([{"id": r[0], "nombre": r[1]} for r in rows])
+        return Response(dimensiones.como_dicts(dimensiones.tipos()))
 
 # ---------- Listar / Crear ----------
 
@@ -81,6 +78,7 @@ class ProductoListCreateView(APIView):
     permission_classes = [IsAuthenticated, role_required(ROLE_ADMIN_NAME, ROLE_VENDEDOR_NAME)]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
+    @condicional_catalogo(por_usuario=True)
     def get(self, request):
         uid = request.user.id
         qser = ProductoQuerySerializer(data=request.query_params)
@@ -120,27 +118,46 @@ class ProductoListCreateView(APIView):
 
         where = ("WHERE " + " AND ".join(filters)) if filters else ""
 
-        count_row = execute_query_with_retry(
-            f"SELECT COUNT(*) FROM producto p {where}",
-            params,
-            fetch_one=True
-        )
-        total = int(count_row[0]) if count_row else 0
+        # Total según el modo pedido (por defecto exacto; con cursor no se recalcula)
+        cursor = qser.validated_data.get("cursor")
+        modo = qser.validated_data.get("count") or ("ninguno" if cursor else "exacto")
+        total = contar(f"FROM producto p {where}", params, modo, tabla=None if filters else "producto")
+
+        # Keyset: con cursor se continúa desde el último id (sin OFFSET)
+        page_filters = list(filters)
+        page_params = list(params)
+        if cursor:
+            try:
+                (last_id,) = decode_cursor(cursor, 1)
+                page_filters.append("p.id < %s")
+                page_params.append(int(last_id))
+            except (CursorInvalido, TypeError, ValueError):
+                return Response({"detail": "cursor inválido."}, status=400)
+            offset = 0
+        page_where = ("WHERE " + " AND ".join(page_filters)) if page_filters else ""
 
         rows = execute_query_with_retry(
             f"""
             SELECT p.id, p.id_vendedor, p.imagen_key, p.nombre, p.precio, p.stock,
                    p.tiempogarantia, p.marca_id, p.tipoproducto_id
             FROM producto p
-            {where}
+            {page_where}
             ORDER BY p.id DESC
             LIMIT %s OFFSET %s
             """,
-            params + [page_size, offset],
+            page_params + [page_size + 1, offset],
             fetch_all=True
-        )
-        data = [_row_to_payload(r) for r in rows]
-        return Response({"count": total, "page": page, "page_size": page_size, "results": data})
+        ) or []
+        next_cursor = encode_cursor(rows[page_size - 1][0]) if len(rows) > page_size else None
+        data = [_row_to_payload(r) for r in rows[:page_size]]
+        return Response({
+            "count": total,
+            "count_mode": modo,
+            "page": page,
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "results": data,
+        })
 
     def post(self, request):
         uid = request.user.id
@@ -229,6 +246,7 @@ class ProductoDetailView(APIView):
     permission_classes = [IsAuthenticated, role_required(ROLE_ADMIN_NAME, ROLE_VENDEDOR_NAME)]
     parser_classes = [MultiPartParser, FormParser, JSONParser]
 
+    @condicional_catalogo(por_usuario=True)
     def get(self, request, pk: int):
         row = _get_product_or_404(pk)
         if not row:
@@ -8,6 +8,7 @@ from django.db import connection, transaction
 
 from smartsales.db_utils import execute_query_with_retry, db_retry
 from smartsales.rolesusuario.permissions import IsAdminRole
+from smartsales import usuario_correo
 # Reutilizamos los valores y la excepción del módulo authsupabase, sin modificarlo
 from smartsales.authsupabase.api import AUTH_URL, SUPABASE_SERVICE_ROLE_KEY, SUPABASE_ANON_KEY, SupabaseError
 
@@ -139,9 +140,16 @@ class UsuarioPerfilUpdateView(APIView):
         params.append(user_id)
 
         with connection.cursor() as cur:
-            cur.execute(f"UPDATE usuario SET {', '.join(sets)} WHERE id=%s", params)
-            if cur.rowcount == 0:
+            # `anterior` es la fila antes del UPDATE: se invalida el correo previo y el nuevo
+            cur.execute(
+                f"UPDATE usuario u SET {', '.join(sets)} FROM usuario anterior "
+                "WHERE u.id=%s AND anterior.id = u.id RETURNING anterior.correo, u.correo",
+                params
+            )
+            row = cur.fetchone()
+            if not row:
                 return Response({"detail": "Usuario no encontrado."}, status=404)
+            usuario_correo.invalidar(*row)
 
         data = _fetch_user_with_roles(user_id)
         return Response(UsuarioItemSerializer(data).data, status=200)
@@ -255,10 +263,12 @@ class UsuarioDeleteView(APIView):
 
         # 2) Eliminar en DB (respetará FKs; CASCADE donde aplique)
         with connection.cursor() as cur:
-            cur.execute("DELETE FROM usuario WHERE id=%s", [user_id])
-            if cur.rowcount == 0:
+            cur.execute("DELETE FROM usuario WHERE id=%s RETURNING correo", [user_id])
+            row = cur.fetchone()
+            if not row:
                 # Si ya no existe en DB, igual devolvemos 204
                 return Response(status=204)
+            usuario_correo.invalidar(row[0])
 
         return Response(status=204)
 
@@ -304,9 +314,16 @@ class MiPerfilView(APIView):
         params.append(user_id)
 
         with connection.cursor() as cur:
-            cur.execute(f"UPDATE usuario SET {', '.join(sets)} WHERE id=%s", params)
-            if cur.rowcount == 0:
+            # `anterior` es la fila antes del UPDATE: se invalida el correo previo y el nuevo
+            cur.execute(
+                f"UPDATE usuario u SET {', '.join(sets)} FROM usuario anterior "
+                "WHERE u.id=%s AND anterior.id = u.id RETURNING anterior.correo, u.correo",
+                params
+            )
+            row = cur.fetchone()
+            if not row:
                 return Response({"detail": "Usuario no encontrado."}, status=404)
+            usuario_correo.invalidar(*row)
 
         data = _fetch_user_with_roles(user_id)
         return Response(UsuarioItemSerializer(data).data, status=200)
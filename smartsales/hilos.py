@@ -0,0 +1,83 @@
+"""
+Hilos de fondo compartidos por los workers en proceso.
+
+PoolHilos corre `tarea()` en `workers` hilos daemon cada vez que se lo despierta
+y, además, cada `intervalo` segundos (intervalo=None: solo cuando se lo
+despierta). Los hilos se crean (o se reemplazan si murieron) en despertar().
+Después de cada vuelta se cierra la conexión del hilo: los hilos de fondo no
+pasan por request_finished.
+
+Arranque: los pools que tienen trabajo propio (reintentos del inbox de Stripe,
+importaciones abandonadas) no pueden esperar a que llegue un request al
+proceso. gunicorn.conf.py llama a iniciar() en cada worker nuevo (también en
+los que reemplazan a los reciclados), que ejecuta las funciones listadas en
+HILOS_AL_INICIAR.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class PoolHilos:
+
+    def __init__(self, nombre: str, tarea, workers: int = 1, intervalo: float | None = None):
+        self.nombre = nombre
+        self.tarea = tarea
+        self.workers = workers
+        self.intervalo = intervalo
+        self._wake = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def despertar(self, avisar: bool = True):
+        """Asegura los hilos vivos; con avisar=False no adelanta la próxima vuelta."""
+        if self.workers <= 0:
+            return
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._loop, name=f"{self.nombre}-{len(self._threads)}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        if avisar:
+            self._wake.set()
+
+    def _loop(self):
+        while True:
+            self._wake.wait(self.intervalo)
+            self._wake.clear()
+            try:
+                self.tarea()
+            except Exception as e:
+                logger.warning(f"[HILOS] Error en {self.nombre}: {e}")
+            finally:
+                connection.close()
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def pool(nombre: str, crear):
+    """El pool (o el objeto que lo envuelve) `nombre` de este proceso; `crear()` lo construye la primera vez."""
+    existente = _POOLS.get(nombre)
+    if existente is not None:
+        return existente
+    with _POOLS_LOCK:
+        if nombre not in _POOLS:
+            _POOLS[nombre] = crear()
+        return _POOLS[nombre]
+
+
+def iniciar():
+    """Ejecuta las funciones de HILOS_AL_INICIAR (rutas 'modulo.funcion')."""
+    for ruta in getattr(settings, "HILOS_AL_INICIAR", []):
+        try:
+            import_string(ruta)()
+        except Exception as e:
+            logger.error(f"[HILOS] No se pudo iniciar {ruta}: {e}")
@@ -0,0 +1,56 @@
+"""
+Cache por usuario del historial de pagos.
+
+Cada usuario tiene un token de versión en el cache; las claves de las respuestas
+lo incluyen, así que invalidar es solo cambiar el token (las entradas viejas
+expiran solas). El token es aleatorio, no un contador: si el cache pierde la
+clave de versión no se reutiliza una versión anterior con datos viejos.
+
+Invalidan: el procesador del webhook de Stripe, la venta manual y el
+enriquecedor de recibos, siempre en on_commit.
+
+Solo vale la pena con un cache compartido en memoria (Redis/memcached): con
+locmem la invalidación no llega a los otros workers y con dbcache un acierto
+cuesta dos consultas. En esos casos HISTORIAL_PAGOS_CACHE_TTL vale 0 por
+defecto y obtener/guardar no hacen nada.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _ttl():
+    return getattr(settings, "HISTORIAL_PAGOS_CACHE_TTL", 300)
+
+
+def _clave_version(usuario_id) -> str:
+    return f"historialpagos:v:{usuario_id}"
+
+
+def version(usuario_id) -> str:
+    return cache.get_or_set(_clave_version(usuario_id), lambda: uuid.uuid4().hex, None)
+
+
+def _clave(usuario_id, *partes) -> str:
+    # Las partes (p. ej. un cursor) pueden ser largas: se resumen para respetar el largo máximo de clave
+    resumen = hashlib.md5("|".join(map(str, partes)).encode()).hexdigest()
+    return f"historialpagos:{usuario_id}:{version(usuario_id)}:{resumen}"
+
+
+def obtener(usuario_id, *partes):
+    if _ttl() <= 0:
+        return None
+    return cache.get(_clave(usuario_id, *partes))
+
+
+def guardar(usuario_id, valor, *partes):
+    if _ttl() <= 0:
+        return
+    cache.set(_clave(usuario_id, *partes), valor, _ttl())
+
+
+def invalidar(*usuario_ids):
+    """Cambia la versión de cada usuario: sus respuestas cacheadas dejan de usarse."""
+    cache.set_many({_clave_version(u): uuid.uuid4().hex for u in usuario_ids if u}, None)
@@ -22,3 +22,9 @@ class HistorialPagoSerializer(serializers.Serializer):
     
     # Campos opcionales de Stripe
     receipt_url = serializers.URLField(required=False, allow_null=True)
+
+
+class HistorialPagosQuerySerializer(serializers.Serializer):
+    """Parámetros opcionales de paginación (keyset) del historial"""
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=100)
+    cursor = serializers.CharField(required=False, allow_blank=False, max_length=200)
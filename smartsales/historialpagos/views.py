@@ -3,23 +3,102 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import HistorialPagoSerializer
+from smartsales.paginacion import encode_cursor, decode_cursor, parse_datetime_cursor, CursorInvalido
+from .serializers import HistorialPagoSerializer, HistorialPagosQuerySerializer
+from . import cache as historial_cache
+
+PAGE_SIZE_DEFAULT = 20
+
+
+def _productos_por_venta(cursor, venta_ids):
+    """Productos de todas las ventas en una sola consulta: {venta_id: [producto, ...]}."""
+    productos = {vid: [] for vid in venta_ids}
+    if not venta_ids:
+        return productos
+    cursor.execute("""
+        SELECT
+            dv.venta_id,
+            dv.producto_id,
+            prod.nombre AS producto_nombre,
+            dv.cantidad,
+            prod.precio AS precio_unitario,
+            (prod.precio * dv.cantidad) AS subtotal
+        FROM detalleventa dv
+        INNER JOIN producto prod ON dv.producto_id = prod.id
+        WHERE dv.venta_id = ANY(%s)
+        ORDER BY dv.venta_id, dv.producto_id
+    """, [list(venta_ids)])
+    for p in cursor.fetchall():
+        productos[p[0]].append({
+            'producto_id': p[1],
+            'producto_nombre': p[2],
+            'cantidad': p[3],
+            'precio_unitario': float(p[4]),
+            'subtotal': float(p[5])
+        })
+    return productos
+
+
+def _armar_pago(row, productos):
+    pago_id, venta_id, total, fecha_pago, fecha_venta, direccion, _, receipt_url = row
+    return {
+        'pago_id': pago_id,
+        'venta_id': venta_id,
+        'total': float(total),
+        'fecha_pago': fecha_pago,
+        'fecha_venta': fecha_venta,
+        'direccion_envio': direccion,
+        'productos': productos.get(venta_id, []),
+        'receipt_url': receipt_url  # Ahora viene de la base de datos
+    }
 
 
 class HistorialPagosView(APIView):
     """
     Vista para obtener el historial de pagos del usuario autenticado.
     Muestra todos los pagos realizados con sus detalles.
+
+    Paginación opcional por keyset: `page_size` y `cursor` (el `next_cursor` de la
+    respuesta anterior). Con cualquiera de los dos la respuesta es
+    {"results": [...], "next_cursor": ...}; sin ellos se devuelve la lista completa.
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         usuario_id = request.user.id
-        
+
+        qser = HistorialPagosQuerySerializer(data=request.query_params)
+        qser.is_valid(raise_exception=True)
+        q = qser.validated_data
+        paginado = 'page_size' in q or 'cursor' in q
+        page_size = q.get('page_size', PAGE_SIZE_DEFAULT)
+
+        where = ["v.usuario_id = %s"]
+        params = [usuario_id]
+        if q.get('cursor'):
+            try:
+                hora, pago_id = decode_cursor(q['cursor'], 2)
+                where.append("(p.hora, p.id) < (%s, %s)")
+                params += [parse_datetime_cursor(hora), int(pago_id)]
+            except (CursorInvalido, TypeError, ValueError):
+                return Response({"detail": "cursor inválido."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Respuesta cacheada por usuario (la versión cambia con cada venta nueva)
+        clave = ('lista', q.get('page_size', ''), q.get('cursor', '')) if paginado else ('lista',)
+        cacheado = historial_cache.obtener(usuario_id, *clave)
+        if cacheado is not None:
+            return Response(cacheado, status=status.HTTP_200_OK)
+
+        limit_sql = ""
+        if paginado:
+            # Una fila extra para saber si hay página siguiente
+            limit_sql = "LIMIT %s"
+            params.append(page_size + 1)
+
         with connection.cursor() as cursor:
-            # Obtener todos los pagos del usuario con detalles
-            cursor.execute("""
-                SELECT 
+            # Pagos de la página (orden estable por hora y id)
+            cursor.execute(f"""
+                SELECT
                     p.id AS pago_id,
                     p.venta_id,
                     p.total,
@@ -30,60 +109,33 @@ class HistorialPagosView(APIView):
                     p.receipt_url
                 FROM pagos p
                 INNER JOIN venta v ON p.venta_id = v.id
-                WHERE v.usuario_id = %s
-                ORDER BY p.hora DESC
-            """, [usuario_id])
-            
+                WHERE {' AND '.join(where)}
+                ORDER BY p.hora DESC, p.id DESC
+                {limit_sql}
+            """, params)
+
             pagos_rows = cursor.fetchall()
-            
-            if not pagos_rows:
-                return Response([], status=status.HTTP_200_OK)
-            
-            # Construir respuesta con detalles de cada pago
-            historial = []
-            
-            for row in pagos_rows:
-                pago_id, venta_id, total, fecha_pago, fecha_venta, direccion, _, receipt_url = row
-                
-                # Obtener productos de esta venta
-                cursor.execute("""
-                    SELECT 
-                        dv.producto_id,
-                        prod.nombre AS producto_nombre,
-                        dv.cantidad,
-                        prod.precio AS precio_unitario,
-                        (prod.precio * dv.cantidad) AS subtotal
-                    FROM detalleventa dv
-                    INNER JOIN producto prod ON dv.producto_id = prod.id
-                    WHERE dv.venta_id = %s
-                """, [venta_id])
-                
-                productos_rows = cursor.fetchall()
-                
-                productos = [
-                    {
-                        'producto_id': p[0],
-                        'producto_nombre': p[1],
-                        'cantidad': p[2],
-                        'precio_unitario': float(p[3]),
-                        'subtotal': float(p[4])
-                    }
-                    for p in productos_rows
-                ]
-                
-                historial.append({
-                    'pago_id': pago_id,
-                    'venta_id': venta_id,
-                    'total': float(total),
-                    'fecha_pago': fecha_pago,
-                    'fecha_venta': fecha_venta,
-                    'direccion_envio': direccion,
-                    'productos': productos,
-                    'receipt_url': receipt_url  # Ahora viene de la base de datos
-                })
-        
-        serializer = HistorialPagoSerializer(historial, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+
+            next_cursor = None
+            if paginado and len(pagos_rows) > page_size:
+                pagos_rows = pagos_rows[:page_size]
+                ultimo = pagos_rows[-1]
+                next_cursor = encode_cursor(ultimo[3], ultimo[0])
+
+            # Productos de todas las ventas de la página en una sola consulta
+            productos = _productos_por_venta(cursor, [r[1] for r in pagos_rows])
+
+        historial = [_armar_pago(row, productos) for row in pagos_rows]
+        data = HistorialPagoSerializer(historial, many=True).data
+
+        if paginado:
+            data = {
+                'results': data,
+                'next_cursor': next_cursor,
+                'page_size': page_size,
+            }
+        historial_cache.guardar(usuario_id, data, *clave)
+        return Response(data, status=status.HTTP_200_OK)
 
 
 class DetallePagoView(APIView):
@@ -95,11 +147,15 @@ class DetallePagoView(APIView):
 
     def get(self, request, pago_id):
         usuario_id = request.user.id
-        
+
+        cacheado = historial_cache.obtener(usuario_id, 'detalle', pago_id)
+        if cacheado is not None:
+            return Response(cacheado, status=status.HTTP_200_OK)
+
         with connection.cursor() as cursor:
             # Verificar que el pago pertenece al usuario
             cursor.execute("""
-                SELECT 
+                SELECT
                     p.id AS pago_id,
                     p.venta_id,
                     p.total,
@@ -112,53 +168,19 @@ class DetallePagoView(APIView):
                 INNER JOIN venta v ON p.venta_id = v.id
                 WHERE p.id = %s AND v.usuario_id = %s
             """, [pago_id, usuario_id])
-            
+
             pago_row = cursor.fetchone()
-            
+
             if not pago_row:
                 return Response(
                     {"detail": "Pago no encontrado o no pertenece al usuario."},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            
-            pago_id, venta_id, total, fecha_pago, fecha_venta, direccion, _, receipt_url = pago_row
-            
+
             # Obtener productos de esta venta
-            cursor.execute("""
-                SELECT 
-                    dv.producto_id,
-                    prod.nombre AS producto_nombre,
-                    dv.cantidad,
-                    prod.precio AS precio_unitario,
-                    (prod.precio * dv.cantidad) AS subtotal
-                FROM detalleventa dv
-                INNER JOIN producto prod ON dv.producto_id = prod.id
-                WHERE dv.venta_id = %s
-            """, [venta_id])
-            
-            productos_rows = cursor.fetchall()
-            
-            productos = [
-                {
-                    'producto_id': p[0],
-                    'producto_nombre': p[1],
-                    'cantidad': p[2],
-                    'precio_unitario': float(p[3]),
-                    'subtotal': float(p[4])
-                }
-                for p in productos_rows
-            ]
-            
-            detalle = {
-                'pago_id': pago_id,
-                'venta_id': venta_id,
-                'total': float(total),
-                'fecha_pago': fecha_pago,
-                'fecha_venta': fecha_venta,
-                'direccion_envio': direccion,
-                'productos': productos,
-                'receipt_url': receipt_url  # Ahora viene de la base de datos
-            }
-        
+            productos = _productos_por_venta(cursor, [pago_row[1]])
+            detalle = _armar_pago(pago_row, productos)
+
         serializer = HistorialPagoSerializer(detalle)
+        historial_cache.guardar(usuario_id, serializer.data, 'detalle', pago_id)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -1,5 +1,6 @@
 # smartsales/listadoproductos/serializers.py
 from rest_framework import serializers
+from smartsales.paginacion import MODOS_CONTEO
 from smartsales.ventas_historicas.models import Producto, Marca, TipoProducto
 from smartsales.gestionproducto.storage import public_url
 
@@ -15,6 +16,8 @@ class ProductoListadoQuerySerializer(serializers.Serializer):
     max_stock = serializers.IntegerField(required=False, help_text="Stock máximo")
     page = serializers.IntegerField(required=False, min_value=1, default=1)
     page_size = serializers.IntegerField(required=False, min_value=1, max_value=100, default=20)
+    cursor = serializers.CharField(required=False, max_length=200, help_text="next_cursor de la página anterior (keyset)")
+    count = serializers.ChoiceField(choices=MODOS_CONTEO, required=False, help_text="Cómo calcular el total")
 
 
 class MarcaSerializer(serializers.ModelSerializer):
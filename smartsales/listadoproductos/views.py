@@ -6,9 +6,51 @@ from rest_framework import status
 from smartsales.db_utils import execute_query_with_retry
 from smartsales.rolesusuario.permissions import role_required, ROLE_ADMIN_NAME, ROLE_VENDEDOR_NAME
 from smartsales.gestionproducto.storage import public_url
+from smartsales.gestion_catalogos import dimensiones
+from smartsales.busqueda import get_motor, resaltar
+from smartsales.paginacion import contar, encode_cursor, decode_cursor, CursorInvalido
+from smartsales.condicional import condicional_catalogo
 from .serializers import ProductoListadoQuerySerializer
 
 
+def _condiciones(filters, motor):
+    """
+    Condiciones WHERE del listado a partir de los filtros validados.
+
+    Devuelve (condiciones, params, seleccion): las condiciones comunes (búsqueda,
+    precio, stock) y, aparte, la marca/tipo seleccionados como
+    {"marca": (sql, params), "tipo": (sql, params)}, para que las facetas puedan
+    ignorar cada uno en su propio conteo.
+    """
+    conditions = []
+    params = []
+
+    q = filters.get("q", "").strip()
+    if q:
+        # Texto completo (español, sin acentos) + trigramas; usa índices GIN
+        cond_sql, cond_params = motor.condicion(q)
+        conditions.append(cond_sql)
+        params.extend(cond_params)
+
+    for campo, sql in (
+        ("min_precio", "p.precio >= %s"),
+        ("max_precio", "p.precio <= %s"),
+        ("min_stock", "p.stock >= %s"),
+        ("max_stock", "p.stock <= %s"),
+    ):
+        if filters.get(campo) is not None:
+            conditions.append(sql)
+            params.append(filters[campo])
+
+    seleccion = {}
+    if filters.get("marca_id") is not None:
+        seleccion["marca"] = ("p.marca_id = %s", [filters["marca_id"]])
+    if filters.get("tipoproducto_id") is not None:
+        seleccion["tipo"] = ("p.tipoproducto_id = %s", [filters["tipoproducto_id"]])
+
+    return conditions, params, seleccion
+
+
 class ListadoProductosView(APIView):
     """
     Vista para listar TODOS los productos del sistema (sin restricción de vendedor).
@@ -17,6 +59,7 @@ class ListadoProductosView(APIView):
     """
     permission_classes = [AllowAny]
 
+    @condicional_catalogo()
     def get(self, request):
         # Validar parámetros de query
         qs = ProductoListadoQuerySerializer(data=request.query_params)
@@ -24,60 +67,49 @@ class ListadoProductosView(APIView):
         
         filters = qs.validated_data
         q = filters.get("q", "").strip()
-        marca_id = filters.get("marca_id")
-        tipo_id = filters.get("tipoproducto_id")
-        min_precio = filters.get("min_precio")
-        max_precio = filters.get("max_precio")
-        min_stock = filters.get("min_stock")
-        max_stock = filters.get("max_stock")
         page = filters.get("page", 1)
         page_size = filters.get("page_size", 20)
 
-        # Construir condiciones WHERE dinámicamente
-        conditions = []
-        params = []
-
-        if q:
-            conditions.append("LOWER(p.nombre) LIKE LOWER(%s)")
-            params.append(f"%{q}%")
-        
-        if marca_id is not None:
-            conditions.append("p.marca_id = %s")
-            params.append(marca_id)
-        
-        if tipo_id is not None:
-            conditions.append("p.tipoproducto_id = %s")
-            params.append(tipo_id)
-        
-        if min_precio is not None:
-            conditions.append("p.precio >= %s")
-            params.append(min_precio)
-        
-        if max_precio is not None:
-            conditions.append("p.precio <= %s")
-            params.append(max_precio)
-        
-        if min_stock is not None:
-            conditions.append("p.stock >= %s")
-            params.append(min_stock)
-        
-        if max_stock is not None:
-            conditions.append("p.stock <= %s")
-            params.append(max_stock)
+        motor = get_motor()
+        base_conditions, base_params, seleccion = _condiciones(filters, motor)
+        conditions = list(base_conditions)
+        params = list(base_params)
+        for cond_sql, cond_params in seleccion.values():
+            conditions.append(cond_sql)
+            params.extend(cond_params)
 
         where_clause = " AND ".join(conditions) if conditions else "1=1"
 
-        # Consulta para contar total de registros
-        count_query = f"""
-            SELECT COUNT(*)
-            FROM producto p
-            WHERE {where_clause}
-        """
-        total_count = execute_query_with_retry(count_query, params, fetch_one=True)[0]
-
         # Calcular offset para paginación
         offset = (page - 1) * page_size
 
+        # Con búsqueda se ordena por relevancia; sin ella, los más recientes primero
+        rango_sql, rango_params = ("0", [])
+        if q:
+            rango_sql, rango_params = motor.rango(q)
+
+        # Keyset: el cursor trae (relevancia, id) de la última fila; reemplaza a OFFSET
+        cursor = filters.get("cursor")
+        page_conditions = list(conditions)
+        page_params = list(params)
+        if cursor:
+            try:
+                last_rango, last_id = decode_cursor(cursor, 2)
+                if q:
+                    page_conditions.append(f"({rango_sql}, p.id) < (%s, %s)")
+                    page_params += rango_params + [float(last_rango), int(last_id)]
+                else:
+                    page_conditions.append("p.id < %s")
+                    page_params.append(int(last_id))
+            except (CursorInvalido, TypeError, ValueError):
+                return Response({"detail": "cursor inválido."}, status=status.HTTP_400_BAD_REQUEST)
+            offset = 0
+        page_where = " AND ".join(page_conditions) if page_conditions else "1=1"
+
+        # Total: exacto por defecto (COUNT(*) OVER() en la misma consulta); con cursor no se recalcula
+        modo = filters.get("count") or ("ninguno" if cursor else "exacto")
+        ventana = modo == "exacto" and not cursor
+
         # Consulta principal con JOIN para obtener nombres de marca, tipo y vendedor
         main_query = f"""
             SELECT 
@@ -93,24 +125,45 @@ class ListadoProductosView(APIView):
                 t.nombre AS tipoproducto_nombre,
                 p.id_vendedor,
                 u.nombre AS vendedor_nombre,
-                u.correo AS vendedor_correo
+                u.correo AS vendedor_correo,
+                {"COUNT(*) OVER()" if ventana else "NULL::bigint"} AS total_count,
+                {rango_sql} AS rango
             FROM producto p
             INNER JOIN marca m ON p.marca_id = m.id
             INNER JOIN tipoproducto t ON p.tipoproducto_id = t.id
             INNER JOIN usuario u ON p.id_vendedor = u.id
-            WHERE {where_clause}
-            ORDER BY p.id DESC
+            WHERE {page_where}
+            ORDER BY rango DESC, p.id DESC
             LIMIT %s OFFSET %s
         """
         
-        params_with_pagination = params + [page_size, offset]
-        rows = execute_query_with_retry(main_query, params_with_pagination, fetch_all=True)
+        # Una fila extra para saber si hay página siguiente
+        params_with_pagination = rango_params + page_params + [page_size + 1, offset]
+        rows = execute_query_with_retry(main_query, params_with_pagination, fetch_all=True) or []
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor(float(rows[-1][14]), rows[-1][0])
+
+        # El total exacto viene en cada fila (COUNT(*) OVER()); una página vacía cuenta aparte
+        if ventana and rows:
+            total_count = rows[0][13]
+        elif ventana and page == 1:
+            total_count = 0
+        else:
+            if ventana:
+                modo = "exacto"
+            total_count = contar(
+                f"FROM producto p WHERE {where_clause}", params, modo,
+                tabla=None if conditions else "producto"
+            )
 
         # Formatear resultados
         productos = []
         for row in rows:
             imagen_url = public_url(row[5]) if row[5] else None
-            productos.append({
+            item = {
                 "id": row[0],
                 "nombre": row[1],
                 "precio": float(row[2]),
@@ -130,13 +183,19 @@ class ListadoProductosView(APIView):
                     "nombre": row[11],
                     "correo": row[12]
                 }
-            })
+            }
+            if q:
+                # Offsets [inicio, fin) de las coincidencias en el nombre
+                item["resaltado"] = resaltar(row[1], q)
+            productos.append(item)
 
         return Response({
             "total": total_count,
+            "total_tipo": modo,
             "page": page,
             "page_size": page_size,
-            "total_pages": (total_count + page_size - 1) // page_size,
+            "total_pages": (total_count + page_size - 1) // page_size if total_count is not None else None,
+            "next_cursor": next_cursor,
             "results": productos
         })
 
@@ -145,25 +204,37 @@ class FiltrosDisponiblesView(APIView):
     """
     Vista para obtener las opciones dinámicas de filtros (marcas y tipos de producto).
     Accesible para todos los usuarios autenticados (sin restricción de roles).
+
+    Las listas salen del cache de dimensiones. Cada opción trae además "total":
+    cuántos productos quedan con los filtros actuales (mismos parámetros que el
+    listado) al elegir esa opción.
     """
     permission_classes = [IsAuthenticated]
 
+    @condicional_catalogo()
     def get(self, request):
-        # Obtener todas las marcas
-        marcas_rows = execute_query_with_retry(
-            "SELECT id, nombre FROM marca ORDER BY nombre ASC",
-            fetch_all=True
-        )
-        marcas = [{"id": row[0], "nombre": row[1]} for row in marcas_rows]
+        qs = ProductoListadoQuerySerializer(data=request.query_params)
+        qs.is_valid(raise_exception=True)
 
-        # Obtener todos los tipos de producto
-        tipos_rows = execute_query_with_retry(
-            "SELECT id, nombre FROM tipoproducto ORDER BY nombre ASC",
-            fetch_all=True
+        base_conditions, base_params, seleccion = _condiciones(qs.validated_data, get_motor())
+        marca_sql, marca_params = seleccion.get("marca", (None, ()))
+        tipo_sql, tipo_params = seleccion.get("tipo", (None, ()))
+        por_marca, por_tipo = dimensiones.facetas(
+            " AND ".join(base_conditions) if base_conditions else "1=1", base_params,
+            marca_sql=marca_sql, marca_params=marca_params,
+            tipo_sql=tipo_sql, tipo_params=tipo_params,
         )
-        tipos = [{"id": row[0], "nombre": row[1]} for row in tipos_rows]
+
+        marcas = [
+            {"id": m["id"], "nombre": m["nombre"], "total": por_marca.get(m["id"], 0)}
+            for m in dimensiones.como_dicts(dimensiones.marcas())
+        ]
+        tipos = [
+            {"id": t["id"], "nombre": t["nombre"], "total": por_tipo.get(t["id"], 0)}
+            for t in dimensiones.como_dicts(dimensiones.tipos())
+        ]
 
         return Response({
             "marcas": marcas,
             "tipos": tipos
-        })
\ No newline at end of file
+        })
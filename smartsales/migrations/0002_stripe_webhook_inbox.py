@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartsales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS stripe_webhook_inbox (
+                    event_id         VARCHAR(255) PRIMARY KEY,
+                    tipo             VARCHAR(100) NOT NULL,
+                    payload          JSONB NOT NULL,
+                    estado           VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+                    reintentos       INTEGER NOT NULL DEFAULT 0,
+                    proximo_intento  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    tomado_en        TIMESTAMPTZ,
+                    ultimo_error     TEXT,
+                    creado_en        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    procesado_en     TIMESTAMPTZ
+                );
+                CREATE INDEX IF NOT EXISTS stripe_webhook_inbox_pendientes_idx
+                    ON stripe_webhook_inbox (creado_en)
+                    WHERE estado IN ('pendiente', 'error', 'procesando');
+            """,
+            reverse_sql="DROP TABLE IF EXISTS stripe_webhook_inbox;",
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartsales', '0002_stripe_webhook_inbox'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS checkout_sesion (
+                    id                 UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                    usuario_id         UUID NOT NULL,
+                    direccion          TEXT NOT NULL,
+                    carrito            JSONB NOT NULL,
+                    total              NUMERIC(12, 2) NOT NULL,
+                    payment_intent_id  VARCHAR(255),
+                    creado_en          TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+                CREATE INDEX IF NOT EXISTS checkout_sesion_creado_en_idx
+                    ON checkout_sesion (creado_en);
+            """,
+            reverse_sql="DROP TABLE IF EXISTS checkout_sesion;",
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Búsqueda de productos: extensiones pg_trgm y unaccent, un wrapper IMMUTABLE
+    de unaccent (requerido para usarlo en índices) e índices GIN de texto completo
+    (configuración 'spanish') y de trigramas sobre el nombre sin acentos.
+    """
+
+    dependencies = [
+        ('smartsales', '0003_checkout_sesion'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                CREATE EXTENSION IF NOT EXISTS unaccent;
+
+                CREATE OR REPLACE FUNCTION f_unaccent(text)
+                RETURNS text
+                LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+                SET search_path = public, extensions, pg_catalog
+                AS $$ SELECT unaccent('unaccent'::regdictionary, $1) $$;
+
+                CREATE INDEX IF NOT EXISTS producto_nombre_tsv_idx
+                    ON producto USING GIN (to_tsvector('spanish', f_unaccent(nombre)));
+                CREATE INDEX IF NOT EXISTS producto_nombre_trgm_idx
+                    ON producto USING GIN (f_unaccent(lower(nombre)) gin_trgm_ops);
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS producto_nombre_trgm_idx;
+                DROP INDEX IF EXISTS producto_nombre_tsv_idx;
+                DROP FUNCTION IF EXISTS f_unaccent(text);
+            """,
+        ),
+    ]
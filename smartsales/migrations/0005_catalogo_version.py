@@ -0,0 +1,109 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Versión del catálogo para las respuestas condicionales (ETag) de los
+    endpoints de lectura y para reconstruir el índice de autocompletado.
+
+    - catalogo_version.valor: la incrementan triggers por sentencia en producto
+      (alta, baja y columnas visibles salvo stock), marca, tipoproducto y en el
+      nombre/correo de usuario (el listado muestra al vendedor). Al ser un UPDATE
+      normal, el cambio se ve recién con el commit. Son cambios de edición,
+      poco frecuentes: el lock de la fila no afecta a las ventas.
+    - catalogo_version.nombres: solo altas, bajas y cambios de nombre de
+      producto (lo único que usa el índice de autocompletado).
+    - catalogo_stock_seq: los cambios de stock (checkout, venta manual,
+      garantías) solo llaman a nextval al commit, que no toma locks; así las
+      ventas concurrentes no se serializan en una fila global.
+    """
+
+    dependencies = [
+        ('smartsales', '0004_busqueda_productos'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS catalogo_version (
+                    id          smallint PRIMARY KEY CHECK (id = 1),
+                    valor       bigint NOT NULL DEFAULT 1,
+                    nombres     bigint NOT NULL DEFAULT 1,
+                    actualizado timestamptz NOT NULL DEFAULT now()
+                );
+                INSERT INTO catalogo_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+                CREATE SEQUENCE IF NOT EXISTS catalogo_stock_seq;
+
+                -- TG_ARGV[0] = 'nombres': el cambio también afecta al índice de autocompletado
+                CREATE OR REPLACE FUNCTION f_catalogo_version()
+                RETURNS trigger
+                LANGUAGE plpgsql
+                AS $$
+                BEGIN
+                    UPDATE catalogo_version
+                    SET valor = valor + 1,
+                        nombres = nombres + CASE WHEN TG_NARGS > 0 AND TG_ARGV[0] = 'nombres' THEN 1 ELSE 0 END,
+                        actualizado = clock_timestamp()
+                    WHERE id = 1;
+                    RETURN NULL;
+                END
+                $$;
+
+                CREATE OR REPLACE FUNCTION f_catalogo_stock()
+                RETURNS trigger
+                LANGUAGE plpgsql
+                AS $$
+                BEGIN
+                    PERFORM nextval('catalogo_stock_seq');
+                    RETURN NULL;
+                END
+                $$;
+
+                DROP TRIGGER IF EXISTS producto_catalogo_version ON producto;
+                CREATE TRIGGER producto_catalogo_version
+                    AFTER UPDATE OF precio, tiempogarantia, marca_id, tipoproducto_id, imagen_key, id_vendedor
+                    ON producto
+                    FOR EACH STATEMENT EXECUTE FUNCTION f_catalogo_version();
+
+                DROP TRIGGER IF EXISTS producto_catalogo_nombres ON producto;
+                CREATE TRIGGER producto_catalogo_nombres
+                    AFTER INSERT OR DELETE OR TRUNCATE OR UPDATE OF nombre ON producto
+                    FOR EACH STATEMENT EXECUTE FUNCTION f_catalogo_version('nombres');
+
+                -- Diferido: corre al commit, así un lector casi nunca ve el valor
+                -- nuevo del contador junto con el stock todavía sin confirmar
+                DROP TRIGGER IF EXISTS producto_catalogo_stock ON producto;
+                CREATE CONSTRAINT TRIGGER producto_catalogo_stock
+                    AFTER UPDATE OF stock ON producto
+                    DEFERRABLE INITIALLY DEFERRED
+                    FOR EACH ROW EXECUTE FUNCTION f_catalogo_stock();
+
+                DROP TRIGGER IF EXISTS marca_catalogo_version ON marca;
+                CREATE TRIGGER marca_catalogo_version
+                    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON marca
+                    FOR EACH STATEMENT EXECUTE FUNCTION f_catalogo_version();
+
+                DROP TRIGGER IF EXISTS tipoproducto_catalogo_version ON tipoproducto;
+                CREATE TRIGGER tipoproducto_catalogo_version
+                    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON tipoproducto
+                    FOR EACH STATEMENT EXECUTE FUNCTION f_catalogo_version();
+
+                DROP TRIGGER IF EXISTS usuario_catalogo_version ON usuario;
+                CREATE TRIGGER usuario_catalogo_version
+                    AFTER UPDATE OF nombre, correo ON usuario
+                    FOR EACH STATEMENT EXECUTE FUNCTION f_catalogo_version();
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS usuario_catalogo_version ON usuario;
+                DROP TRIGGER IF EXISTS tipoproducto_catalogo_version ON tipoproducto;
+                DROP TRIGGER IF EXISTS marca_catalogo_version ON marca;
+                DROP TRIGGER IF EXISTS producto_catalogo_stock ON producto;
+                DROP TRIGGER IF EXISTS producto_catalogo_nombres ON producto;
+                DROP TRIGGER IF EXISTS producto_catalogo_version ON producto;
+                DROP FUNCTION IF EXISTS f_catalogo_stock();
+                DROP FUNCTION IF EXISTS f_catalogo_version();
+                DROP SEQUENCE IF EXISTS catalogo_stock_seq;
+                DROP TABLE IF EXISTS catalogo_version;
+            """,
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Trabajos de importación de catálogo en segundo plano: el archivo subido,
+    el estado y el avance por lote (contadores, errores y última fila confirmada).
+    """
+
+    dependencies = [
+        ('smartsales', '0005_catalogo_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS catalogo_importacion (
+                    id                UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+                    vendedor_id       UUID NOT NULL,
+                    formato           VARCHAR(10) NOT NULL,
+                    nombre_archivo    VARCHAR(255),
+                    archivo           BYTEA,
+                    estado            VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+                    intentos          INTEGER NOT NULL DEFAULT 0,
+                    lotes_procesados  INTEGER NOT NULL DEFAULT 0,
+                    ultima_fila       INTEGER NOT NULL DEFAULT 0,
+                    total_procesados  INTEGER NOT NULL DEFAULT 0,
+                    exitosos          INTEGER NOT NULL DEFAULT 0,
+                    fallidos          INTEGER NOT NULL DEFAULT 0,
+                    errores           JSONB NOT NULL DEFAULT '[]'::jsonb,
+                    detalle           TEXT,
+                    creado_en         TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    tomado_en         TIMESTAMPTZ,
+                    terminado_en      TIMESTAMPTZ
+                );
+                CREATE INDEX IF NOT EXISTS catalogo_importacion_pendientes_idx
+                    ON catalogo_importacion (creado_en)
+                    WHERE estado IN ('pendiente', 'procesando');
+                CREATE INDEX IF NOT EXISTS catalogo_importacion_vendedor_idx
+                    ON catalogo_importacion (vendedor_id, creado_en DESC);
+            """,
+            reverse_sql="""
+                DROP TABLE IF EXISTS catalogo_importacion;
+            """,
+        ),
+    ]
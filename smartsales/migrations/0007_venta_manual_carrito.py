@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Carrito de venta manual compartido entre procesos: una fila de sesión por
+    vendedor (vencimiento y lock por vendedor) y una fila por producto, así
+    agregar o cambiar un ítem es un solo upsert.
+    """
+
+    dependencies = [
+        ('smartsales', '0006_catalogo_importacion'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS venta_manual_carrito (
+                    vendedor_id  UUID PRIMARY KEY,
+                    expira_en    TIMESTAMPTZ NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS venta_manual_carrito_expira_idx
+                    ON venta_manual_carrito (expira_en);
+
+                CREATE TABLE IF NOT EXISTS venta_manual_carrito_item (
+                    vendedor_id  UUID NOT NULL
+                        REFERENCES venta_manual_carrito (vendedor_id) ON DELETE CASCADE,
+                    producto_id  INTEGER NOT NULL,
+                    item         JSONB NOT NULL,
+                    agregado_en  TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+                    PRIMARY KEY (vendedor_id, producto_id)
+                );
+            """,
+            reverse_sql="""
+                DROP TABLE IF EXISTS venta_manual_carrito_item;
+                DROP TABLE IF EXISTS venta_manual_carrito;
+            """,
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Índices de expresión sobre lower(correo) en usuario y lower(email) en
+    login_bloqueo: las búsquedas por correo (login, venta manual) comparan en
+    minúsculas y sin estos índices recorrían la tabla completa.
+    """
+
+    dependencies = [
+        ('smartsales', '0007_venta_manual_carrito'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX IF NOT EXISTS usuario_correo_lower_idx
+                    ON usuario (lower(correo));
+                CREATE INDEX IF NOT EXISTS login_bloqueo_email_lower_idx
+                    ON login_bloqueo (lower(email));
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS login_bloqueo_email_lower_idx;
+                DROP INDEX IF EXISTS usuario_correo_lower_idx;
+            """,
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Índice para la exportación del catálogo por keyset: WHERE id_vendedor = %s
+    AND (nombre, id) > (%s, %s) ORDER BY nombre, id LIMIT n. Con el índice cada
+    lote es un recorrido de rango; sin él cada página recorría y ordenaba los
+    productos del vendedor (la PK sobre id no sirve para ese orden).
+    """
+
+    dependencies = [
+        ('smartsales', '0008_usuario_correo_lower'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX IF NOT EXISTS producto_vendedor_nombre_idx
+                    ON producto (id_vendedor, nombre, id);
+            """,
+            reverse_sql="DROP INDEX IF EXISTS producto_vendedor_nombre_idx;",
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Contador de cambios de stock para el ETag del catálogo, en reemplazo de
+    catalogo_stock_seq.
+
+    nextval no es transaccional: corría en el trigger diferido antes del commit,
+    así un lector podía ver el número nuevo con el stock viejo y guardar ese ETag
+    para datos que ya no eran los de la versión. Además una secuencia recién
+    creada (is_called = false) no cambiaba last_value con el primer nextval.
+
+    catalogo_stock reparte el contador en 16 filas: el trigger diferido
+    incrementa la fila de su transacción (txid % 16), que se ve recién con el
+    commit, y la versión es la suma. Cada transacción toca una sola fila (sin
+    deadlocks entre ventas) y dos ventas solo se esperan si caen en la misma
+    fila, durante el commit.
+    """
+
+    dependencies = [
+        ('smartsales', '0009_producto_vendedor_nombre_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE IF NOT EXISTS catalogo_stock (
+                    fila  smallint PRIMARY KEY CHECK (fila BETWEEN 0 AND 15),
+                    valor bigint NOT NULL DEFAULT 0
+                );
+                INSERT INTO catalogo_stock (fila)
+                    SELECT generate_series(0, 15)
+                ON CONFLICT (fila) DO NOTHING;
+
+                CREATE OR REPLACE FUNCTION f_catalogo_stock()
+                RETURNS trigger
+                LANGUAGE plpgsql
+                AS $$
+                BEGIN
+                    UPDATE catalogo_stock SET valor = valor + 1
+                    WHERE fila = txid_current() % 16;
+                    RETURN NULL;
+                END
+                $$;
+
+                DROP SEQUENCE IF EXISTS catalogo_stock_seq;
+            """,
+            reverse_sql="""
+                CREATE SEQUENCE IF NOT EXISTS catalogo_stock_seq;
+
+                CREATE OR REPLACE FUNCTION f_catalogo_stock()
+                RETURNS trigger
+                LANGUAGE plpgsql
+                AS $$
+                BEGIN
+                    PERFORM nextval('catalogo_stock_seq');
+                    RETURN NULL;
+                END
+                $$;
+
+                DROP TABLE IF EXISTS catalogo_stock;
+            """,
+        ),
+    ]
@@ -107,6 +107,36 @@ class NotificacionManager:
             datos=datos
         )
 
+    @staticmethod
+    def notificar_compra_no_completada(usuario_id, total, payment_intent_id, reembolsado):
+        """
+        Avisa al comprador que su pago no generó una venta (p. ej. sin stock)
+        
+        Args:
+            usuario_id (UUID): ID del comprador
+            total (Decimal): Monto cobrado
+            payment_intent_id (str): PaymentIntent de Stripe
+            reembolsado (bool): Si ya se emitió el reembolso
+        """
+        titulo = "No pudimos completar tu compra"
+        if reembolsado:
+            cuerpo = f"Uno o más productos se agotaron. Te reembolsamos ${total:.2f}; puede tardar unos días en verse reflejado."
+        else:
+            cuerpo = f"Uno o más productos se agotaron. Nuestro equipo gestionará el reembolso de ${total:.2f}."
+        datos = {
+            'tipo': 'compra_no_completada',
+            'payment_intent_id': payment_intent_id,
+            'total': float(total),
+            'reembolsado': reembolsado,
+        }
+        
+        return NotificacionManager.crear_notificacion(
+            usuario_id=usuario_id,
+            titulo=titulo,
+            cuerpo=cuerpo,
+            datos=datos
+        )
+
     @staticmethod
     def notificar_cambio_garantia(garantia, venta):
         """
@@ -0,0 +1,87 @@
+"""
+Utilidades de paginación por keyset (cursor) para vistas con SQL directo.
+
+El cursor es opaco para el cliente: base64 (url-safe) del JSON con los valores
+de las columnas de orden de la última fila devuelta.
+"""
+import base64
+import json
+from datetime import datetime
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def encode_cursor(*valores) -> str:
+    data = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    raw = json.dumps(data, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, n: int):
+    """Devuelve la lista de `n` valores del cursor; lanza CursorInvalido si no se puede leer."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data = json.loads(raw)
+    except Exception:
+        raise CursorInvalido("cursor inválido")
+    if not isinstance(data, list) or len(data) != n:
+        raise CursorInvalido("cursor inválido")
+    return data
+
+
+def parse_datetime_cursor(valor: str) -> datetime:
+    try:
+        return datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise CursorInvalido("cursor inválido")
+
+
+# ---------- conteo del total ----------
+# exacto:   COUNT(*) con los mismos filtros
+# cache:    el COUNT(*) exacto guardado PAGINACION_COUNT_CACHE_TTL segundos
+# estimado: sin filtros, pg_class.reltuples de la tabla; con filtros, la estimación del planner
+# ninguno:  no se calcula (total = None)
+MODOS_CONTEO = ("exacto", "cache", "estimado", "ninguno")
+
+
+def contar(from_where: str, params, modo: str = "exacto", tabla: str | None = None):
+    """
+    Total de filas de `SELECT ... {from_where}` según `modo`.
+    `tabla` solo se pasa cuando la consulta no tiene filtros (permite usar reltuples).
+    """
+    from django.db import connection
+
+    if modo == "ninguno":
+        return None
+
+    if modo == "estimado":
+        with connection.cursor() as cur:
+            if tabla:
+                cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [tabla])
+                row = cur.fetchone()
+                # reltuples = -1 si la tabla nunca fue analizada
+                if row and row[0] is not None and row[0] >= 0:
+                    return int(row[0])
+            else:
+                cur.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 {from_where}", params)
+                plan = cur.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return int(plan[0]["Plan"]["Plan Rows"])
+
+    if modo == "cache":
+        import hashlib
+        from django.conf import settings
+        from django.core.cache import cache
+        clave = "paginacion:count:" + hashlib.md5(f"{from_where}|{params!r}".encode()).hexdigest()
+        total = cache.get(clave)
+        if total is None:
+            total = contar(from_where, params, "exacto")
+            cache.set(clave, total, getattr(settings, "PAGINACION_COUNT_CACHE_TTL", 60))
+        return total
+
+    with connection.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) {from_where}", params)
+        return int(cur.fetchone()[0])
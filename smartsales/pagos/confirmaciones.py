@@ -0,0 +1,133 @@
+"""
+Aviso de pagos confirmados: del commit del webhook a las vistas que esperan.
+
+ConfirmarPagoView se registra por payment_intent_id y espera un threading.Event
+en lugar de dormir y volver a consultar `pagos`. El webhook avisa de dos formas:
+- en el mismo proceso, con transaction.on_commit → notificar();
+- entre procesos, con pg_notify dentro de la transacción (Postgres lo entrega al
+  hacer commit). Para recibirlo hace falta PAGOS_LISTEN_DATABASE_URL apuntando a
+  una conexión directa: el transaction pooler de Supabase no soporta LISTEN.
+
+Con varios workers PAGOS_LISTEN_DATABASE_URL es necesaria: el webhook suele
+procesarse en otro worker y el aviso en proceso casi nunca llega. Sin ella se
+vuelve explícitamente al sondeo (iniciar() lo advierte al arrancar): la espera
+revisa la tabla cada PAGOS_CONFIRMACION_SONDEO segundos, acotada a
+PAGOS_CONFIRMACION_ESPERA_SIN_LISTENER porque ocupa un hilo de gunicorn.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+CANAL = "pagos_confirmados"
+
+_esperas = {}
+_esperas_lock = threading.Lock()
+
+
+# ---------- lado del webhook ----------
+def notificar_en_transaccion(cursor, payment_intent_id: str):
+    """Llamar dentro de la transacción que crea el pago: avisa solo si hace commit."""
+    from django.db import transaction
+    cursor.execute("SELECT pg_notify(%s, %s)", [CANAL, payment_intent_id])
+    transaction.on_commit(lambda: notificar(payment_intent_id))
+
+
+def notificar(payment_intent_id: str):
+    with _esperas_lock:
+        espera = _esperas.get(payment_intent_id)
+    if espera is not None:
+        espera[0].set()
+
+
+# ---------- lado de la confirmación ----------
+def buscar_pago(payment_intent_id: str):
+    """(venta_id, receipt_url) si el webhook ya creó la venta, si no None."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT venta_id, receipt_url FROM pagos WHERE payment_intent_id = %s",
+            [payment_intent_id]
+        )
+        return cursor.fetchone()
+
+
+def esperar_pago(payment_intent_id: str, timeout: float):
+    """
+    Espera hasta `timeout` segundos (sin listener, como mucho
+    PAGOS_CONFIRMACION_ESPERA_SIN_LISTENER) a que exista la fila en `pagos`.
+    Devuelve (venta_id, receipt_url) o None si no llegó a tiempo.
+    """
+    row = buscar_pago(payment_intent_id)
+    if row or timeout <= 0:
+        return row
+
+    escuchando = _asegurar_listener()
+    if escuchando:
+        sondeo = timeout
+    else:
+        sondeo = getattr(settings, "PAGOS_CONFIRMACION_SONDEO", 1.0)
+        timeout = min(timeout, getattr(settings, "PAGOS_CONFIRMACION_ESPERA_SIN_LISTENER", 3.0))
+
+    # {payment_intent_id: [Event, n_esperando]}: varias pestañas pueden esperar el mismo pago
+    with _esperas_lock:
+        espera = _esperas.setdefault(payment_intent_id, [threading.Event(), 0])
+        espera[1] += 1
+    evento = espera[0]
+    try:
+        limite = time.monotonic() + timeout
+        while True:
+            # Revisar después de registrarse: el commit pudo ocurrir entre la primera consulta y el registro
+            row = buscar_pago(payment_intent_id)
+            restante = limite - time.monotonic()
+            if row or restante <= 0:
+                return row
+            evento.wait(min(sondeo, restante))
+    finally:
+        with _esperas_lock:
+            espera[1] -= 1
+            if espera[1] == 0 and _esperas.get(payment_intent_id) is espera:
+                del _esperas[payment_intent_id]
+
+
+# ---------- LISTEN entre procesos ----------
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def iniciar():
+    """En HILOS_AL_INICIAR: abre el LISTEN al arrancar el worker, o advierte que se sondeará."""
+    if not _asegurar_listener():
+        logger.warning(
+            "PAGOS_LISTEN_DATABASE_URL no configurada: la confirmación de pagos sondea la tabla "
+            f"(como mucho {getattr(settings, 'PAGOS_CONFIRMACION_ESPERA_SIN_LISTENER', 3.0)} s por consulta)"
+        )
+
+
+def _asegurar_listener() -> bool:
+    global _listener
+    dsn = getattr(settings, "PAGOS_LISTEN_DATABASE_URL", None)
+    if not dsn:
+        return False
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_escuchar, args=(dsn,), name="pagos-listen", daemon=True)
+            _listener.start()
+    return True
+
+
+def _escuchar(dsn: str):
+    import psycopg
+    while True:
+        try:
+            with psycopg.connect(dsn, autocommit=True) as conn:
+                conn.execute(f"LISTEN {CANAL}")
+                while True:
+                    for n in conn.notifies(timeout=60):
+                        notificar(n.payload)
+        except Exception as e:
+            logger.warning(f"LISTEN {CANAL} interrumpido, reintentando: {e}")
+            time.sleep(5)
@@ -0,0 +1,164 @@
+"""
+Inbox de webhooks de Stripe.
+
+La vista solo verifica la firma, inserta el evento en stripe_webhook_inbox
+(event_id es la PK, así un reenvío de Stripe no se duplica) y responde 200.
+El procesamiento lo hacen workers que toman eventos con FOR UPDATE SKIP LOCKED,
+de modo que pueden correr varios a la vez (hilos de este proceso o el comando
+`procesar_webhooks_stripe` en otra máquina) sin pisarse.
+
+Un evento que falla se reintenta con backoff exponencial hasta
+STRIPE_INBOX_MAX_REINTENTOS; después queda en estado 'fallido'. Los errores
+permanentes (ErrorPermanente, p. ej. StockInsuficiente) quedan 'fallido' en el
+primer intento y se compensan (StockInsuficiente: reembolso y aviso al comprador).
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from smartsales.hilos import PoolHilos, pool
+from .webhooks import ErrorPermanente, procesar_evento
+
+logger = logging.getLogger(__name__)
+
+
+def _cfg(nombre, default):
+    return getattr(settings, nombre, default)
+
+
+# ---------- registro (vista) ----------
+def registrar_evento(event_id: str, tipo: str, payload) -> bool:
+    """Guarda el evento verificado. Devuelve False si ya estaba registrado."""
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO stripe_webhook_inbox (event_id, tipo, payload)
+            VALUES (%s, %s, %s::jsonb)
+            ON CONFLICT (event_id) DO NOTHING
+            RETURNING event_id
+            """,
+            [event_id, tipo, payload]
+        )
+        nuevo = cursor.fetchone() is not None
+    if nuevo:
+        transaction.on_commit(despertar)
+    return nuevo
+
+
+# ---------- procesamiento ----------
+def _tomar_lote(limite: int):
+    """Marca como 'procesando' hasta `limite` eventos listos y los devuelve."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            WITH listos AS (
+                SELECT event_id
+                FROM stripe_webhook_inbox
+                WHERE (estado IN ('pendiente', 'error') AND proximo_intento <= NOW())
+                   OR (estado = 'procesando' AND tomado_en < NOW() - make_interval(secs => %s))
+                ORDER BY creado_en
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE stripe_webhook_inbox i
+            SET estado = 'procesando', tomado_en = NOW()
+            FROM listos
+            WHERE i.event_id = listos.event_id
+            RETURNING i.event_id, i.tipo, i.payload, i.reintentos
+            """,
+            [_cfg('STRIPE_INBOX_TIMEOUT_PROCESANDO', 600), limite]
+        )
+        return cursor.fetchall()
+
+
+def _marcar_procesado(event_id: str):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE stripe_webhook_inbox
+            SET estado = 'procesado', procesado_en = NOW(), ultimo_error = NULL
+            WHERE event_id = %s
+            """,
+            [event_id]
+        )
+
+
+def _marcar_error(event_id: str, reintentos: int, error: str, permanente: bool = False):
+    reintentos += 1
+    max_reintentos = _cfg('STRIPE_INBOX_MAX_REINTENTOS', 8)
+    # Backoff exponencial: base * 2^(n-1), con tope
+    espera = min(_cfg('STRIPE_INBOX_BACKOFF_BASE', 5) * 2 ** (reintentos - 1),
+                 _cfg('STRIPE_INBOX_BACKOFF_MAX', 3600))
+    estado = 'fallido' if permanente or reintentos >= max_reintentos else 'error'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE stripe_webhook_inbox
+            SET estado = %s, reintentos = %s, ultimo_error = %s,
+                proximo_intento = NOW() + make_interval(secs => %s)
+            WHERE event_id = %s
+            """,
+            [estado, reintentos, error[:2000], espera, event_id]
+        )
+    return estado
+
+
+class WebhookInboxProcessor:
+    """
+    Procesador de eventos pendientes del inbox de Stripe
+    """
+
+    def procesar_cola(self, limite=50):
+        """
+        Procesa hasta `limite` eventos listos.
+
+        Returns:
+            dict: Estadísticas del procesamiento
+        """
+        stats = {'procesados': 0, 'exitosos': 0, 'reintentar': 0, 'fallidos': 0}
+
+        for event_id, tipo, payload, reintentos in _tomar_lote(limite):
+            stats['procesados'] += 1
+            try:
+                venta_id = procesar_evento(tipo, payload)
+                _marcar_procesado(event_id)
+                stats['exitosos'] += 1
+                if venta_id:
+                    logger.info(f"[INBOX] Evento {event_id}: venta {venta_id} creada")
+            except Exception as e:
+                permanente = isinstance(e, ErrorPermanente)
+                estado = _marcar_error(event_id, reintentos, str(e), permanente=permanente)
+                stats['fallidos' if estado == 'fallido' else 'reintentar'] += 1
+                logger.error(f"[INBOX] Evento {event_id} ({estado}): {e}")
+                if permanente:
+                    try:
+                        e.compensar()
+                    except Exception as ec:
+                        logger.critical(f"[INBOX] Evento {event_id}: no se pudo compensar: {ec}")
+
+        return stats
+
+
+# ---------- workers en proceso ----------
+def _vaciar_cola():
+    processor = WebhookInboxProcessor()
+    lote = _cfg('STRIPE_INBOX_LOTE', 10)
+    # Seguir mientras haya trabajo; SKIP LOCKED reparte los eventos entre hilos
+    while processor.procesar_cola(limite=lote)['procesados']:
+        pass
+
+
+def despertar():
+    """
+    Avisa a los workers en proceso que hay eventos nuevos (no hace nada con STRIPE_INBOX_WORKERS=0).
+    También figura en HILOS_AL_INICIAR: los reintentos ('error' y 'procesando' vencidos)
+    no dependen de que llegue otro webhook a este worker.
+    """
+    pool("stripe-inbox", lambda: PoolHilos(
+        "stripe-inbox", _vaciar_cola,
+        workers=_cfg('STRIPE_INBOX_WORKERS', 2),
+        intervalo=_cfg('STRIPE_INBOX_INTERVALO', 5.0),
+    )).despertar()
@@ -0,0 +1,42 @@
+"""
+Comando para completar los receipt_url que quedaron pendientes
+(p. ej. si el proceso se reinició antes de que el hilo de recibos los resolviera).
+Uso: python manage.py completar_recibos
+"""
+import time
+from django.core.management.base import BaseCommand
+from smartsales.pagos import recibos
+
+
+class Command(BaseCommand):
+    help = 'Obtiene de Stripe los recibos pendientes y actualiza pagos.receipt_url por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=100,
+            help='Número máximo de pagos a revisar por ejecución (default: 100)'
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Ejecuta el barrido en modo continuo cada cierto tiempo'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=60,
+            help='Intervalo en segundos entre ejecuciones en modo continuo (default: 60)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            pendientes = recibos.pendientes_sin_recibo(options['limite'])
+            actualizados = recibos.guardar_recibos(recibos.resolver_lote(pendientes))
+            self.stdout.write(
+                self.style.SUCCESS(f'Recibos actualizados: {actualizados} de {len(pendientes)} pendientes')
+            )
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
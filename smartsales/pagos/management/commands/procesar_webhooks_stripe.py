@@ -0,0 +1,71 @@
+"""
+Comando para procesar el inbox de webhooks de Stripe
+Uso: python manage.py procesar_webhooks_stripe --continuo --workers 4
+"""
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from smartsales.pagos.inbox import WebhookInboxProcessor
+
+
+class Command(BaseCommand):
+    help = 'Procesa los eventos pendientes del inbox de webhooks de Stripe'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=50,
+            help='Número máximo de eventos a tomar por lote (default: 50)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Hilos procesando en paralelo (default: 1)'
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Ejecuta el procesamiento en modo continuo cada cierto tiempo'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=2,
+            help='Intervalo en segundos entre lotes vacíos en modo continuo (default: 2)'
+        )
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        hilos = [
+            threading.Thread(target=self._worker, args=(options,), daemon=True)
+            for _ in range(workers)
+        ]
+        for h in hilos:
+            h.start()
+        try:
+            for h in hilos:
+                while h.is_alive():
+                    h.join(1)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nProcesamiento detenido'))
+
+    def _worker(self, options):
+        processor = WebhookInboxProcessor()
+        try:
+            while True:
+                stats = processor.procesar_cola(limite=options['limite'])
+                if stats['procesados']:
+                    self.stdout.write(
+                        f"[{threading.current_thread().name}] procesados={stats['procesados']} "
+                        f"exitosos={stats['exitosos']} reintentar={stats['reintentar']} "
+                        f"fallidos={stats['fallidos']}"
+                    )
+                    continue
+                if not options['continuo']:
+                    break
+                time.sleep(options['intervalo'])
+        finally:
+            connection.close()
@@ -0,0 +1,171 @@
+"""
+Resolución de recibos (receipt_url) de Stripe fuera de la transacción del webhook.
+
+El webhook guarda el pago con receipt_url = NULL (salvo que el evento ya traiga
+el cargo expandido) y, después del commit, encola el payment_intent. Un hilo de
+fondo consulta Stripe y actualiza pagos.receipt_url por lotes, así el lock y la
+transacción del webhook no dependen de la latencia de la API de Stripe.
+
+Lo que quede sin resolver (p. ej. el proceso se reinició) lo completa el comando
+`completar_recibos`.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+from smartsales.hilos import PoolHilos, pool
+from smartsales.historialpagos import cache as historial_cache
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- lectura desde el payload del evento ----------
+def receipt_desde_evento(payment_intent) -> str | None:
+    """
+    receipt_url si el evento ya trae el cargo expandido:
+    `latest_charge` como objeto o la lista `charges.data` de versiones antiguas de la API.
+    """
+    charge = payment_intent.get('latest_charge')
+    if isinstance(charge, dict) and charge.get('receipt_url'):
+        return charge['receipt_url']
+    charges = payment_intent.get('charges') or {}
+    for c in charges.get('data') or []:
+        if c.get('receipt_url'):
+            return c['receipt_url']
+    return None
+
+
+def charge_id_de(payment_intent) -> str | None:
+    charge = payment_intent.get('latest_charge')
+    if isinstance(charge, dict):
+        return charge.get('id')
+    return charge
+
+
+# ---------- resolvedor (inyectable para pruebas) ----------
+def resolver_stripe(payment_intent_id: str, charge_id: str | None) -> str | None:
+    """Consulta Stripe: el cargo si se conoce, o el payment_intent para obtener latest_charge."""
+    from . import stripe_client
+    if not charge_id:
+        pi = stripe_client.obtener_payment_intent(payment_intent_id)
+        charge_id = pi.get('latest_charge')
+        if not charge_id:
+            return None
+    return stripe_client.obtener_cargo(charge_id).receipt_url
+
+
+_resolver = resolver_stripe
+
+
+def set_resolver(fn):
+    """Reemplaza el resolvedor (fn(payment_intent_id, charge_id) -> url | None). Devuelve el anterior."""
+    global _resolver
+    anterior, _resolver = _resolver, fn
+    return anterior
+
+
+def resolver_lote(pendientes, resolver=None):
+    """
+    pendientes: [(payment_intent_id, charge_id), ...]
+    Devuelve [(payment_intent_id, receipt_url), ...] solo con los que se pudieron resolver.
+    """
+    resolver = resolver or _resolver
+    resueltos = []
+    for pi_id, charge_id in pendientes:
+        try:
+            url = resolver(pi_id, charge_id)
+        except Exception as e:
+            logger.warning(f"No se pudo obtener el recibo de {pi_id}: {e}")
+            continue
+        if url:
+            resueltos.append((pi_id, url))
+    return resueltos
+
+
+def guardar_recibos(resueltos) -> int:
+    """Actualiza pagos.receipt_url para todo el lote en un solo UPDATE."""
+    if not resueltos:
+        return 0
+    pis = [r[0] for r in resueltos]
+    urls = [r[1] for r in resueltos]
+    with connection.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE pagos p
+            SET receipt_url = v.url
+            FROM unnest(%s::text[], %s::text[]) AS v(payment_intent_id, url), venta ve
+            WHERE p.payment_intent_id = v.payment_intent_id
+              AND p.receipt_url IS NULL
+              AND ve.id = p.venta_id
+            RETURNING ve.usuario_id
+            """,
+            [pis, urls]
+        )
+        filas = cur.fetchall()
+    # El historial cacheado de esos usuarios tenía receipt_url vacío
+    historial_cache.invalidar(*{r[0] for r in filas})
+    return len(filas)
+
+
+def pendientes_sin_recibo(limite: int = 100):
+    """Pagos con payment_intent y sin receipt_url (para el barrido del comando)."""
+    with connection.cursor() as cur:
+        cur.execute(
+            """
+            SELECT payment_intent_id
+            FROM pagos
+            WHERE receipt_url IS NULL AND payment_intent_id IS NOT NULL
+            ORDER BY venta_id DESC
+            LIMIT %s
+            """,
+            [limite]
+        )
+        return [(r[0], None) for r in cur.fetchall()]
+
+
+# ---------- cola en memoria + hilo de fondo ----------
+class _EnriquecedorRecibos:
+    def __init__(self, batch_size: int, intervalo: float):
+        self.batch_size = batch_size
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._hilo = PoolHilos("pagos-recibos", self.flush, workers=1, intervalo=intervalo)
+
+    def add(self, payment_intent_id, charge_id):
+        with self._lock:
+            self._buffer.append((payment_intent_id, charge_id))
+            lleno = len(self._buffer) >= self.batch_size
+        self._hilo.despertar(avisar=lleno)
+
+    def flush(self):
+        with self._lock:
+            pendientes, self._buffer = self._buffer, []
+        if not pendientes:
+            return 0
+        try:
+            return guardar_recibos(resolver_lote(pendientes))
+        except Exception as e:
+            logger.warning(f"No se pudieron guardar recibos ({len(pendientes)} pagos): {e}")
+            return 0
+
+
+def _enriquecedor() -> _EnriquecedorRecibos:
+    return pool("pagos-recibos", lambda: _EnriquecedorRecibos(
+        batch_size=getattr(settings, "PAGOS_RECIBOS_LOTE", 20),
+        intervalo=getattr(settings, "PAGOS_RECIBOS_INTERVALO", 2.0),
+    ))
+
+
+def encolar(payment_intent_id: str, charge_id: str | None = None):
+    """Programa la resolución del recibo; llamar desde transaction.on_commit."""
+    _enriquecedor().add(payment_intent_id, charge_id)
+
+
+def flush() -> int:
+    return _enriquecedor().flush()
+
+
+atexit.register(flush)
@@ -0,0 +1,180 @@
+# smartsales/pagos/repository.py
+import json
+import logging
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+
+from smartsales.db_utils import execute_query_with_retry
+
+logger = logging.getLogger(__name__)
+
+def get_productos_checkout(producto_ids: Iterable[int]) -> Dict[int, Tuple[str, object, int]]:
+    """{producto_id: (nombre, precio, stock)} para todos los ids en una sola consulta."""
+    ids = list(set(producto_ids))
+    if not ids:
+        return {}
+    rows = execute_query_with_retry(
+        "SELECT id, nombre, precio, stock FROM producto WHERE id = ANY(%s)",
+        [ids],
+        fetch_all=True
+    ) or []
+    return {r[0]: (r[1], r[2], int(r[3] or 0)) for r in rows}
+
+
+def crear_checkout_sesion(usuario_id, direccion: str, carrito: list, total) -> str:
+    """Guarda el carrito ya validado; su id es lo único que viaja en la metadata de Stripe."""
+    row = execute_query_with_retry(
+        """
+        INSERT INTO checkout_sesion (usuario_id, direccion, carrito, total)
+        VALUES (%s, %s, %s::jsonb, %s)
+        RETURNING id
+        """,
+        [usuario_id, direccion, json.dumps(carrito), total],
+        fetch_one=True
+    )
+    _purgar_checkout_si_corresponde()
+    return str(row[0])
+
+
+_ultima_purga_checkout = 0.0
+
+
+def purgar_checkout_sesiones(lote: int = 1000) -> None:
+    """
+    Borra (hasta `lote` filas) las sesiones de checkout más viejas que
+    PAGOS_CHECKOUT_SESION_TTL: carritos abandonados o ya usados por el webhook.
+    El TTL debe cubrir los reintentos de webhooks de Stripe (hasta 3 días).
+    """
+    execute_query_with_retry(
+        """
+        DELETE FROM checkout_sesion
+        WHERE id IN (
+            SELECT id FROM checkout_sesion
+            WHERE creado_en < NOW() - make_interval(secs => %s)
+            ORDER BY creado_en
+            LIMIT %s
+        )
+        """,
+        [getattr(settings, "PAGOS_CHECKOUT_SESION_TTL", 7 * 24 * 3600), lote]
+    )
+
+
+def _purgar_checkout_si_corresponde():
+    """Purga como mucho una vez por PAGOS_CHECKOUT_PURGA_INTERVALO en este proceso."""
+    global _ultima_purga_checkout
+    ahora = time.monotonic()
+    if ahora - _ultima_purga_checkout < getattr(settings, "PAGOS_CHECKOUT_PURGA_INTERVALO", 600):
+        return
+    _ultima_purga_checkout = ahora
+    try:
+        purgar_checkout_sesiones()
+    except Exception as e:
+        # La purga es oportunista: no debe romper el checkout
+        logger.warning(f"[CHECKOUT] No se pudieron purgar sesiones vencidas: {e}")
+
+def vincular_payment_intent(checkout_id: str, payment_intent_id: str) -> None:
+    execute_query_with_retry(
+        "UPDATE checkout_sesion SET payment_intent_id = %s WHERE id = %s",
+        [payment_intent_id, checkout_id]
+    )
+
+
+# ---------- escritura de la venta (dentro de la transacción del webhook) ----------
+# Estas funciones reciben el cursor de la transacción: no usar execute_query_with_retry
+# aquí porque cierra la conexión entre intentos.
+
+def bloquear_productos(cursor, producto_ids: Iterable[int]) -> Dict[int, Tuple[int, int, object]]:
+    """
+    Bloquea (FOR UPDATE) todas las filas de producto del carrito en una sola sentencia.
+    Orden por id para que dos webhooks concurrentes no se bloqueen mutuamente.
+    Devuelve {producto_id: (stock, tiempogarantia, id_vendedor)}.
+    """
+    cursor.execute(
+        """
+        SELECT id, stock, tiempogarantia, id_vendedor
+        FROM producto
+        WHERE id = ANY(%s)
+        ORDER BY id
+        FOR UPDATE
+        """,
+        [list(producto_ids)]
+    )
+    return {r[0]: (int(r[1] or 0), r[2], r[3]) for r in cursor.fetchall()}
+
+def bloquear_productos_venta(cursor, producto_ids: Iterable[int]) -> Dict[int, Tuple[str, object, int, int]]:
+    """
+    Igual que bloquear_productos, con nombre y precio (venta manual: el precio se
+    toma de la fila bloqueada). Devuelve {producto_id: (nombre, precio, stock, tiempogarantia)}.
+    """
+    cursor.execute(
+        """
+        SELECT id, nombre, precio, stock, tiempogarantia
+        FROM producto
+        WHERE id = ANY(%s)
+        ORDER BY id
+        FOR UPDATE
+        """,
+        [list(producto_ids)]
+    )
+    return {r[0]: (r[1], r[2], int(r[3] or 0), r[4]) for r in cursor.fetchall()}
+
+def insertar_venta(cursor, usuario_id, total, direccion) -> Tuple[int, object]:
+    """Crea la venta y devuelve (venta_id, hora)."""
+    cursor.execute(
+        "INSERT INTO venta (usuario_id, total, direccion) VALUES (%s, %s, %s) RETURNING id, hora",
+        [usuario_id, total, direccion]
+    )
+    row = cursor.fetchone()
+    return row[0], row[1]
+
+def insertar_detalles(cursor, venta_id: int, hora, lineas: List[Tuple[int, int, int]]) -> None:
+    """
+    Inserta todas las líneas de detalleventa en una sola sentencia.
+    lineas: [(producto_id, cantidad, tiempogarantia_dias), ...]
+    """
+    if not lineas:
+        return
+    pids, cants, dias = (list(c) for c in zip(*lineas))
+    cursor.execute(
+        """
+        INSERT INTO detalleventa (venta_id, producto_id, cantidad, limitegarantia)
+        SELECT %s, u.producto_id, u.cantidad, %s::timestamptz + INTERVAL '1 day' * u.dias
+        FROM unnest(%s::int[], %s::int[], %s::int[]) AS u(producto_id, cantidad, dias)
+        """,
+        [venta_id, hora, pids, cants, dias]
+    )
+
+def get_checkout_sesion(cursor, checkout_id: str):
+    """(usuario_id, direccion, carrito) de la sesión de checkout, o None."""
+    cursor.execute(
+        "SELECT usuario_id, direccion, carrito FROM checkout_sesion WHERE id = %s",
+        [checkout_id]
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    carrito = row[2] if isinstance(row[2], list) else json.loads(row[2])
+    return row[0], row[1], carrito
+
+def descontar_stock_lote(cursor, cantidades: Dict[int, int]) -> List[Tuple[int, int, object]]:
+    """
+    Descuenta el stock de todos los productos en un solo UPDATE ... FROM.
+    Devuelve [(producto_id, stock_nuevo, id_vendedor), ...].
+    """
+    if not cantidades:
+        return []
+    pids = list(cantidades.keys())
+    cants = [cantidades[p] for p in pids]
+    cursor.execute(
+        """
+        UPDATE producto p
+        SET stock = p.stock - v.cantidad
+        FROM unnest(%s::int[], %s::int[]) AS v(producto_id, cantidad)
+        WHERE p.id = v.producto_id
+        RETURNING p.id, p.stock, p.id_vendedor
+        """,
+        [pids, cants]
+    )
+    return [(r[0], int(r[1]), r[2]) for r in cursor.fetchall()]
@@ -0,0 +1,67 @@
+# smartsales/pagos/services.py
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from smartsales.pagos.repository import get_productos_checkout
+
+
+class CarritoInvalido(ValueError):
+    """El carrito tiene productos inexistentes o sin stock suficiente; `errores` trae todas las líneas."""
+
+    def __init__(self, errores: List[Dict[str, Any]]):
+        self.errores = errores
+        super().__init__("; ".join(e["detalle"] for e in errores))
+
+
+def validar_carrito(items: List[Dict[str, int]]) -> Dict[str, Any]:
+    """
+    Valida stock y calcula el total del carrito con una sola consulta a producto.
+    Las líneas repetidas del mismo producto se suman antes de validar el stock.
+    Lanza CarritoInvalido con todos los errores encontrados (no solo el primero).
+    """
+    cantidades: Dict[int, int] = {}
+    for item in items:
+        pid = item['producto_id']
+        cantidades[pid] = cantidades.get(pid, 0) + item['cantidad']
+
+    productos = get_productos_checkout(cantidades.keys())
+
+    errores = []
+    carrito = []
+    descripcion = []
+    total = Decimal('0.00')
+    for pid, cantidad in cantidades.items():
+        row = productos.get(pid)
+        if not row:
+            errores.append({
+                "producto_id": pid,
+                "tipo": "no_encontrado",
+                "detalle": f"Producto con ID {pid} no encontrado.",
+            })
+            continue
+
+        nombre, precio, stock = row
+        if cantidad > stock:
+            errores.append({
+                "producto_id": pid,
+                "tipo": "stock_insuficiente",
+                "nombre": nombre,
+                "disponible": stock,
+                "solicitado": cantidad,
+                "detalle": f"Stock insuficiente para '{nombre}'. Disponible: {stock}, Solicitado: {cantidad}",
+            })
+            continue
+
+        carrito.append({
+            'producto_id': pid,
+            'cantidad': cantidad,
+            'precio': float(precio),
+            'nombre': nombre
+        })
+        descripcion.append(f"{nombre} x{cantidad}")
+        total += precio * cantidad
+
+    if errores:
+        raise CarritoInvalido(errores)
+
+    return {"carrito": carrito, "descripcion": descripcion, "total": total}
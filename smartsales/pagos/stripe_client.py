@@ -0,0 +1,131 @@
+"""
+Cliente de Stripe compartido por todo el proceso.
+
+Se configura una sola vez (SmartsalesConfig.ready): API key, un requests.Session
+con pool keep-alive (las llamadas reutilizan la conexión TLS), timeout y
+reintentos de red. Todas las llamadas a Stripe de pagos pasan por las funciones
+de este módulo, que además registran la latencia por operación (metricas()).
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import stripe
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_configurado = False
+_config_lock = threading.Lock()
+
+
+def configurar(forzar: bool = False):
+    """Configura el módulo stripe para todo el proceso. Idempotente."""
+    global _configurado
+    if _configurado and not forzar:
+        return
+    with _config_lock:
+        if _configurado and not forzar:
+            return
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
+
+        pool = getattr(settings, 'STRIPE_POOL_MAXSIZE', 10)
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_connections=pool, pool_maxsize=pool))
+        stripe.default_http_client = stripe.RequestsClient(
+            timeout=getattr(settings, 'STRIPE_TIMEOUT', 20),
+            session=session,
+        )
+        # Stripe reintenta con idempotency key propia, seguro también para create
+        stripe.max_network_retries = getattr(settings, 'STRIPE_MAX_RETRIES', 2)
+        _configurado = True
+
+
+def esta_configurado() -> bool:
+    configurar()
+    return bool(stripe.api_key)
+
+
+# ---------- métricas de latencia ----------
+_metricas = {}
+_metricas_lock = threading.Lock()
+
+
+@contextmanager
+def _medir(operacion: str):
+    t = time.perf_counter()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        ms = (time.perf_counter() - t) * 1000
+        with _metricas_lock:
+            m = _metricas.setdefault(operacion, {'llamadas': 0, 'errores': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            m['llamadas'] += 1
+            m['errores'] += int(error)
+            m['total_ms'] += ms
+            m['max_ms'] = max(m['max_ms'], ms)
+        if ms >= getattr(settings, 'STRIPE_LATENCIA_LENTA_MS', 2000):
+            logger.warning(f"[STRIPE] {operacion} tardó {ms:.0f} ms")
+
+
+def metricas() -> dict:
+    """Copia de las métricas por operación: llamadas, errores, promedio y máximo en ms."""
+    with _metricas_lock:
+        return {
+            op: {
+                'llamadas': m['llamadas'],
+                'errores': m['errores'],
+                'promedio_ms': round(m['total_ms'] / m['llamadas'], 1) if m['llamadas'] else None,
+                'max_ms': round(m['max_ms'], 1),
+            }
+            for op, m in _metricas.items()
+        }
+
+
+# ---------- operaciones ----------
+def crear_payment_intent(**kwargs):
+    configurar()
+    with _medir('payment_intent.create'):
+        return stripe.PaymentIntent.create(**kwargs)
+
+
+def confirmar_payment_intent(payment_intent_id: str, **kwargs):
+    configurar()
+    with _medir('payment_intent.confirm'):
+        return stripe.PaymentIntent.confirm(payment_intent_id, **kwargs)
+
+
+def obtener_payment_intent(payment_intent_id: str):
+    configurar()
+    with _medir('payment_intent.retrieve'):
+        return stripe.PaymentIntent.retrieve(payment_intent_id)
+
+
+def obtener_cargo(charge_id: str):
+    configurar()
+    with _medir('charge.retrieve'):
+        return stripe.Charge.retrieve(charge_id)
+
+
+def reembolsar(payment_intent_id: str):
+    """Reembolso total del payment_intent; la idempotency key evita reembolsar dos veces."""
+    configurar()
+    with _medir('refund.create'):
+        return stripe.Refund.create(
+            payment_intent=payment_intent_id,
+            idempotency_key=f"reembolso-{payment_intent_id}",
+        )
+
+
+def construir_evento(payload, sig_header, webhook_secret):
+    """Verifica la firma del webhook (local, sin red)."""
+    return stripe.Webhook.construct_event(payload, sig_header, webhook_secret)
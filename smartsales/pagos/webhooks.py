@@ -0,0 +1,201 @@
+"""
+Creación de la venta a partir de un payment_intent.succeeded de Stripe.
+La ejecuta el procesador del inbox (pagos/inbox.py), no la vista HTTP.
+"""
+import hashlib
+import json
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from smartsales.historialpagos import cache as historial_cache
+from . import confirmaciones, recibos
+from .recibos import receipt_desde_evento, charge_id_de
+from .repository import (
+    bloquear_productos, insertar_venta, insertar_detalles, descontar_stock_lote, get_checkout_sesion
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorPermanente(Exception):
+    """Falla de negocio que no se corrige reintentando: el inbox marca el evento 'fallido' de inmediato."""
+
+    def compensar(self):
+        """Acción tras marcar el evento 'fallido' (por defecto ninguna)."""
+
+
+class StockInsuficiente(ErrorPermanente):
+    """
+    El pago se cobró pero no alcanza el stock: no hay venta.
+    compensar() reembolsa el payment_intent (PAGOS_REEMBOLSO_AUTOMATICO) y avisa al comprador.
+    """
+
+    def __init__(self, mensaje, payment_intent_id=None, usuario_id=None, total=None):
+        super().__init__(mensaje)
+        self.payment_intent_id = payment_intent_id
+        self.usuario_id = usuario_id
+        self.total = total
+
+    def compensar(self):
+        reembolsado = False
+        if getattr(settings, 'PAGOS_REEMBOLSO_AUTOMATICO', True) and self.payment_intent_id:
+            try:
+                from . import stripe_client
+                stripe_client.reembolsar(self.payment_intent_id)
+                reembolsado = True
+                logger.warning(f"[WEBHOOK] PI {self.payment_intent_id} reembolsado: {self}")
+            except Exception as e:
+                logger.error(f"[WEBHOOK] No se pudo reembolsar PI {self.payment_intent_id}: {e}")
+        if not reembolsado:
+            # Cobrado sin venta ni reembolso: requiere intervención manual
+            logger.critical(
+                f"[WEBHOOK] PI {self.payment_intent_id} cobrado sin venta ni reembolso "
+                f"(usuario {self.usuario_id}, total {self.total}): {self}"
+            )
+        if self.usuario_id:
+            from smartsales.notificaciones.services import NotificacionManager
+            NotificacionManager.notificar_compra_no_completada(
+                self.usuario_id, self.total, self.payment_intent_id, reembolsado
+            )
+
+
+def procesar_evento(tipo: str, evento: dict):
+    """Despacha un evento del inbox según su tipo. Devuelve el venta_id creado o None."""
+    if tipo == 'payment_intent.succeeded':
+        return procesar_pago_exitoso(evento['data']['object'])
+    return None
+
+
+def procesar_pago_exitoso(payment_intent: dict):
+    """
+    Crea venta, pago y detalles y descuenta stock en una transacción.
+    Idempotente por payment_intent_id: si el pago ya existe devuelve None.
+    """
+    payment_intent_id = payment_intent['id']
+    metadata = payment_intent['metadata']
+
+    checkout_id = metadata.get('checkout_id')
+    total_pagado = Decimal(payment_intent['amount']) / Decimal(100)
+
+    # Lock por payment_intent_id (dos eventos distintos pueden referirse al mismo pago)
+    lock_id = int(hashlib.md5(payment_intent_id.encode()).hexdigest()[:15], 16) % 2147483647
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Adquirir lock
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [lock_id])
+
+            # Verificar si ya existe
+            cursor.execute("SELECT venta_id FROM pagos WHERE payment_intent_id = %s", [payment_intent_id])
+            if cursor.fetchone():
+                return None
+
+            # Carrito validado en el checkout (una lectura por PK).
+            # Los PaymentIntent creados antes de checkout_sesion traen el carrito en la metadata.
+            if checkout_id:
+                sesion = get_checkout_sesion(cursor, checkout_id)
+                if not sesion:
+                    raise ValueError(f"checkout_sesion {checkout_id} no encontrada")
+                usuario_id, direccion_texto, carrito = sesion
+            else:
+                usuario_id = metadata['usuario_id']
+                direccion_texto = metadata['direccion_texto']
+                carrito = json.loads(metadata['carrito_json'])
+
+            # Crear venta
+            venta_id, hora_venta = insertar_venta(cursor, usuario_id, total_pagado, direccion_texto)
+
+            # Receipt: solo si el evento ya trae el cargo expandido.
+            # Si no, se resuelve después del commit (recibos.encolar), sin llamar a Stripe con el lock tomado.
+            receipt_url = receipt_desde_evento(payment_intent)
+
+            # Crear pago
+            cursor.execute(
+                "INSERT INTO pagos (venta_id, total, receipt_url, payment_intent_id) VALUES (%s, %s, %s, %s)",
+                [venta_id, total_pagado, receipt_url, payment_intent_id]
+            )
+
+            # Crear detalles y actualizar stock (set-based: una sentencia por paso)
+            cantidades = {}
+            for item in carrito:
+                pid = int(item['producto_id'])
+                cantidades[pid] = cantidades.get(pid, 0) + int(item['cantidad'])
+
+            # Los productos se bloquean al final para acortar el tiempo que quedan retenidos
+            productos = bloquear_productos(cursor, cantidades.keys())
+            faltantes = [
+                pid for pid, cant in cantidades.items()
+                if pid not in productos or productos[pid][0] < cant
+            ]
+            if faltantes:
+                raise StockInsuficiente(
+                    f"Stock insuficiente para productos {faltantes}",
+                    payment_intent_id=payment_intent_id, usuario_id=usuario_id, total=total_pagado,
+                )
+
+            insertar_detalles(cursor, venta_id, hora_venta, [
+                (pid, cant, productos[pid][1]) for pid, cant in cantidades.items()
+            ])
+
+            # Verificar si el stock queda en 7 o menos
+            productos_con_stock_bajo = [
+                {'producto_id': pid, 'vendedor_id': id_vendedor, 'stock_nuevo': nuevo_stock}
+                for pid, nuevo_stock, id_vendedor in descontar_stock_lote(cursor, cantidades)
+                if nuevo_stock <= 7
+            ]
+
+            print(f"[WEBHOOK] Venta {venta_id} creada para PI {payment_intent_id}")
+
+            # Avisar a ConfirmarPagoView cuando haga commit (mismo proceso y vía NOTIFY)
+            confirmaciones.notificar_en_transaccion(cursor, payment_intent_id)
+
+            # Programar notificaciones después del commit
+            transaction.on_commit(lambda: _enviar_notificaciones_post_venta(
+                venta_id, usuario_id, total_pagado, productos_con_stock_bajo
+            ))
+            transaction.on_commit(lambda: historial_cache.invalidar(usuario_id))
+            if not receipt_url:
+                charge_id = charge_id_de(payment_intent)
+                transaction.on_commit(lambda: recibos.encolar(payment_intent_id, charge_id))
+
+    return venta_id
+
+
+def _enviar_notificaciones_post_venta(venta_id, usuario_id, total_pagado, productos_con_stock_bajo):
+    """
+    Función helper para enviar notificaciones después de crear una venta
+    Se ejecuta después del commit de la transacción
+    """
+    try:
+        from smartsales.notificaciones.services import NotificacionManager
+        from smartsales.models import Venta
+        
+        # Obtener la venta completa
+        try:
+            venta = Venta.objects.get(id=venta_id)
+        except Venta.DoesNotExist:
+            print(f"[NOTIF] No se pudo encontrar venta {venta_id}")
+            return
+        
+        # 1. Notificar compra exitosa al comprador
+        NotificacionManager.notificar_compra_exitosa(venta)
+        print(f"[NOTIF] Notificación de compra enviada para venta {venta_id}")
+        
+        # 2. Notificar stock bajo a vendedores
+        if productos_con_stock_bajo:
+            from smartsales.models import Producto
+            for item in productos_con_stock_bajo:
+                try:
+                    producto = Producto.objects.get(id=item['producto_id'])
+                    NotificacionManager.notificar_stock_bajo(producto)
+                    print(f"[NOTIF] Notificación de stock bajo enviada para producto {item['producto_id']}")
+                except Producto.DoesNotExist:
+                    print(f"[NOTIF] No se pudo encontrar producto {item['producto_id']}")
+                    continue
+    
+    except Exception as e:
+        print(f"[NOTIF] Error al enviar notificaciones: {e}")
+        # No re-lanzar la excepción para no afectar el flujo principal
@@ -1,3 +1,242 @@
-from django.test import TestCase
+import io
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from smartsales import usuario_correo
+from smartsales.busqueda import BuscadorMemoria, IndiceTypeahead, resaltar
+from smartsales.catalogo import importacion
+from smartsales.pagos import recibos
+from smartsales.venta_manual.carrito_store import MemoriaCarritoStore
+
+
+class StubStripe:
+    """Reemplaza a Stripe en las pruebas: {payment_intent_id: receipt_url}."""
+
+    def __init__(self, recibos_por_pi):
+        self.recibos = recibos_por_pi
+        self.llamadas = []
+
+    def __call__(self, payment_intent_id, charge_id):
+        self.llamadas.append((payment_intent_id, charge_id))
+        if payment_intent_id not in self.recibos:
+            raise RuntimeError("No such payment_intent")
+        return self.recibos[payment_intent_id]
+
+
+class RecibosTest(SimpleTestCase):
+    def setUp(self):
+        self.stub = StubStripe({'pi_1': 'https://pay.stripe.com/receipts/1', 'pi_2': None})
+        self.anterior = recibos.set_resolver(self.stub)
+
+    def tearDown(self):
+        recibos.set_resolver(self.anterior)
+
+    def test_receipt_desde_evento_expandido(self):
+        pi = {'id': 'pi_1', 'latest_charge': {'id': 'ch_1', 'receipt_url': 'https://r/1'}}
+        self.assertEqual(recibos.receipt_desde_evento(pi), 'https://r/1')
+        self.assertEqual(recibos.charge_id_de(pi), 'ch_1')
+        self.assertIsNone(recibos.receipt_desde_evento({'id': 'pi_1', 'latest_charge': 'ch_1'}))
+
+    def test_resolver_lote_omite_errores_y_vacios(self):
+        resueltos = recibos.resolver_lote([('pi_1', 'ch_1'), ('pi_2', None), ('pi_x', None)])
+        self.assertEqual(resueltos, [('pi_1', 'https://pay.stripe.com/receipts/1')])
+        self.assertEqual(len(self.stub.llamadas), 3)
+
+
+class BusquedaMemoriaTest(SimpleTestCase):
+    def setUp(self):
+        self.motor = BuscadorMemoria(cargar=lambda: [])
+        self.motor.construir([
+            (1, 'Samsung Galaxy S23'),
+            (2, 'iPhone 15 Pro'),
+            (3, 'Cámara Canon EOS Réflex'),
+        ])
+
+    def test_sin_acentos_ni_mayusculas(self):
+        self.assertEqual([pid for pid, _ in self.motor.buscar('camara reflex')], [3])
+
+    def test_prefijo_y_errores_de_tipeo(self):
+        self.assertEqual(self.motor.buscar('galaxy')[0][0], 1)
+        self.assertEqual(self.motor.buscar('samsnug galaxi')[0][0], 1)
+
+    def test_resaltado(self):
+        self.assertEqual(resaltar('Cámara Canon EOS Réflex', 'camara reflex'), [[0, 6], [17, 23]])
+
+
+class ImportacionValidacionTest(SimpleTestCase):
+    marcas = {'samsung': 1}
+    tipos = {'refrigerador': 7}
+
+    def test_fila_valida(self):
+        valores = importacion.validar_fila(
+            ('  Refri 500L ', 899.99, 15, '365', 'SAMSUNG', 'Refrigerador'), self.marcas, self.tipos
+        )
+        self.assertEqual(valores[0], 'Refri 500L')
+        self.assertEqual(str(valores[1]), '899.99')
+        self.assertEqual(valores[2:], (15, 365, 1, 7))
+
+    def test_errores_por_fila(self):
+        casos = [
+            ((None, 10, 1, 0, 'Samsung', 'Refrigerador'), "nombre"),
+            (('X', -1, 1, 0, 'Samsung', 'Refrigerador'), "Precio inválido"),
+            (('X', 10, 'a', 0, 'Samsung', 'Refrigerador'), "Stock inválido"),
+            (('X', 10, 1, 0, 'LG', 'Refrigerador'), "Marca 'LG'"),
+            (('X', 10, 1, 0, 'Samsung', 'Tv'), "Tipo 'Tv'"),
+        ]
+        for row, mensaje in casos:
+            with self.assertRaisesRegex(ValueError, mensaje):
+                importacion.validar_fila(row, self.marcas, self.tipos)
+
+    def test_csv_exportado_se_reimporta(self):
+        archivo = io.BytesIO(
+            '\ufeffid,nombre,precio,stock,tiempo_garantia,marca,tipo\r\n'
+            '7,Refri 500L,899.99,15,365,Samsung,Refrigerador\r\n'.encode('utf-8')
+        )
+        self.assertEqual(
+            list(importacion.leer_csv(archivo)),
+            [(2, ('Refri 500L', '899.99', '15', '365', 'Samsung', 'Refrigerador'))]
+        )
+
+    def test_columnas_por_encabezado(self):
+        plantilla = ["NOMBRE DEL PRODUCTO*", "PRECIO (USD)*", "STOCK*",
+                     "TIEMPO GARANTÍA (DÍAS)*", "MARCA*", "TIPO DE PRODUCTO*"]
+        self.assertEqual(importacion.mapa_columnas(plantilla), (0, 1, 2, 3, 4, 5))
+        exportado = ["ID", "NOMBRE", "PRECIO (USD)", "STOCK", "GARANTÍA (DÍAS)", "MARCA", "TIPO"]
+        self.assertEqual(importacion.mapa_columnas(exportado), (1, 2, 3, 4, 5, 6))
+        self.assertIsNone(importacion.mapa_columnas(["a", "b", "c"]))
+
+    def test_insertar_lote_asigna_ids_por_valores(self):
+        class Cursor:
+            def execute(self, sql, params):
+                # Como la base: precio con 2 decimales y RETURNING en cualquier orden
+                nombres, precios = params[1], params[2]
+                self.filas = [
+                    (100 + i, nombres[i], Decimal(precios[i]).quantize(Decimal('0.01')), 1, 0, 1, 7)
+                    for i in range(len(nombres))
+                ][::-1]
+
+            def fetchall(self):
+                return self.filas
+
+        lote = [('A', Decimal('10.005'), 1, 0, 1, 7), ('B', Decimal('5'), 1, 0, 1, 7), ('A', Decimal('10.01'), 1, 0, 1, 7)]
+        ids = importacion.insertar_lote(Cursor(), 'v1', lote)
+        self.assertEqual(sorted(ids), [100, 101, 102])
+        self.assertEqual(ids[1], 101)
+
+
+class MemoriaCarritoStoreTest(SimpleTestCase):
+    def item(self, producto_id, cantidad=1):
+        return {'producto_id': producto_id, 'cantidad': cantidad, 'subtotal': 10.0 * cantidad}
+
+    def test_upsert_y_orden(self):
+        store = MemoriaCarritoStore(max_carritos=10)
+        with store.bloqueo('v1'):
+            store.guardar_item('v1', self.item(5))
+            store.guardar_item('v1', self.item(2))
+            store.guardar_item('v1', self.item(5, 3))
+        self.assertEqual([i['producto_id'] for i in store.items('v1')], [5, 2])
+        self.assertEqual(store.obtener_item('v1', 5)['cantidad'], 3)
+        self.assertTrue(store.eliminar_item('v1', 2))
+        self.assertFalse(store.eliminar_item('v1', 2))
+        self.assertEqual(store.items('v2'), [])
+
+    def test_lru_acotado(self):
+        store = MemoriaCarritoStore(max_carritos=2)
+        for v in ('v1', 'v2', 'v3'):
+            store.guardar_item(v, self.item(1))
+        self.assertEqual(store.items('v1'), [])
+        self.assertEqual(len(store.items('v3')), 1)
+
+    def test_actualizar_precios_conserva_cantidad(self):
+        store = MemoriaCarritoStore(max_carritos=10)
+        store.guardar_item('v1', self.item(5, 3))
+        store.actualizar_precios('v1', {5: (12.5, 4), 9: (1.0, 1)})
+        item = store.obtener_item('v1', 5)
+        self.assertEqual((item['cantidad'], item['precio'], item['subtotal'], item['stock_disponible']),
+                         (3, 12.5, 37.5, 4))
+        self.assertIsNone(store.obtener_item('v1', 9))
+
+    def test_lock_reentrante_y_conservado_por_lru(self):
+        store = MemoriaCarritoStore(max_carritos=1)
+        store.guardar_item('v1', self.item(5))
+        with store.bloqueo('v1'):
+            store.actualizar_precios('v1', {5: (12.5, 4)})
+            # v2 desplaza a v1 del LRU mientras su lock está tomado: el lock se conserva
+            store.guardar_item('v2', self.item(1))
+            self.assertIn('v1', store._locks_vendedor)
+        with store.bloqueo('v2'):
+            store.vaciar('v2')
+        self.assertIn('v2', store._locks_vendedor)
+
+    @override_settings(VENTA_MANUAL_CARRITO_TTL=0)
+    def test_vencimiento(self):
+        store = MemoriaCarritoStore(max_carritos=2)
+        store.guardar_item('v1', self.item(1))
+        self.assertIsNone(store.obtener_item('v1', 1))
+
+
+class TypeaheadTest(SimpleTestCase):
+    def setUp(self):
+        self.indice = IndiceTypeahead(cargar=lambda: [], version=lambda: 1)
+        self.indice.construir([
+            (1, 'Refrigerador Samsung 500L'),
+            (2, 'Lavadora LG'),
+            (3, 'Mini refrigerador Ácme'),
+            (4, 'Samsung TV'),
+            (5, 'Refri'),
+        ], version=1)
+
+    def test_prefijo_primero_luego_subcadena(self):
+        self.assertEqual(list(self.indice.candidatos('refri')), [5, 1, 3])
+        self.assertEqual(list(self.indice.candidatos('ACME')), [3])
+
+    def test_varias_palabras_como_prefijo(self):
+        self.assertEqual(list(self.indice.candidatos('ref sams')), [1])
+        self.assertEqual(list(self.indice.candidatos('zzz')), [])
+
+    def test_vacio_devuelve_todo_en_orden(self):
+        self.assertEqual(list(self.indice.candidatos('')), [2, 3, 5, 1, 4])
+
+
+class CursorUsuarios:
+    """Cursor mínimo sobre una lista de usuarios (id, nombre, correo); registra cada consulta."""
+
+    def __init__(self, usuarios):
+        self.usuarios = usuarios
+        self.consultas = []
+        self._fila = None
+
+    def execute(self, sql, params):
+        self.consultas.append(sql)
+        if "WHERE id = %s" in sql:
+            uid, correo = params
+            encontrados = [u for u in self.usuarios if u[0] == uid and u[2].lower() == correo]
+            self._fila = encontrados[0] if encontrados else None
+        else:
+            encontrados = [u for u in self.usuarios if u[2].lower() == params[0]]
+            self._fila = (encontrados[0][0],) + encontrados[0] if encontrados else None
+
+    def fetchone(self):
+        return self._fila
+
+
+@override_settings(USUARIO_CORREO_CACHE_TTL=3600)
+class UsuarioCorreoTest(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_segunda_busqueda_por_pk(self):
+        cursor = CursorUsuarios([("u1", "Ana", "Ana@Correo.com")])
+        self.assertEqual(usuario_correo.buscar(cursor, " ana@correo.COM "), ("u1", "Ana", "Ana@Correo.com"))
+        self.assertEqual(usuario_correo.buscar(cursor, "ana@correo.com"), ("u1", "Ana", "Ana@Correo.com"))
+        self.assertIn("WHERE id = %s", cursor.consultas[-1])
+
+    def test_entrada_vieja_se_descarta(self):
+        cursor = CursorUsuarios([("u1", "Ana", "ana@correo.com")])
+        usuario_correo.buscar(cursor, "ana@correo.com")
+        cursor.usuarios = [("u2", "Ana Nueva", "ana@correo.com")]
+        self.assertEqual(usuario_correo.buscar(cursor, "ana@correo.com"), ("u2", "Ana Nueva", "ana@correo.com"))
+        cursor.usuarios = []
+        self.assertIsNone(usuario_correo.buscar(cursor, "ana@correo.com"))
@@ -0,0 +1,69 @@
+"""
+Búsqueda de usuarios por correo (login y venta manual).
+
+Las consultas comparan lower(correo) = correo normalizado, que usa el índice
+usuario_correo_lower_idx (migración 0008). Además se guarda en el cache
+correo -> id: con el id en cache la fila se lee por PK. La lectura por PK
+vuelve a comprobar el correo, así que una entrada vieja (usuario eliminado o
+correo cambiado) no devuelve a otro usuario: se descarta y se busca de nuevo.
+
+Invalidan: el registro, la edición de perfil y la eliminación de usuarios,
+siempre en on_commit.
+
+Con el índice la consulta por correo ya es una sola lectura indexada: el cache
+solo conviene si es compartido y fuera de Postgres (Redis/memcached). Con
+locmem o dbcache USUARIO_CORREO_CACHE_TTL vale 0 por defecto y buscar() va
+directo a la consulta.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def normalizar(correo: str) -> str:
+    return (correo or "").strip().lower()
+
+
+def _clave(correo: str) -> str:
+    # Los correos pueden superar el largo máximo de clave (y traer caracteres no válidos en memcached)
+    return f"usuario_correo:{hashlib.md5(correo.encode()).hexdigest()}"
+
+
+def buscar(cursor, correo: str, columnas: str = "id, nombre, correo"):
+    """Fila (`columnas`) del usuario con ese correo, o None. Usa el cursor recibido (y su transacción)."""
+    correo = normalizar(correo)
+    if not correo:
+        return None
+    ttl = getattr(settings, "USUARIO_CORREO_CACHE_TTL", 0)
+    clave = _clave(correo)
+
+    usuario_id = cache.get(clave) if ttl > 0 else None
+    if usuario_id is not None:
+        cursor.execute(
+            f"SELECT {columnas} FROM usuario WHERE id = %s AND lower(correo) = %s",
+            [usuario_id, correo]
+        )
+        row = cursor.fetchone()
+        if row:
+            return row
+        cache.delete(clave)
+
+    cursor.execute(
+        f"SELECT id, {columnas} FROM usuario WHERE lower(correo) = %s LIMIT 1",
+        [correo]
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    if ttl > 0:
+        cache.set(clave, str(row[0]), ttl)
+    return row[1:]
+
+
+def invalidar(*correos):
+    """Descarta las entradas de esos correos después del commit actual."""
+    claves = [_clave(normalizar(c)) for c in correos if c]
+    if claves:
+        transaction.on_commit(lambda: cache.delete_many(claves))
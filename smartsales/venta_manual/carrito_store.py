@@ -0,0 +1,265 @@
+"""
+Almacenamiento del carrito de venta manual.
+
+Antes el carrito vivía en un dict global del proceso: con varios workers de
+gunicorn cada proceso tenía su propia copia (y se perdía al reciclarlo), y el
+dict crecía sin límite. Ahora las vistas usan `get_store()`, que devuelve:
+
+- BaseDatosCarritoStore (por defecto): tablas venta_manual_carrito (una fila
+  por vendedor, con vencimiento) y venta_manual_carrito_item (una fila por
+  producto). Compartido por todos los procesos.
+- MemoriaCarritoStore (VENTA_MANUAL_CARRITO_BACKEND='memoria'): local al
+  proceso, con vencimiento y cantidad máxima de carritos (LRU). Sirve para
+  desarrollo o despliegues de un solo proceso.
+
+Los carritos vencen VENTA_MANUAL_CARRITO_TTL segundos después de su última modificación.
+Las operaciones de lectura-validación-escritura se hacen dentro de
+`store.bloqueo(vendedor_id)`, que serializa los requests del mismo vendedor
+(entre hilos y, en la base, entre procesos).
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+
+
+def _ttl() -> int:
+    return getattr(settings, "VENTA_MANUAL_CARRITO_TTL", 8 * 3600)
+
+
+class CarritoStore:
+    """Interfaz común. Los ítems son dicts con la forma de ItemCarritoSerializer."""
+
+    def bloqueo(self, vendedor_id):
+        raise NotImplementedError
+
+    def items(self, vendedor_id) -> list:
+        raise NotImplementedError
+
+    def obtener_item(self, vendedor_id, producto_id):
+        raise NotImplementedError
+
+    def guardar_item(self, vendedor_id, item):
+        raise NotImplementedError
+
+    def eliminar_item(self, vendedor_id, producto_id) -> bool:
+        raise NotImplementedError
+
+    def vaciar(self, vendedor_id):
+        raise NotImplementedError
+
+    def actualizar_precios(self, vendedor_id, precios):
+        """{producto_id: (precio, stock)}: actualiza la foto de los ítems existentes (subtotal incluido)."""
+        raise NotImplementedError
+
+
+# ---------- base de datos ----------
+class BaseDatosCarritoStore(CarritoStore):
+
+    def __init__(self):
+        self._ultima_purga = 0.0
+
+    @contextmanager
+    def bloqueo(self, vendedor_id):
+        """
+        Transacción con la fila del vendedor bloqueada (el upsert toma el lock).
+        Si el carrito había vencido, se descartan sus ítems; el vencimiento se renueva.
+        """
+        self._purgar_si_corresponde()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Carrito vencido: se descarta con sus ítems (cascada)
+                cursor.execute(
+                    "DELETE FROM venta_manual_carrito WHERE vendedor_id = %s AND expira_en <= NOW()",
+                    [vendedor_id]
+                )
+                cursor.execute(
+                    """
+                    INSERT INTO venta_manual_carrito (vendedor_id, expira_en)
+                    VALUES (%s, NOW() + make_interval(secs => %s))
+                    ON CONFLICT (vendedor_id) DO UPDATE SET expira_en = EXCLUDED.expira_en
+                    """,
+                    [vendedor_id, _ttl()]
+                )
+            yield self
+
+    def items(self, vendedor_id) -> list:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT i.item
+                FROM venta_manual_carrito_item i
+                JOIN venta_manual_carrito c ON c.vendedor_id = i.vendedor_id
+                WHERE i.vendedor_id = %s AND c.expira_en > NOW()
+                ORDER BY i.agregado_en, i.producto_id
+                """,
+                [vendedor_id]
+            )
+            return [r[0] for r in cursor.fetchall()]
+
+    def obtener_item(self, vendedor_id, producto_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT i.item
+                FROM venta_manual_carrito_item i
+                JOIN venta_manual_carrito c ON c.vendedor_id = i.vendedor_id
+                WHERE i.vendedor_id = %s AND i.producto_id = %s AND c.expira_en > NOW()
+                """,
+                [vendedor_id, producto_id]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def guardar_item(self, vendedor_id, item):
+        """Upsert del ítem; llamar dentro de bloqueo() (la fila del vendedor debe existir)."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO venta_manual_carrito_item (vendedor_id, producto_id, item)
+                VALUES (%s, %s, %s::jsonb)
+                ON CONFLICT (vendedor_id, producto_id) DO UPDATE SET item = EXCLUDED.item
+                """,
+                [vendedor_id, item['producto_id'], json.dumps(item)]
+            )
+
+    def eliminar_item(self, vendedor_id, producto_id) -> bool:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM venta_manual_carrito_item WHERE vendedor_id = %s AND producto_id = %s",
+                [vendedor_id, producto_id]
+            )
+            return cursor.rowcount > 0
+
+    def vaciar(self, vendedor_id):
+        with connection.cursor() as cursor:
+            # Los ítems se borran en cascada
+            cursor.execute("DELETE FROM venta_manual_carrito WHERE vendedor_id = %s", [vendedor_id])
+
+    def actualizar_precios(self, vendedor_id, precios):
+        """Una sola sentencia; no necesita bloqueo() porque conserva la cantidad guardada."""
+        if not precios:
+            return
+        ids = list(precios)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE venta_manual_carrito_item i
+                SET item = i.item || jsonb_build_object(
+                    'precio', d.precio,
+                    'stock_disponible', d.stock,
+                    'subtotal', d.precio * (i.item->>'cantidad')::int
+                )
+                FROM unnest(%s::int[], %s::float8[], %s::int[]) AS d(producto_id, precio, stock)
+                WHERE i.vendedor_id = %s AND i.producto_id = d.producto_id
+                """,
+                [ids, [precios[p][0] for p in ids], [precios[p][1] for p in ids], vendedor_id]
+            )
+
+    def _purgar_si_corresponde(self):
+        """Borra los carritos vencidos de todos los vendedores, como mucho una vez por intervalo."""
+        ahora = time.monotonic()
+        if ahora - self._ultima_purga < getattr(settings, "VENTA_MANUAL_CARRITO_PURGA_INTERVALO", 600):
+            return
+        self._ultima_purga = ahora
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM venta_manual_carrito WHERE expira_en <= NOW()")
+
+
+# ---------- memoria del proceso ----------
+class MemoriaCarritoStore(CarritoStore):
+    """Carritos en el proceso: {vendedor_id: (OrderedDict producto_id -> item, expira)}, LRU acotado."""
+
+    def __init__(self, max_carritos: int | None = None):
+        self.max_carritos = max_carritos or getattr(settings, "VENTA_MANUAL_CARRITO_MAX_MEMORIA", 1000)
+        self._carritos = OrderedDict()
+        self._lock = threading.Lock()
+        self._locks_vendedor = {}
+
+    @contextmanager
+    def bloqueo(self, vendedor_id):
+        # RLock: actualizar_precios (y cualquier otro método) puede llamarse dentro de bloqueo().
+        # [lock, en_uso]: en_uso se cuenta con self._lock tomado, así el LRU no descarta
+        # un lock que alguien ya obtuvo y todavía no adquirió
+        with self._lock:
+            entrada = self._locks_vendedor.setdefault(vendedor_id, [threading.RLock(), 0])
+            entrada[1] += 1
+        try:
+            with entrada[0]:
+                yield self
+        finally:
+            with self._lock:
+                entrada[1] -= 1
+
+    def _soltar_lock(self, vendedor_id):
+        """Solo desde el LRU (con self._lock tomado): descarta el lock si nadie lo usa."""
+        entrada = self._locks_vendedor.get(vendedor_id)
+        if entrada is not None and entrada[1] == 0:
+            del self._locks_vendedor[vendedor_id]
+
+    def _carrito(self, vendedor_id, crear: bool = False):
+        """Carrito vigente del vendedor; con crear=True lo crea si hace falta y renueva el vencimiento."""
+        with self._lock:
+            entrada = self._carritos.get(vendedor_id)
+            if entrada and entrada[1] <= time.monotonic():
+                del self._carritos[vendedor_id]
+                entrada = None
+            if entrada is None:
+                if not crear:
+                    return None
+                entrada = (OrderedDict(), 0)
+            if crear:
+                self._carritos[vendedor_id] = (entrada[0], time.monotonic() + _ttl())
+            # Usado recientemente: lo último en salir por LRU
+            self._carritos.move_to_end(vendedor_id)
+            while len(self._carritos) > self.max_carritos:
+                viejo, _ = self._carritos.popitem(last=False)
+                self._soltar_lock(viejo)
+            return entrada[0]
+
+    def items(self, vendedor_id) -> list:
+        carrito = self._carrito(vendedor_id)
+        return [dict(i) for i in carrito.values()] if carrito else []
+
+    def obtener_item(self, vendedor_id, producto_id):
+        carrito = self._carrito(vendedor_id)
+        item = carrito.get(producto_id) if carrito else None
+        return dict(item) if item else None
+
+    def guardar_item(self, vendedor_id, item):
+        self._carrito(vendedor_id, crear=True)[item['producto_id']] = dict(item)
+
+    def eliminar_item(self, vendedor_id, producto_id) -> bool:
+        carrito = self._carrito(vendedor_id)
+        return bool(carrito) and carrito.pop(producto_id, None) is not None
+
+    def vaciar(self, vendedor_id):
+        with self._lock:
+            self._carritos.pop(vendedor_id, None)
+
+    def actualizar_precios(self, vendedor_id, precios):
+        with self.bloqueo(vendedor_id):
+            carrito = self._carrito(vendedor_id)
+            for producto_id, (precio, stock) in (precios.items() if carrito else ()):
+                item = carrito.get(producto_id)
+                if item:
+                    item.update({'precio': precio, 'subtotal': precio * item['cantidad'],
+                                 'stock_disponible': stock})
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> CarritoStore:
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                backend = getattr(settings, "VENTA_MANUAL_CARRITO_BACKEND", "db")
+                _STORE = MemoriaCarritoStore() if backend == "memoria" else BaseDatosCarritoStore()
+    return _STORE
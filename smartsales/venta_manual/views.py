@@ -2,6 +2,7 @@ import os
 import json
 from decimal import Decimal
 from datetime import datetime
+from itertools import islice
 
 from django.db import connection, transaction
 from rest_framework.views import APIView
@@ -10,6 +11,13 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from smartsales.rolesusuario.permissions import IsVendedorRole
+from smartsales.historialpagos import cache as historial_cache
+from smartsales.busqueda import get_typeahead
+from smartsales import usuario_correo
+from smartsales.pagos.repository import (
+    bloquear_productos_venta, insertar_venta, insertar_detalles, descontar_stock_lote
+)
+from .carrito_store import get_store
 from .serializers import (
     BuscarClienteSerializer,
     ClienteEncontradoSerializer,
@@ -40,15 +48,7 @@ class BuscarClienteView(APIView):
         correo = serializer.validated_data['correo'].lower().strip()
         
         with connection.cursor() as cursor:
-            cursor.execute(
-                """
-                SELECT id, nombre, correo, telefono
-                FROM usuario
-                WHERE LOWER(correo) = %s
-                """,
-                [correo]
-            )
-            row = cursor.fetchone()
+            row = usuario_correo.buscar(cursor, correo, "id, nombre, correo, telefono")
         
         if not row:
             return Response(
@@ -69,9 +69,74 @@ class BuscarClienteView(APIView):
         )
 
 
+LIMITE_BUSQUEDA = 50
+# El índice incluye productos sin stock: como mucho se piden estas tandas de
+# candidatos (4 * límite cada una), así una búsqueda amplia en un catálogo casi
+# agotado no recorre todo el catálogo
+TANDAS_BUSQUEDA = 3
+
+
+_COLUMNAS_BUSQUEDA = """
+    SELECT 
+        p.id,
+        p.nombre,
+        p.precio,
+        p.stock,
+        m.nombre as marca,
+        tp.nombre as tipo,
+        p.tiempogarantia
+    FROM producto p
+    JOIN marca m ON p.marca_id = m.id
+    JOIN tipoproducto tp ON p.tipoproducto_id = tp.id
+"""
+
+
+def _hidratar_productos(candidatos, limite, busqueda='', tandas=TANDAS_BUSQUEDA):
+    """
+    Completa los ids candidatos con una consulta por PK (solo con stock > 0),
+    respetando el orden del índice. Si una tanda no alcanza el límite pide la
+    siguiente, hasta `tandas` consultas. Si aun así faltan y quedan candidatos
+    (muchas coincidencias sin stock), completa con una consulta que filtra
+    stock > 0 en SQL sobre el índice trigram del nombre.
+    """
+    rows = []
+    quedan = True
+    with connection.cursor() as cursor:
+        for _ in range(tandas):
+            if len(rows) >= limite:
+                break
+            ids = list(islice(candidatos, 4 * limite))
+            if len(ids) < 4 * limite:
+                quedan = False
+            if not ids:
+                break
+            cursor.execute(
+                _COLUMNAS_BUSQUEDA + "WHERE p.id = ANY(%s) AND p.stock > 0",
+                [ids]
+            )
+            por_id = {r[0]: r for r in cursor.fetchall()}
+            rows.extend(por_id[pid] for pid in ids if pid in por_id)
+
+        if quedan and len(rows) < limite:
+            patron = '%' + busqueda.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            cursor.execute(
+                _COLUMNAS_BUSQUEDA + """
+                WHERE p.stock > 0
+                  AND f_unaccent(lower(p.nombre)) LIKE f_unaccent(lower(%s))
+                  AND NOT (p.id = ANY(%s))
+                ORDER BY lower(p.nombre)
+                LIMIT %s
+                """,
+                [patron, [r[0] for r in rows], limite - len(rows)]
+            )
+            rows.extend(cursor.fetchall())
+    return rows[:limite]
+
+
 class BuscarProductoView(APIView):
     """
-    Vista para buscar productos disponibles por nombre.
+    Vista para buscar productos disponibles por nombre (autocompletado del punto de venta).
+    Usa el índice typeahead en memoria (smartsales.busqueda.typeahead).
     Solo accesible por vendedores.
     
     GET /api/venta-manual/buscar-producto/?busqueda=refrigerador
@@ -84,48 +149,9 @@ class BuscarProductoView(APIView):
         
         busqueda = serializer.validated_data.get('busqueda', '').strip()
         
-        with connection.cursor() as cursor:
-            # Si busqueda está vacía, traer todos los productos disponibles
-            # Si tiene valor, buscar productos que coincidan
-            if busqueda:
-                query = """
-                    SELECT 
-                        p.id,
-                        p.nombre,
-                        p.precio,
-                        p.stock,
-                        m.nombre as marca,
-                        tp.nombre as tipo,
-                        p.tiempogarantia
-                    FROM producto p
-                    JOIN marca m ON p.marca_id = m.id
-                    JOIN tipoproducto tp ON p.tipoproducto_id = tp.id
-                    WHERE p.stock > 0
-                    AND LOWER(p.nombre) LIKE LOWER(%s)
-                    ORDER BY p.nombre
-                    LIMIT 50
-                """
-                cursor.execute(query, [f'%{busqueda}%'])
-            else:
-                query = """
-                    SELECT 
-                        p.id,
-                        p.nombre,
-                        p.precio,
-                        p.stock,
-                        m.nombre as marca,
-                        tp.nombre as tipo,
-                        p.tiempogarantia
-                    FROM producto p
-                    JOIN marca m ON p.marca_id = m.id
-                    JOIN tipoproducto tp ON p.tipoproducto_id = tp.id
-                    WHERE p.stock > 0
-                    ORDER BY p.nombre
-                    LIMIT 50
-                """
-                cursor.execute(query)
-            
-            rows = cursor.fetchall()
+        # El índice en memoria devuelve ids en orden (empieza con, contiene, palabras);
+        # se completan por PK en tandas hasta juntar 50 con stock (y si no alcanza, por SQL)
+        rows = _hidratar_productos(get_typeahead().candidatos(busqueda), LIMITE_BUSQUEDA, busqueda)
         
         if not rows:
             mensaje = f"No se encontraron productos disponibles que coincidan con '{busqueda}'." if busqueda else "No tienes productos disponibles en stock."
@@ -152,18 +178,59 @@ class BuscarProductoView(APIView):
         )
 
 
+def _revalidar_carrito(items, actuales):
+    """
+    Compara la foto del carrito (precio y stock al agregar, leída antes de
+    bloquear) con las filas bloqueadas {producto_id: (nombre, precio, stock,
+    tiempogarantia)}. Solo calcula: no escribe nada mientras se tienen los locks.
+    Devuelve la lista de cambios.
+    """
+    cambios = []
+    for item in items:
+        actual = actuales.get(item['producto_id'])
+        if not actual:
+            continue
+        nombre, precio, stock, _ = actual
+        precio = float(precio)
+        if item['precio'] == precio and item['stock_disponible'] == stock:
+            continue
+        cambios.append({
+            'producto_id': item['producto_id'],
+            'nombre': nombre,
+            'precio_carrito': item['precio'],
+            'precio_actual': precio,
+            'stock_carrito': item['stock_disponible'],
+            'stock_actual': stock,
+        })
+    return cambios
+
+
+def _actualizar_carrito(vendedor_id, cambios):
+    """Lleva el precio/stock nuevos al carrito (una sentencia); se llama en on_commit."""
+    try:
+        get_store().actualizar_precios(vendedor_id, {
+            c['producto_id']: (c['precio_actual'], c['stock_actual']) for c in cambios
+        })
+    except Exception as e:
+        print(f"[VENTA_MANUAL] No se pudo actualizar el carrito: {e}")
+
+
 class RegistrarVentaManualView(APIView):
     """
     Vista para registrar una venta manual en mostrador.
     El vendedor selecciona el cliente por correo y los productos manualmente.
     
-    Flujo:
-    1. Valida cliente y productos
-    2. Verifica stock disponible
-    3. Crea venta, detalleventa y pago
-    4. Actualiza stock
+    Flujo (una sola transacción):
+    1. Valida el cliente y lee la foto del carrito del vendedor
+    2. Bloquea todos los productos en una sola consulta (FOR UPDATE ... ANY)
+    3. Verifica stock y revalida la foto del carrito (precio/stock) contra esas filas
+    4. Crea venta, detalleventa (un INSERT) y pago; descuenta stock (un UPDATE)
     5. Envía notificaciones (igual que webhook)
     
+    Si un precio cambió desde que se agregó al carrito responde 409 con los
+    cambios para no cobrar un monto distinto al mostrado. El carrito se
+    actualiza después del commit, con los locks de productos ya liberados.
+    
     POST /api/venta-manual/registrar/
     """
     permission_classes = [IsAuthenticated, IsVendedorRole]
@@ -184,11 +251,7 @@ class RegistrarVentaManualView(APIView):
             with transaction.atomic():
                 with connection.cursor() as cursor:
                     # 1. Verificar que el cliente existe
-                    cursor.execute(
-                        "SELECT id, nombre, correo FROM usuario WHERE LOWER(correo) = %s",
-                        [cliente_correo]
-                    )
-                    cliente_row = cursor.fetchone()
+                    cliente_row = usuario_correo.buscar(cursor, cliente_correo)
                     
                     if not cliente_row:
                         return Response(
@@ -199,103 +262,95 @@ class RegistrarVentaManualView(APIView):
                     cliente_id = cliente_row[0]
                     cliente_nombre = cliente_row[1]
                     
-                    # 2. Validar productos, stock y calcular total
-                    total_venta = Decimal('0.00')
-                    productos_validados = []
-                    productos_con_stock_bajo = []
+                    # Foto del carrito: se lee antes de bloquear productos
+                    items_carrito = get_store().items(str(vendedor_id))
                     
+                    # 2. Bloquear todos los productos en una sola lectura (FOR UPDATE, orden por id)
+                    #    Las líneas repetidas del mismo producto se suman
+                    cantidades = {}
                     for prod in productos:
-                        producto_id = prod['producto_id']
-                        cantidad = prod['cantidad']
-                        
-                        # Obtener información del producto
-                        cursor.execute(
-                            """
-                            SELECT p.nombre, p.precio, p.stock, p.tiempogarantia,
-                                   m.nombre as marca, tp.nombre as tipo
-                            FROM producto p
-                            JOIN marca m ON p.marca_id = m.id
-                            JOIN tipoproducto tp ON p.tipoproducto_id = tp.id
-                            WHERE p.id = %s
-                            """,
-                            [producto_id]
+                        cantidades[prod['producto_id']] = cantidades.get(prod['producto_id'], 0) + prod['cantidad']
+                    
+                    actuales = bloquear_productos_venta(cursor, cantidades.keys())
+                    
+                    faltantes = [pid for pid in cantidades if pid not in actuales]
+                    if faltantes:
+                        return Response(
+                            {"detail": f"Producto con ID {faltantes[0]} no encontrado."},
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
+                    
+                    # 3. Revalidar contra la fila bloqueada: stock de todas las líneas y
+                    #    precio/stock de la foto guardada en el carrito del vendedor
+                    cambios = _revalidar_carrito(items_carrito, actuales)
+                    if cambios:
+                        transaction.on_commit(lambda: _actualizar_carrito(str(vendedor_id), cambios))
+                    errores = [
+                        {
+                            'producto_id': pid,
+                            'nombre': actuales[pid][0],
+                            'disponible': actuales[pid][2],
+                            'solicitado': cantidad,
+                        }
+                        for pid, cantidad in cantidades.items()
+                        if cantidad > actuales[pid][2]
+                    ]
+                    if errores:
+                        e = errores[0]
+                        return Response(
+                            {
+                                "detail": f"Stock insuficiente para '{e['nombre']}'. "
+                                         f"Disponible: {e['disponible']}, Solicitado: {e['solicitado']}",
+                                "errores": errores,
+                                "cambios_carrito": cambios,
+                            },
+                            status=status.HTTP_400_BAD_REQUEST
                         )
-                        prod_row = cursor.fetchone()
-                        
-                        if not prod_row:
-                            return Response(
-                                {"detail": f"Producto con ID {producto_id} no encontrado."},
-                                status=status.HTTP_400_BAD_REQUEST
-                            )
-                        
-                        nombre, precio, stock, tiempo_garantia = prod_row[0], prod_row[1], prod_row[2], prod_row[3]
-                        
-                        # Verificar stock suficiente
-                        if cantidad > stock:
-                            return Response(
-                                {
-                                    "detail": f"Stock insuficiente para '{nombre}'. "
-                                             f"Disponible: {stock}, Solicitado: {cantidad}"
-                                },
-                                status=status.HTTP_400_BAD_REQUEST
-                            )
-                        
+                    precios_cambiados = [c for c in cambios if c['precio_carrito'] != c['precio_actual']]
+                    if precios_cambiados:
+                        return Response(
+                            {
+                                "detail": "El precio de algunos productos cambió desde que se agregaron al carrito. "
+                                          "El carrito se actualizó; revise el total y vuelva a registrar.",
+                                "cambios_carrito": precios_cambiados,
+                            },
+                            status=status.HTTP_409_CONFLICT
+                        )
+                    
+                    total_venta = Decimal('0.00')
+                    productos_validados = []
+                    for pid, cantidad in cantidades.items():
+                        nombre, precio, stock, tiempo_garantia = actuales[pid]
                         subtotal = precio * cantidad
                         total_venta += subtotal
-                        
                         productos_validados.append({
-                            'producto_id': producto_id,
+                            'producto_id': pid,
                             'nombre': nombre,
                             'precio': precio,
                             'cantidad': cantidad,
                             'subtotal': subtotal,
                             'tiempo_garantia': tiempo_garantia,
-                            'stock_actual': stock
                         })
                     
-                    # 3. Crear venta
-                    cursor.execute(
-                        """
-                        INSERT INTO venta (usuario_id, total, direccion, hora)
-                        VALUES (%s, %s, %s, NOW())
-                        RETURNING id, hora
-                        """,
-                        [cliente_id, total_venta, direccion]
-                    )
-                    venta_row = cursor.fetchone()
-                    venta_id = venta_row[0]
-                    venta_hora = venta_row[1]
+                    # 4. Crear venta, todos los detalles en un INSERT y el stock en un UPDATE
+                    venta_id, venta_hora = insertar_venta(cursor, cliente_id, total_venta, direccion)
                     
-                    # 4. Crear detalleventa y actualizar stock
-                    for prod in productos_validados:
-                        producto_id = prod['producto_id']
-                        cantidad = prod['cantidad']
-                        tiempo_garantia = prod['tiempo_garantia']
-                        stock_actual = prod['stock_actual']
-                        
-                        # Insertar detalle de venta (trigger calcula limitegarantia automáticamente)
-                        cursor.execute(
-                            """
-                            INSERT INTO detalleventa (venta_id, producto_id, cantidad, limitegarantia)
-                            VALUES (%s, %s, %s, %s + INTERVAL '%s days')
-                            """,
-                            [venta_id, producto_id, cantidad, venta_hora, tiempo_garantia]
-                        )
-                        
-                        # Actualizar stock
-                        cursor.execute(
-                            "UPDATE producto SET stock = stock - %s WHERE id = %s",
-                            [cantidad, producto_id]
-                        )
-                        
-                        # Verificar si el stock queda bajo (7 o menos)
-                        nuevo_stock = stock_actual - cantidad
-                        if nuevo_stock <= 7:
-                            productos_con_stock_bajo.append({
-                                'producto_id': producto_id,
-                                'vendedor_id': vendedor_id,
-                                'stock_nuevo': nuevo_stock
-                            })
+                    # limitegarantia = hora de la venta + días de garantía de cada producto
+                    insertar_detalles(cursor, venta_id, venta_hora, [
+                        (p['producto_id'], p['cantidad'], p['tiempo_garantia'])
+                        for p in productos_validados
+                    ])
+                    
+                    # Stock bajo (7 o menos) según el stock que devuelve el UPDATE
+                    productos_con_stock_bajo = [
+                        {
+                            'producto_id': pid,
+                            'vendedor_id': vendedor_id,
+                            'stock_nuevo': nuevo_stock
+                        }
+                        for pid, nuevo_stock, _ in descontar_stock_lote(cursor, cantidades)
+                        if nuevo_stock <= 7
+                    ]
                     
                     # 5. Crear registro de pago (sin payment_intent_id, es pago manual)
                     cursor.execute(
@@ -331,7 +386,8 @@ class RegistrarVentaManualView(APIView):
                         'pago_id': pago_id
                     }
                     
-                    # 7. Enviar notificaciones después del commit
+                    # 7. Invalidar el historial de pagos del cliente y enviar notificaciones después del commit
+                    transaction.on_commit(lambda: historial_cache.invalidar(cliente_id))
                     transaction.on_commit(lambda: self._enviar_notificaciones_venta_manual(
                         venta_id, cliente_id, productos_con_stock_bajo, vendedor_id
                     ))
@@ -386,9 +442,16 @@ class RegistrarVentaManualView(APIView):
 # NUEVAS VISTAS: CARRITO DE VENTA MANUAL
 # ===============================================================
 
-# Almacenamiento temporal del carrito en memoria (por sesión de vendedor)
-# En producción, considerar usar Redis o base de datos
-carritos_vendedores = {}
+def _respuesta_carrito(items):
+    response_data = {
+        'items': items,
+        'total': sum(item['subtotal'] for item in items),
+        'cantidad_items': len(items)
+    }
+    return Response(
+        CarritoResponseSerializer(response_data).data,
+        status=status.HTTP_200_OK
+    )
 
 
 class AgregarAlCarritoView(APIView):
@@ -431,56 +494,45 @@ class AgregarAlCarritoView(APIView):
         
         prod_id, nombre, precio, stock, marca, tipo = row
         
-        # Inicializar carrito si no existe
-        if vendedor_id not in carritos_vendedores:
-            carritos_vendedores[vendedor_id] = {}
-        
-        carrito = carritos_vendedores[vendedor_id]
-        
-        # Calcular cantidad total en carrito (existente + nueva)
-        cantidad_en_carrito = carrito.get(producto_id, {}).get('cantidad', 0)
-        cantidad_total = cantidad_en_carrito + cantidad
-        
-        # Validar stock disponible
-        if cantidad_total > stock:
-            return Response(
-                {
-                    "detail": f"Stock insuficiente para '{nombre}'. "
-                             f"Disponible: {stock}, En carrito: {cantidad_en_carrito}, Solicitado: {cantidad}"
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Agregar o actualizar producto en carrito
-        if producto_id in carrito:
-            carrito[producto_id]['cantidad'] = cantidad_total
-            carrito[producto_id]['subtotal'] = float(precio) * cantidad_total
-        else:
-            carrito[producto_id] = {
-                'producto_id': producto_id,
-                'nombre': nombre,
-                'precio': float(precio),
-                'cantidad': cantidad_total,
-                'subtotal': float(precio) * cantidad_total,
-                'stock_disponible': stock,
-                'marca': marca,
-                'tipo': tipo
-            }
-        
-        # Preparar respuesta con el carrito actualizado
-        items = list(carrito.values())
-        total = sum(item['subtotal'] for item in items)
-        
-        response_data = {
-            'items': items,
-            'total': total,
-            'cantidad_items': len(items)
-        }
+        store = get_store()
+        with store.bloqueo(vendedor_id):
+            item = store.obtener_item(vendedor_id, producto_id)
+            
+            # Calcular cantidad total en carrito (existente + nueva)
+            cantidad_en_carrito = item['cantidad'] if item else 0
+            cantidad_total = cantidad_en_carrito + cantidad
+            
+            # Validar stock disponible
+            if cantidad_total > stock:
+                return Response(
+                    {
+                        "detail": f"Stock insuficiente para '{nombre}'. "
+                                 f"Disponible: {stock}, En carrito: {cantidad_en_carrito}, Solicitado: {cantidad}"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Agregar o actualizar producto en carrito
+            if item:
+                item['cantidad'] = cantidad_total
+                item['subtotal'] = float(precio) * cantidad_total
+            else:
+                item = {
+                    'producto_id': producto_id,
+                    'nombre': nombre,
+                    'precio': float(precio),
+                    'cantidad': cantidad_total,
+                    'subtotal': float(precio) * cantidad_total,
+                    'stock_disponible': stock,
+                    'marca': marca,
+                    'tipo': tipo
+                }
+            store.guardar_item(vendedor_id, item)
+            
+            # Preparar respuesta con el carrito actualizado
+            items = store.items(vendedor_id)
         
-        return Response(
-            CarritoResponseSerializer(response_data).data,
-            status=status.HTTP_200_OK
-        )
+        return _respuesta_carrito(items)
 
 
 class ObtenerCarritoView(APIView):
@@ -493,21 +545,7 @@ class ObtenerCarritoView(APIView):
     
     def get(self, request):
         vendedor_id = str(request.user.id)
-        carrito = carritos_vendedores.get(vendedor_id, {})
-        
-        items = list(carrito.values())
-        total = sum(item['subtotal'] for item in items)
-        
-        response_data = {
-            'items': items,
-            'total': total,
-            'cantidad_items': len(items)
-        }
-        
-        return Response(
-            CarritoResponseSerializer(response_data).data,
-            status=status.HTTP_200_OK
-        )
+        return _respuesta_carrito(get_store().items(vendedor_id))
 
 
 class ActualizarCantidadCarritoView(APIView):
@@ -526,42 +564,40 @@ class ActualizarCantidadCarritoView(APIView):
         producto_id = serializer.validated_data['producto_id']
         cantidad = serializer.validated_data['cantidad']
         
-        carrito = carritos_vendedores.get(vendedor_id, {})
-        
-        if producto_id not in carrito:
-            return Response(
-                {"detail": f"Producto con ID {producto_id} no está en el carrito."},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Verificar stock disponible
-        stock_disponible = carrito[producto_id]['stock_disponible']
-        if cantidad > stock_disponible:
-            return Response(
-                {
-                    "detail": f"Stock insuficiente. Disponible: {stock_disponible}, Solicitado: {cantidad}"
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Actualizar cantidad
-        carrito[producto_id]['cantidad'] = cantidad
-        carrito[producto_id]['subtotal'] = carrito[producto_id]['precio'] * cantidad
-        
-        # Preparar respuesta
-        items = list(carrito.values())
-        total = sum(item['subtotal'] for item in items)
-        
-        response_data = {
-            'items': items,
-            'total': total,
-            'cantidad_items': len(items)
-        }
+        store = get_store()
+        with store.bloqueo(vendedor_id):
+            item = store.obtener_item(vendedor_id, producto_id)
+            
+            if not item:
+                return Response(
+                    {"detail": f"Producto con ID {producto_id} no está en el carrito."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            
+            # Verificar stock con el valor actual (el del carrito puede estar viejo)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT precio, stock FROM producto WHERE id = %s", [producto_id])
+                row = cursor.fetchone()
+            if row:
+                item['precio'] = float(row[0])
+                item['stock_disponible'] = row[1]
+            stock_disponible = item['stock_disponible']
+            if cantidad > stock_disponible:
+                return Response(
+                    {
+                        "detail": f"Stock insuficiente. Disponible: {stock_disponible}, Solicitado: {cantidad}"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Actualizar cantidad
+            item['cantidad'] = cantidad
+            item['subtotal'] = item['precio'] * cantidad
+            store.guardar_item(vendedor_id, item)
+            
+            items = store.items(vendedor_id)
         
-        return Response(
-            CarritoResponseSerializer(response_data).data,
-            status=status.HTTP_200_OK
-        )
+        return _respuesta_carrito(items)
 
 
 class EliminarDelCarritoView(APIView):
@@ -574,31 +610,17 @@ class EliminarDelCarritoView(APIView):
     
     def delete(self, request, producto_id):
         vendedor_id = str(request.user.id)
-        carrito = carritos_vendedores.get(vendedor_id, {})
-        
-        if producto_id not in carrito:
-            return Response(
-                {"detail": f"Producto con ID {producto_id} no está en el carrito."},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Eliminar producto
-        del carrito[producto_id]
-        
-        # Preparar respuesta
-        items = list(carrito.values())
-        total = sum(item['subtotal'] for item in items)
-        
-        response_data = {
-            'items': items,
-            'total': total,
-            'cantidad_items': len(items)
-        }
+        store = get_store()
+        with store.bloqueo(vendedor_id):
+            if not store.eliminar_item(vendedor_id, producto_id):
+                return Response(
+                    {"detail": f"Producto con ID {producto_id} no está en el carrito."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            
+            items = store.items(vendedor_id)
         
-        return Response(
-            CarritoResponseSerializer(response_data).data,
-            status=status.HTTP_200_OK
-        )
+        return _respuesta_carrito(items)
 
 
 class VaciarCarritoView(APIView):
@@ -613,16 +635,8 @@ class VaciarCarritoView(APIView):
         vendedor_id = str(request.user.id)
         
         # Vaciar carrito
-        if vendedor_id in carritos_vendedores:
-            carritos_vendedores[vendedor_id] = {}
-        
-        response_data = {
-            'items': [],
-            'total': 0,
-            'cantidad_items': 0
-        }
+        store = get_store()
+        with store.bloqueo(vendedor_id):
+            store.vaciar(vendedor_id)
         
-        return Response(
-            CarritoResponseSerializer(response_data).data,
-            status=status.HTTP_200_OK
-        )
+        return _respuesta_carrito([])
@@ -11,6 +11,7 @@ import logging
 from .serializers import RegisterSerializer, LoginSerializer, UsuarioMeSerializer
 from .authsupabase.api import create_user_admin, sign_in_password, SupabaseError
 from .db_utils import db_retry, execute_query_with_retry
+from . import usuario_correo
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +48,7 @@ class RegisterView(APIView):
                 """,
                 [user_id, nombre, telefono, email],
             )
+        usuario_correo.invalidar(email)
 
         # 3) Rol por defecto (id=1 => 'Usuario')
         with connection.cursor() as cur:
@@ -150,12 +152,7 @@ class LoginView(APIView):
 
         # 4️⃣ Cargar perfil (copiado de tu código actual)
         with connection.cursor() as cur:
-            cur.execute("""
-                SELECT u.id, u.nombre, u.telefono, u.correo
-                FROM usuario u
-                WHERE lower(u.correo) = lower(%s)
-            """, [email])
-            row = cur.fetchone()
+            row = usuario_correo.buscar(cur, email, "id, nombre, telefono, correo")
 
         if row:
             user_id, nombre, telefono, correo = row